@@ -61,7 +61,8 @@ def emailError(subject, error, recipient=None):
 		"_internal_": Services.internalKey(),
 		"text_body": error,
 		"subject": subject,
-		"to": recipient or Conf.get(('developer', 'emails'))
+		"to": recipient or Conf.get(('developer', 'emails')),
+		"dedupe": True
 	})
 	if oResponse.errorExists():
 		print(oResponse.error)
@@ -96,6 +97,11 @@ def isRunning(name):
 		oF = open(sFile, 'r')
 		iPID = int(oF.read())
 
+		# If it's this process, the scheduler, the last run has already
+		#	finished as jobs are run one at a time
+		if iPID == os.getpid():
+			return False
+
 		# Check if the process is still running
 		try:
 			os.kill(iPID, 0)
@@ -54,6 +54,86 @@ def convert_date(s):
 		lDate[2], lDate[0], lDate[1]
 	)
 
+def handle(email):
+	"""Handle
+
+	Parses a single email from Anazao and, if it's for a shipment, stores the
+	tracking code and notifies the patient
+
+	Arguments:
+		email (dict): The email as returned by Email.parse_message
+
+	Returns:
+		None
+	"""
+
+	# If it's not a shipped email
+	if 'Have Shipped' not in email['headers']['Subject']:
+		return
+
+	# Decode the HTML
+	sHTML = email['html'].decode('utf-8')
+
+	# If there's no tracking code
+	if 'The tracking number for this shipment is unavailable' in sHTML:
+		return
+
+	try:
+
+		# Parse the email
+		oMatch = reEmail.search(sHTML)
+		lMatches = oMatch.groups()
+
+		# Split the address into parts
+		lAddress = lMatches[2].split(', ')
+		sZip = lAddress[len(lAddress) - 1].split(' ')[1][:5]
+
+		# Try to find the customer by Name and Zip
+		dKtCustomer = KtCustomer.byNameAndZip(
+			lMatches[1],
+			sZip
+		)
+
+		# If no customer
+		if not dKtCustomer:
+			emailError('Anazao Shipping Error', 'No customer found for:\n\n%s' % str(lMatches))
+			return
+
+		# Get the date/time
+		sDT = arrow.get().format('YYYY-MM-DD HH:mm:ss')
+
+		# Create the shipping info
+		try:
+			dShipInfo = {
+				"code": lMatches[3],
+				"customerId": dKtCustomer['customerId'],
+				"date": convert_date(lMatches[0]),
+				"type": 'FDX',
+				"createdAt": sDT,
+				"updatedAt": sDT
+			}
+			oShippingInfo = ShippingInfo(dShipInfo)
+			bCreated = oShippingInfo.create(conflict="ignore")
+
+			# If the record didn't exist, send an SMS
+			if bCreated:
+				HRTWorkflow.shipping(oShippingInfo.record())
+		except ValueError as e:
+			emailError('Welldyne Incoming Failed', 'Invalid shipping info: %s\n\n%s' % (
+				str(e.args[0]),
+				str(dShipInfo)
+			))
+			return
+
+	except Exception as e:
+		# Generate the body of the email
+		sBody = '%s\n\n%s\n\n%s' % (
+			', '.join([str(s) for s in e.args]),
+			traceback.format_exc(),
+			sHTML
+		)
+		emailError('Anazao Email Error', sBody)
+
 def run():
 	"""Run
 
@@ -85,79 +165,9 @@ def run():
 	if not lEmails:
 		return True
 
-	# Init the list to send to Memo
-	lCodes = []
-
-	# Go througg each email
+	# Go through each email
 	for d in lEmails:
-
-		# If it's not a shipped email
-		if 'Have Shipped' not in d['headers']['Subject']:
-			continue
-
-		# Decode the HTML
-		sHTML = d['html'].decode('utf-8')
-
-		# If there's no tracking code
-		if 'The tracking number for this shipment is unavailable' in sHTML:
-			continue
-
-		try:
-
-			# Parse the email
-			oMatch = reEmail.search(sHTML)
-			lMatches = oMatch.groups()
-
-			# Split the address into parts
-			lAddress = lMatches[2].split(', ')
-			sZip = lAddress[len(lAddress) - 1].split(' ')[1][:5]
-
-			# Try to find the customer by Name and Zip
-			dKtCustomer = KtCustomer.byNameAndZip(
-				lMatches[1],
-				sZip
-			)
-
-			# If no customer
-			if not dKtCustomer:
-				emailError('Anazao Shipping Error', 'No customer found for:\n\n%s' % str(lMatches))
-				continue
-
-			# Get the date/time
-			sDT = arrow.get().format('YYYY-MM-DD HH:mm:ss')
-
-			# Create the shipping info
-			try:
-				dShipInfo = {
-					"code": lMatches[3],
-					"customerId": dKtCustomer['customerId'],
-					"date": convert_date(lMatches[0]),
-					"type": 'FDX',
-					"createdAt": sDT,
-					"updatedAt": sDT
-				}
-				oShippingInfo = ShippingInfo(dShipInfo)
-				bCreated = oShippingInfo.create(conflict="ignore")
-
-				# If the record didn't exist, send an SMS
-				if bCreated:
-					HRTWorkflow.shipping(oShippingInfo.record())
-			except ValueError as e:
-				emailError('Welldyne Incoming Failed', 'Invalid shipping info: %s\n\n%s' % (
-					str(e.args[0]),
-					str(dShipInfo)
-				))
-				continue
-
-		except Exception as e:
-			# Generate the body of the email
-			sBody = '%s\n\n%s\n\n%s' % (
-				', '.join([str(s) for s in e.args]),
-				traceback.format_exc(),
-				sHTML
-			)
-			emailError('Anazao Email Error', sBody)
-			continue
+		handle(d)
 
 	# Return OK
 	return True
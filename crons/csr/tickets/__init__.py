@@ -21,6 +21,9 @@ ACTION_TYPES = [
 	['resolved', TicketResolved]
 ]
 
+_BATCH = 500
+"""The max number of stats to upsert at once"""
+
 def getAndStore(range_type, date, start, end):
 	""" Get and Store
 
@@ -36,53 +39,72 @@ def getAndStore(range_type, date, start, end):
 	Returns:
 		None
 	"""
+	return getAndStoreMany(range_type, [[date, start, end]])
+
+def getAndStoreMany(range_type, ranges):
+	""" Get and Store Many
+
+	Gets the counts by type and user for many ranges of the same range type
+	with a single query per action type, and stores them in batches
+
+	Arguments:
+		range_type (str): The range type, day, week, or month
+		ranges (list): List of [date, start, end], the date to store the
+			counts under, and the starting and ending timestamps
+
+	Returns:
+		bool
+	"""
 
 	# Go through each type and fetch the Memo IDs associated
 	dTypes = {}
 	for s in AGENT_TYPES:
-		dTypes[s] = Agent.memoIdsByType(s)
+		dTypes[s] = set(Agent.memoIdsByType(s))
+
+	# Init the stats
+	lStats = []
 
 	# Go through each action type
 	for l in ACTION_TYPES:
 
-		# Go through each agent type
-		for s in AGENT_TYPES:
+		# Init the type counts for every date so types with no actions still
+		#	get a zero
+		dCounts = {
+			lRange[0]: {s:0 for s in AGENT_TYPES if dTypes[s]}
+			for lRange in ranges
+		}
 
-			# If we have any memo IDs in the list
-			if dTypes[s]:
+		# Go through the counts by date and user
+		for d in l[1].countsByRanges(ranges):
 
-				# Get the count of the action type in the given time frame with the
-				#	Memo IDs in the given agent type
-				iCount = l[1].count(filter={
-					"_created": {"between": [start, end]},
-					"memo_id": dTypes[s]
-				})
+			# Add the user's stat
+			lStats.append(TicketStat({
+				"range": range_type,
+				"date": d['date'],
+				"memo_id": d['memo_id'],
+				"action": l[0],
+				"count": d['count']
+			}))
 
-				# Save it in the DB
-				oStat = TicketStat({
+			# Add the count to each type the user is in
+			for s in dCounts[d['date']]:
+				if d['memo_id'] in dTypes[s]:
+					dCounts[d['date']][s] += d['count']
+
+		# Add the type stats
+		for sDate, dTypeCounts in dCounts.items():
+			for s, iCount in dTypeCounts.items():
+				lStats.append(TicketStat({
 					"range": range_type,
-					"date": date,
+					"date": sDate,
 					"list": s,
 					"action": l[0],
 					"count": iCount
-				})
-				oStat.create(conflict='replace')
-
-		# Get the counts by user
-		lCounts = l[1].counts(start, end)
+				}))
 
-		# Add each one to the DB
-		for d in lCounts:
-
-			# Save it in the DB
-			oStat = TicketStat({
-				"range": range_type,
-				"date": date,
-				"memo_id": d['memo_id'],
-				"action": l[0],
-				"count": d['count']
-			})
-			oStat.create(conflict='replace')
+	# Store the stats in batches
+	for i in range(0, len(lStats), _BATCH):
+		TicketStat.createMany(lStats[i:i+_BATCH], conflict='replace')
 
 	# Return OK
 	return True
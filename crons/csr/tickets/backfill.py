@@ -0,0 +1,129 @@
+# coding=utf8
+"""Backfill Stats
+
+Generates stats for every day, week, or month in a date range, splitting the
+range into chunks that are each gathered with a single query per action and
+stored by their own process
+
+	python -m crons csr.tickets.backfill day 2021-01-01 2021-12-31 [processes]
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from datetime import datetime
+import multiprocessing
+from time import time
+
+# Pip imports
+import arrow
+
+# Local includes
+from . import getAndStoreMany
+
+_CHUNKS = {"day": 31, "week": 13, "month": 3}
+"""The number of ranges gathered at once by range type"""
+
+def _store(args):
+	"""Store
+
+	Gathers and stores a single chunk of ranges, called in the pool
+
+	Arguments:
+		args (tuple): The range type and the ranges
+
+	Returns:
+		uint
+	"""
+	getAndStoreMany(args[0], args[1])
+	return len(args[1])
+
+def ranges(range_type, start, end):
+	"""Ranges
+
+	Returns the date, start timestamp, and end timestamp, of every day, week
+	(starting on Sunday), or month that overlaps the start and end dates
+
+	Arguments:
+		range_type (str): The range type, day, week, or month
+		start (str): The first date, YYYY-MM-DD
+		end (str): The last date, YYYY-MM-DD
+
+	Returns:
+		list
+	"""
+
+	# Convert the dates
+	oStart = arrow.get(datetime(*[int(s, 10) for s in start.split('-')]), 'US/Eastern')
+	oEnd = arrow.get(datetime(*[int(s, 10) for s in end.split('-')]), 'US/Eastern')
+
+	# Find the first range
+	if range_type == 'week':
+		oFirst = oStart.span('week', week_start=7)[0]
+	else:
+		oFirst = oStart.floor(range_type)
+
+	# Generate each range
+	lRanges = []
+	while oFirst <= oEnd:
+		if range_type == 'week':
+			oLast = oFirst.shift(days=6).ceil('day')
+		else:
+			oLast = oFirst.ceil(range_type)
+		lRanges.append([
+			oFirst.format('YYYY-MM-DD'),
+			oFirst.int_timestamp,
+			oLast.int_timestamp
+		])
+		oFirst = oFirst.shift(**{'%ss' % range_type: 1})
+
+	# Return the ranges
+	return lRanges
+
+def run(range_type, start, end, processes=4):
+	"""Run
+
+	Fetches all the stats for the range and stores them in the DB. The
+	workers are forked, so this must be called before any DB connection is
+	opened in this process
+
+	Arguments:
+		range_type (str): The range type, day, week, or month
+		start (str): The first date, YYYY-MM-DD
+		end (str): The last date, YYYY-MM-DD
+		processes (uint): The number of processes to run at once
+
+	Returns:
+		bool
+	"""
+
+	# Check the range type
+	if range_type not in _CHUNKS:
+		print('Invalid range type: %s' % range_type)
+		return False
+
+	# Generate the ranges and split them into chunks
+	lRanges = ranges(range_type, start, end)
+	iChunk = _CHUNKS[range_type]
+	lChunks = [
+		(range_type, lRanges[i:i+iChunk])
+		for i in range(0, len(lRanges), iChunk)
+	]
+
+	# Store each chunk in the pool
+	fStart = time()
+	iDone = 0
+	with multiprocessing.get_context('fork').Pool(int(processes)) as oPool:
+		for i in oPool.imap_unordered(_store, lChunks):
+			iDone += i
+			print('%d/%d %ss stored in %.1fs' % (
+				iDone, len(lRanges), range_type, time() - fStart
+			))
+
+	# Return OK
+	return True
@@ -39,17 +39,10 @@ def run():
 	if isRunning('hrt_ratings'):
 		return True
 
-	# Get all ratings in healthRatingCHRT, revitaExpectationsCHRT
-	lAnswers = TfAnswer.filter({
+	# Get all ratings in healthRatingCHRT, revitaExpectationsCHRT by landing
+	dAnswers = TfAnswer.grouped({
 		"questionId": ['healthRatingCHRT', 'revitaExpectationsCHRT']
-	}, raw=['landing_id', 'questionId', 'value'])
-
-	# Create a unique list of landing IDs
-	dAnswers = {}
-	for d in lAnswers:
-		if d['landing_id'] not in dAnswers:
-			dAnswers[d['landing_id']] = {}
-		dAnswers[d['landing_id']][d['questionId']] = d['value']
+	}, key='questionId')
 
 	# Get the date and customer ID of all landings
 	lLandings = TfLanding.filter({
@@ -79,8 +72,8 @@ def run():
 			d['phone'],
 			d['email'],
 			d['createdAt'],
-			dAnswers[d['landing_id']]['healthRatingCHRT'],
-			dAnswers[d['landing_id']]['revitaExpectationsCHRT']
+			dAnswers[d['landing_id'].lower()].get('healthRatingCHRT', ''),
+			dAnswers[d['landing_id'].lower()].get('revitaExpectationsCHRT', '')
 		])
 
 	# Get the list of recipients for the report
@@ -12,7 +12,8 @@ __email__		= "bast@maleexcel.com"
 __created__		= "2021-03-08"
 
 # Pip imports
-from RestOC import Record_MySQL
+from redis import StrictRedis
+from RestOC import Conf, Record_MySQL
 
 # Record imports
 from records.link import UrlRecord, ViewRecord
@@ -20,15 +21,26 @@ from records.link import UrlRecord, ViewRecord
 def run():
 
 	# Find all records that haven't been accessed in 30 days
-	lIDs = [d['_id'] for d in UrlRecord.filter({
+	lUrls = UrlRecord.filter({
 		"_updated": {"lt": Record_MySQL.Literal('DATE_SUB(NOW(), INTERVAL 30 DAY)')},
 		"permanent": False
-	}, raw=['_id'])]
+	}, raw=['_id', 'code'])
 
 	# If we have no IDs
-	if not lIDs:
+	if not lUrls:
 		return True
 
+	# Remove the codes from the cache used by the link node
+	oRedis = StrictRedis(**Conf.get(('redis', 'primary'), {
+		"host": "localhost",
+		"port": 6379,
+		"db": 0
+	}))
+	oRedis.delete(*['link:code:%s' % d['code'] for d in lUrls])
+
+	# Get just the IDs
+	lIDs = [d['_id'] for d in lUrls]
+
 	# Delete all views
 	ViewRecord.deleteByUrl(lIDs)
 
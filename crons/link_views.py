@@ -0,0 +1,232 @@
+# coding=utf8
+"""Link Views
+
+Stores the views buffered by the link node, inserting them in batches and
+incrementing each url's view count once per batch, in the same transaction
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from time import sleep, time
+
+# Pip imports
+import pymysql
+from redis import StrictRedis
+from RestOC import Conf, JSON, Record_MySQL
+
+# Record imports
+from records.link import UrlRecord, ViewRecord
+
+# Cron imports
+from . import isRunning
+
+_KEY = 'link:views'
+"""The Redis list the link node appends views to"""
+
+_PROCESSING = 'link:views:processing'
+"""The Redis list views are moved to while they're being stored"""
+
+_FAILED = 'link:views:failed'
+"""The Redis list of views that couldn't be stored, and why"""
+
+_UNAVAILABLE = (
+	ConnectionError, pymysql.err.OperationalError, pymysql.err.InterfaceError
+)
+"""The errors raised when the DB can't be reached, RestOC raises
+ConnectionError once it's given up retrying"""
+
+# Moves up to ARGV[1] views from the front of the buffer, KEYS[1], to the end
+#	of the processing list, KEYS[2], in one step, and returns them
+_TAKE_LUA = """
+local views = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #views > 0 then
+	redis.call('LTRIM', KEYS[1], #views, -1)
+	redis.call('RPUSH', KEYS[2], unpack(views))
+end
+return views
+"""
+
+def _counts(views):
+	"""Counts
+
+	Counts the views per url
+
+	Arguments:
+		views (tuple[]): The raw view, record, and url ID of each view
+
+	Returns:
+		dict
+	"""
+	dRet = {}
+	for t in views:
+		try: dRet[t[2]] += 1
+		except KeyError: dRet[t[2]] = 1
+	return dRet
+
+def _dead(redis, view, error):
+	"""Dead
+
+	Moves a view that can't be stored to the failed list
+
+	Arguments:
+		redis (StrictRedis): The Redis connection holding the buffer
+		view (str): The view as it was buffered
+		error (str): The reason it couldn't be stored
+
+	Returns:
+		None
+	"""
+	print('Invalid view: %s, %s' % (view, error))
+	redis.rpush(_FAILED, JSON.encode({"view": view, "error": error}))
+
+def _store(host, records, counts):
+	"""Store
+
+	Inserts the views and increments the url counts in a single transaction
+
+	Arguments:
+		host (str): The DB host the records are on
+		records (ViewRecord[]): The views to insert
+		counts (dict): The number of views to add by url ID
+
+	Returns:
+		None
+	"""
+
+	# Insert the views and add the counts together
+	Record_MySQL.Commands.execute(host, 'START TRANSACTION')
+	try:
+		ViewRecord.createMany(records)
+		UrlRecord.incrementViews(counts)
+		Record_MySQL.Commands.execute(host, 'COMMIT')
+
+	# If anything failed, undo it all, if the rollback fails too the
+	#	original error is the one that matters
+	except Exception as e:
+		try: Record_MySQL.Commands.execute(host, 'ROLLBACK')
+		except Exception: pass
+		raise e
+
+def flush(redis, take, batch):
+	"""Flush
+
+	Moves up to batch views from the buffer to the processing list and stores
+	them, returning how many were taken. Views are only removed from the
+	processing list once they're committed, so if the DB can't be reached
+	they're put back on the buffer by the next run. Views that can't be
+	stored are moved to the failed list instead of being tried again
+
+	Arguments:
+		redis (StrictRedis): The Redis connection holding the buffer
+		take (Script): The registered _TAKE_LUA script
+		batch (uint): The max number of views to store at once
+
+	Returns:
+		uint
+	"""
+
+	# Move the views to the processing list
+	lViews = take(keys=[_KEY, _PROCESSING], args=[batch])
+
+	# If there's nothing to do
+	if not lViews:
+		return 0
+
+	# Create the records, dead lettering any that are invalid
+	lValid = []
+	for s in lViews:
+		try:
+			dView = JSON.decode(s)
+			lValid.append((s, ViewRecord(dView), dView['url_id']))
+		except (ValueError, TypeError, KeyError) as e:
+			_dead(redis, s, str(e.args and e.args[0] or e))
+			redis.lrem(_PROCESSING, 1, s)
+
+	# Store them all in one transaction
+	sHost = ViewRecord.struct()['host']
+	try:
+		_store(sHost, [t[1] for t in lValid], _counts(lValid))
+
+	# If the DB is unavailable, leave them to be put back on the buffer
+	except _UNAVAILABLE:
+		raise
+
+	# Else, something in the batch is bad, so store them one at a time and
+	#	dead letter the ones that still fail. Each is removed from the
+	#	processing list as it's finished so none are stored twice if the DB
+	#	goes away part way through
+	except Exception:
+		for t in lValid:
+			try:
+				_store(sHost, [t[1]], _counts([t]))
+			except _UNAVAILABLE:
+				raise
+			except Exception as e:
+				_dead(redis, t[0], str(e.args and e.args[0] or e))
+			redis.lrem(_PROCESSING, 1, t[0])
+
+	# Everything is stored or dead lettered, so clear the processing list
+	redis.delete(_PROCESSING)
+
+	# Return the number of views taken
+	return len(lViews)
+
+def run(seconds=55):
+	"""Run
+
+	Flushes the buffer every few seconds until the given number of seconds
+	have passed, meant to be started every minute
+
+	Arguments:
+		seconds (uint): The number of seconds to keep flushing for
+
+	Returns:
+		bool
+	"""
+
+	# If we're already running
+	if isRunning('link_views'):
+		return True
+
+	# Get the config
+	dConf = Conf.get('link', {})
+	iBatch = dConf.get('flush_batch', 1000)
+	iInterval = dConf.get('flush_interval', 5)
+
+	# Connect to Redis
+	oRedis = StrictRedis(**Conf.get(('redis', 'primary'), {
+		"host": "localhost",
+		"port": 6379,
+		"db": 0
+	}))
+
+	# Put back anything a previous run didn't finish storing
+	while oRedis.rpoplpush(_PROCESSING, _KEY):
+		pass
+
+	# Register the script that takes views off the buffer
+	oTake = oRedis.register_script(_TAKE_LUA)
+
+	# Loop until we run out of time
+	fEnd = time() + int(seconds)
+	while True:
+
+		# Store batches until the buffer is empty
+		while flush(oRedis, oTake, iBatch) == iBatch:
+			pass
+
+		# If we're out of time, we're done
+		if time() + iInterval > fEnd:
+			break
+
+		# Wait for more views
+		sleep(iInterval)
+
+	# Return OK
+	return True
@@ -0,0 +1,522 @@
+# coding=utf8
+"""Mail Ingest
+
+Stays resident, holding a single IMAP connection, and waits on IDLE for new
+mail. New messages are found by UID past a high-water mark kept in Redis,
+fetched in batches, and passed to the handler registered for who they're
+from
+
+	python -m crons mail_ingest
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import email
+import email.utils
+import imaplib
+import importlib
+import re
+import select
+import signal
+import socket
+import ssl
+import traceback
+from time import sleep, time
+
+# Pip imports
+from redis import StrictRedis
+from RestOC import Conf
+
+# Shared imports
+from shared import Email
+
+# Cron imports
+from . import emailError, isRunning
+
+HANDLERS = [
+	(('missed_calls', 'signia'), 'missed_calls', 'handle'),
+	('pkginfo@ups.com', 'zrt_shipping', 'handle_ups'),
+	('no-reply@zrtlab.com', 'zrt_shipping', 'handle_usps'),
+	('myAnazao@AnazaoHealth.com', 'anazao.shipped', 'handle')
+]
+"""The from address, or the config key holding it, the cron module, and the
+function in it, that each email is passed to"""
+
+_KEY = 'mail:ingest:%s:%s'
+"""The Redis hash the UIDVALIDITY and last UID of a mailbox are kept in"""
+
+_reStatus = re.compile(rb'UIDVALIDITY (\d+)|UIDNEXT (\d+)')
+_reUID = re.compile(rb'UID (\d+)')
+_reSeen = re.compile(rb'FLAGS \([^)]*\\Seen', re.I)
+
+_RETRIES = 5
+"""The number of times a message is tried before it's given up on"""
+
+_mbRunning = True
+"""Set to False to exit once the current batch is finished"""
+
+def _fetched(data):
+	"""Fetched
+
+	Pulls the UID, content, and the rest of the response, which holds any
+	FLAGS, out of the data returned by UID FETCH. The UID and FLAGS can come
+	before or after the content depending on the server
+
+	Arguments:
+		data (list): The data returned by imaplib
+
+	Returns:
+		list of (int, bytes, bytes)
+	"""
+
+	# Init the return
+	lRet = []
+
+	# Go through each part
+	for i in range(len(data)):
+
+		# Skip anything that isn't a message
+		if not isinstance(data[i], tuple):
+			continue
+
+		# Get the response in front of the content and after it
+		sResponse = data[i][0]
+		if i + 1 < len(data) and isinstance(data[i + 1], bytes):
+			sResponse += data[i + 1]
+
+		# If we found the UID, add the message
+		oMatch = _reUID.search(sResponse)
+		if oMatch:
+			lRet.append((int(oMatch.group(1)), data[i][1], sResponse))
+
+	# Return the messages
+	return lRet
+
+def handlers():
+	"""Handlers
+
+	Imports the cron modules in HANDLERS and returns the function for each
+	from address
+
+	Returns:
+		dict
+	"""
+
+	# Init the return
+	dRet = {}
+
+	# Go through each handler
+	for mFrom, sCron, sFunction in HANDLERS:
+
+		# If the address is in the config, fetch it
+		if isinstance(mFrom, tuple):
+			mFrom = Conf.get(mFrom)
+			if not mFrom:
+				continue
+
+		# Import the module and store the function
+		oModule = importlib.import_module('crons.%s' % sCron)
+		dRet[mFrom.lower()] = (sCron, getattr(oModule, sFunction))
+
+	# Return the handlers
+	return dRet
+
+class Ingester(object):
+	"""Ingester
+
+	A single authenticated connection to a mailbox and its high-water mark
+	"""
+
+	def __init__(self, imap, conf, redis):
+		"""Constructor
+
+		Stores the settings, the connection is made by connect()
+
+		Arguments:
+			imap (dict): The email.imap config
+			conf (dict): The email.ingest config
+			redis (StrictRedis): The connection to keep the mark in
+
+		Returns:
+			Ingester
+		"""
+		self.imap = imap
+		self.box = conf.get('box', 'INBOX')
+		self.batch = conf.get('batch', 50)
+		self.idleFor = conf.get('idle', 300)
+		self.poll = conf.get('poll', 60)
+		self.timeout = max(self.idleFor, self.poll) + 60
+		self.redis = redis
+		self.key = _KEY % (imap['auth']['user'], self.box)
+		self.handlers = handlers()
+		self.server = None
+		self.uid = 0
+
+	def close(self):
+		"""Close
+
+		Logs out of the server, ignoring errors as the connection may already
+		be gone
+
+		Returns:
+			None
+		"""
+		if self.server:
+			try:
+				self.server.logout()
+			except Exception:
+				pass
+			self.server = None
+
+	def connect(self):
+		"""Connect
+
+		Logs in, selects the mailbox, and loads the mark. If there's no mark,
+		or the mailbox's UIDVALIDITY changed, the mark starts just before the
+		oldest unread message so nothing left unread is missed
+
+		Returns:
+			None
+		"""
+
+		# Create a new connection
+		if self.imap['tls']: imap_class = imaplib.IMAP4_SSL
+		else: imap_class = imaplib.IMAP4
+		self.server = imap_class(
+			self.imap['server']['host'],
+			self.imap['server']['port'],
+			timeout=self.timeout
+		)
+
+		# Login and select the mailbox
+		self.server.login(
+			self.imap['auth']['user'],
+			self.imap['auth']['pass']
+		)
+		self.server.select(self.box)
+
+		# Get the UIDVALIDITY and UIDNEXT of the mailbox
+		sTyp, lData = self.server.status(self.box, '(UIDVALIDITY UIDNEXT)')
+		dStatus = {}
+		for t in _reStatus.findall(lData[0]):
+			if t[0]: dStatus['validity'] = int(t[0])
+			if t[1]: dStatus['next'] = int(t[1])
+
+		# Get the stored mark
+		dMark = self.redis.hgetall(self.key)
+
+		# If it's for the same mailbox, use it
+		if dMark and int(dMark[b'validity']) == dStatus['validity']:
+			self.uid = int(dMark[b'uid'])
+
+		# Else, start before the oldest unread, or at the end
+		else:
+			sTyp, lData = self.server.uid('SEARCH', 'UNSEEN')
+			lUIDs = [int(s) for s in lData[0].split()]
+			self.uid = lUIDs and (min(lUIDs) - 1) or (dStatus['next'] - 1)
+			p = self.redis.pipeline()
+			p.hset(self.key, 'validity', dStatus['validity'])
+			p.hset(self.key, 'uid', self.uid)
+			p.execute()
+
+	def fetch(self):
+		"""Fetch
+
+		Finds every message past the mark, reads who they're from in batches,
+		and fetches and handles the unread ones there's a handler for.
+		Handled messages are marked as read. If a message can't be handled the
+		mark stops before it so it's tried again on the next pass, the
+		messages after it are still handled, and skipped next time as they're
+		read. After _RETRIES attempts a message is given up on
+
+		Returns:
+			uint
+		"""
+
+		# Find the messages past the mark, the server always returns the last
+		#	message for n:* so filter it out if it's old
+		sTyp, lData = self.server.uid('SEARCH', 'UID %d:*' % (self.uid + 1))
+		lUIDs = [i for i in (int(s) for s in lData[0].split()) if i > self.uid]
+
+		# Go through them a batch at a time
+		iHandled = 0
+		iBlocked = None
+		for i in range(0, len(lUIDs), self.batch):
+			lBatch = lUIDs[i:i + self.batch]
+
+			# Get who each one is from, and if it's been read, without marking
+			#	them as read
+			sTyp, lData = self.server.uid(
+				'FETCH',
+				','.join([str(n) for n in lBatch]),
+				'(UID FLAGS BODY.PEEK[HEADER.FIELDS (FROM)])'
+			)
+
+			# Keep the unread ones we have a handler for
+			dMatched = {}
+			for iUID, sHeader, sResponse in _fetched(lData):
+				if _reSeen.search(sResponse):
+					continue
+				sFrom = email.utils.parseaddr(
+					email.message_from_bytes(sHeader).get('From', '')
+				)[1].lower()
+				if sFrom in self.handlers:
+					dMatched[iUID] = self.handlers[sFrom]
+
+			# Drop any that have already been given up on
+			if dMatched:
+				lMatched = sorted(dMatched)
+				lAttempts = self.redis.hmget(self.key, ['failed:%d' % n for n in lMatched])
+				for n, s in zip(lMatched, lAttempts):
+					if s and int(s) >= _RETRIES:
+						del dMatched[n]
+
+			# If we have any
+			if dMatched:
+
+				# Fetch the full messages
+				sTyp, lData = self.server.uid(
+					'FETCH',
+					','.join([str(n) for n in sorted(dMatched)]),
+					'(UID BODY.PEEK[])'
+				)
+
+				# Pass each one to its handler, in the order they arrived
+				lSeen = []
+				for iUID, sRaw, sResponse in sorted(_fetched(lData), key=lambda t: t[0]):
+					sCron, fHandler = dMatched[iUID]
+					sField = 'failed:%d' % iUID
+
+					try:
+						fHandler(Email.parse_message(sRaw))
+						lSeen.append(str(iUID))
+						self.redis.hdel(self.key, sField)
+
+					# If it failed, count it, and unless it's failed too many
+					#	times, hold the mark before it
+					except Exception as e:
+						iAttempts = self.redis.hincrby(self.key, sField, 1)
+						if iAttempts < _RETRIES and iBlocked is None:
+							iBlocked = iUID
+						emailError('Mail Ingest Failed', '%s, attempt %d of %d%s\n\n%s\n\n%s\n\n%s' % (
+							sCron, iAttempts, _RETRIES,
+							iAttempts >= _RETRIES and ', giving up' or '',
+							', '.join([str(s) for s in e.args]),
+							traceback.format_exc(),
+							sRaw.decode('utf-8', 'replace')
+						))
+
+				# Mark the handled ones as read
+				if lSeen:
+					self.server.uid('STORE', ','.join(lSeen), '+FLAGS', '(\\Seen)')
+					iHandled += len(lSeen)
+
+			# Move the mark past the batch, or up to the first message that
+			#	needs to be tried again
+			iMark = iBlocked is None and lBatch[-1] or iBlocked - 1
+			if iMark > self.uid:
+				self.uid = iMark
+				self.redis.hset(self.key, 'uid', self.uid)
+
+		# Forget the attempts of anything that's now behind the mark
+		lOld = [
+			s for s in self.redis.hkeys(self.key)
+			if s.startswith(b'failed:') and int(s[7:]) <= self.uid
+		]
+		if lOld:
+			self.redis.hdel(self.key, *lOld)
+
+		# Return the number handled
+		return iHandled
+
+	def _ready(self, timeout):
+		"""Ready
+
+		Returns whether there's something to read, checking what imaplib has
+		already buffered before waiting up to timeout seconds on the socket.
+		The buffer is checked by peeking with the socket set to non-blocking,
+		so an empty buffer never blocks and anything already on the socket,
+		or decrypted by SSL, is pulled into it
+
+		Arguments:
+			timeout (float): The max seconds to wait on the socket
+
+		Returns:
+			bool
+		"""
+
+		# Check the buffer without blocking
+		oSock = self.server.socket()
+		fTimeout = oSock.gettimeout()
+		oSock.setblocking(False)
+		try:
+			if self.server.file.peek(1):
+				return True
+		except (BlockingIOError, ssl.SSLWantReadError):
+			pass
+		finally:
+			oSock.settimeout(fTimeout)
+
+		# Else, wait on the socket
+		lReady, _, _ = select.select([oSock], [], [], timeout)
+		return lReady and True or False
+
+	def _line(self):
+		"""Line
+
+		Reads a single line from the server while idling
+
+		Raises:
+			imaplib.IMAP4.abort
+
+		Returns:
+			bytes
+		"""
+		sLine = self.server.readline()
+		if not sLine:
+			raise imaplib.IMAP4.abort('Connection closed during IDLE')
+		return sLine
+
+	def idle(self):
+		"""Idle
+
+		Waits for the server to tell us about new mail, or for the idle period
+		to end, whichever comes first. imaplib has no IDLE in this version of
+		Python, so the command is sent and read directly on the connection
+
+		Returns:
+			None
+		"""
+
+		# Start idling, an untagged response can come before the server
+		#	confirms, so keep it in mind
+		sTag = self.server._new_tag()
+		self.server.tagged_commands.pop(sTag, None)
+		self.server.send(b'%s IDLE\r\n' % sTag)
+		bNew = False
+		while True:
+			sLine = self._line()
+			if sLine.startswith(b'+'):
+				break
+			if sLine.startswith(sTag):
+				raise imaplib.IMAP4.error('IDLE refused: %s' % sLine.decode('utf-8', 'replace'))
+			if b'EXISTS' in sLine:
+				bNew = True
+
+		# Wait for a message, a second at a time so we can stop. Every line
+		#	already received is read before waiting on the socket again
+		fEnd = time() + self.idleFor
+		while not bNew and _mbRunning and time() < fEnd:
+			if self._ready(1):
+				bNew = b'EXISTS' in self._line()
+
+		# Stop idling and read up to the end of the command
+		self.server.send(b'DONE\r\n')
+		while not self._line().startswith(sTag):
+			pass
+
+	def wait(self):
+		"""Wait
+
+		Idles if the server supports it, else sleeps for the poll period, a
+		second at a time so we can stop, and checks the connection is alive
+
+		Returns:
+			None
+		"""
+
+		# If the server supports IDLE
+		if 'IDLE' in self.server.capabilities:
+			self.idle()
+
+		# Else, poll
+		else:
+			fEnd = time() + self.poll
+			while _mbRunning and time() < fEnd:
+				sleep(1)
+			self.server.noop()
+
+def stop(signum, frame):
+	"""Stop
+
+	Signal handler that lets the current batch finish before exiting
+
+	Returns:
+		None
+	"""
+	global _mbRunning
+	_mbRunning = False
+
+def run():
+	"""Run
+
+	Connects to the mailbox and handles new mail as it arrives until told to
+	stop. If the connection is lost it's remade, waiting longer each time it
+	fails, up to 5 minutes
+
+	Returns:
+		bool
+	"""
+
+	# Only one ingester at a time
+	if isRunning('mail_ingest'):
+		print('Mail ingest already running')
+		return True
+
+	# Connect to Redis to keep the mark
+	oRedis = StrictRedis(**Conf.get(('redis', 'primary'), {
+		"host": "localhost",
+		"port": 6379,
+		"db": 0
+	}))
+
+	# Create the ingester
+	oIngester = Ingester(
+		Conf.get(('email', 'imap')),
+		Conf.get(('email', 'ingest'), {}),
+		oRedis
+	)
+
+	# Stop cleanly on TERM and INT
+	signal.signal(signal.SIGTERM, stop)
+	signal.signal(signal.SIGINT, stop)
+
+	# Loop until we're told to stop
+	iBackoff = 1
+	while _mbRunning:
+
+		try:
+
+			# Connect and handle anything that came in while we were away
+			oIngester.connect()
+			iBackoff = 1
+			print('Mail ingest connected, %d handled' % oIngester.fetch())
+
+			# Wait for new mail and handle it
+			while _mbRunning:
+				oIngester.wait()
+				iHandled = oIngester.fetch()
+				if iHandled:
+					print('Mail ingest %d handled' % iHandled)
+
+		# If we lost the connection, or it stopped responding, wait a moment
+		#	before trying again
+		except (imaplib.IMAP4.error, socket.timeout, OSError) as e:
+			print('Mail ingest error: %s, reconnecting in %ds' % (str(e), iBackoff))
+			oIngester.close()
+			fEnd = time() + iBackoff
+			while _mbRunning and time() < fEnd:
+				sleep(1)
+			iBackoff = min(iBackoff * 2, 300)
+
+	# Close the connection
+	oIngester.close()
+
+	# Return OK
+	return True
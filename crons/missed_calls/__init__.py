@@ -27,6 +27,19 @@ from crons import emailError, isRunning
 # Local imports
 from . import signia
 
+def handle(email):
+	"""Handle
+
+	Called by the mail ingester for each missed call email from Signia
+
+	Arguments:
+		email (dict): The email as returned by Email.parse_message
+
+	Returns:
+		None
+	"""
+	process([signia.parse_one(email['message'])])
+
 def process(data):
 	"""Process
 
@@ -53,6 +53,31 @@ def convert_date(val):
 		lDate[1]
 	)
 
+def parse_one(message):
+	"""Parse One
+
+	Parses the data out of a single missed call email
+
+	Arguments:
+		message (email.message.Message): The email
+
+	Returns:
+		dict
+	"""
+
+	# Find the info we need in the payload
+	lMatch = reEmail.search(message.get_payload())
+
+	# Return the data
+	return {
+		"date": convert_date(lMatch.group(1)),
+		"time": lMatch.group(2),
+		"type": lMatch.group(3),
+		"url": lMatch.group(4),
+		"from": lMatch.group(5),
+		"to": lMatch.group(6)
+	}
+
 def parse(server):
 	"""Parse
 
@@ -91,18 +116,8 @@ def parse(server):
 
 			try:
 
-				# Find the info we need in the payload
-				lMatch = reEmail.search(oMsg.get_payload())
-
-				# Store the data in the return var
-				lRet.append({
-					"date": convert_date(lMatch.group(1)),
-					"time": lMatch.group(2),
-					"type": lMatch.group(3),
-					"url": lMatch.group(4),
-					"from": lMatch.group(5),
-					"to": lMatch.group(6)
-				})
+				# Parse the message and store the data in the return var
+				lRet.append(parse_one(oMsg))
 
 				# Mark message as read
 				server.store(sID, '+FLAGS', '\Seen')
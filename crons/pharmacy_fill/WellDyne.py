@@ -13,7 +13,6 @@ __created__		= "2020-08-02"
 
 # Python imports
 import csv
-import io
 import time
 
 # Pip imports
@@ -28,35 +27,250 @@ from records.welldyne import Eligibility, RxNumber, Trigger
 # Local imports
 from crons.shared import Allergies
 
+_CHUNK = 32768
+"""The bytes buffered before each write to the sFTP"""
+
+class Layout(object):
+	"""Layout
+
+	Describes the fields of a WellDyne file once, their names, widths, and
+	where their values come from, so the same spec can be used to write CSV
+	rows or fixed width lines. The fixed width format is compiled once, with
+	constant fields already padded into it
+	"""
+
+	def __init__(self, fields):
+		"""Constructor
+
+		Compiles the fields
+
+		Arguments:
+			fields (tuple[]): The name, width, and value of each field. The
+				value is either a constant str, or a function that takes the
+				data and returns a str. A width of 0 means the field is never
+				padded or cut
+
+		Returns:
+			Layout
+		"""
+
+		# Store the names and the value getters
+		self.names = [t[0] for t in fields]
+		self._getters = [
+			callable(t[2]) and t[2] or (lambda d, s=t[2]: s)
+			for t in fields
+		]
+
+		# Compile the fixed width format and the getters it needs
+		lFormat = []
+		self._fixed = []
+		for sName, iWidth, mValue in fields:
+			if callable(mValue):
+				lFormat.append(iWidth and ('%%-%d.%ds' % (iWidth, iWidth)) or '%s')
+				self._fixed.append(mValue)
+			else:
+				sValue = iWidth and mValue[0:iWidth].ljust(iWidth) or mValue
+				lFormat.append(sValue.replace('%', '%%'))
+		self._format = ''.join(lFormat)
+
+	def line(self, data):
+		"""Line
+
+		Returns the data as a single fixed width line
+
+		Arguments:
+			data (dict): The data to get the values from
+
+		Returns:
+			str
+		"""
+		return self._format % tuple([f(data) for f in self._fixed])
+
+	def values(self, data):
+		"""Values
+
+		Returns the data as a list of values, one per field
+
+		Arguments:
+			data (dict): The data to get the values from
+
+		Returns:
+			str[]
+		"""
+		return [f(data) for f in self._getters]
+
+def dateDigits(date):
+	"""Date Digits
+
+	Returns just the digits of a date
+
+	Arguments:
+		date (str): The date as a string
+
+	Returns:
+		str
+	"""
+	return '%s%s%s' % (date[0:4], date[5:7], date[8:10])
+
+ELIGIBILITY = Layout([
+	('Group ID', 15, 'ED'),
+	('Member ID', 18, lambda d: str(d['customerId']).zfill(6)),
+	('Person code', 2, '00'),
+	('Relationship', 1, '1'),
+	('Last Name', 25, lambda d: d['shipLastName'] or ''),
+	('First Name', 15, lambda d: d['shipFirstName'] or ''),
+	('Middle initial', 1, ''),
+	('Sex', 1, 'M'),
+	('DOB', 8, lambda d: dateDigits(d['dob'] or '')),
+	('Multiple Birth Code', 1, ''),
+	('DurKey', 18, ''),
+	('Unique ID for Accums', 9, ''),
+	('Address 1', 40, lambda d: d['shipAddress1'] or ''),
+	('Address 2', 40, lambda d: d['shipAddress2'] or ''),
+	('Address 3', 40, ''),
+	('City', 20, lambda d: d['shipCity'] or ''),
+	('State', 2, lambda d: d['shipState'] or ''),
+	('Zip 5', 5, lambda d: d['shipPostalCode'] or ''),
+	('Zip 5 + 4', 4, ''),
+	('Zip 5 + 4 + 2', 2, ''),
+	('Phone', 10, lambda d: (d['phoneNumber'] or '')[-10:]),
+	('Family Flag', 1, ''),
+	('Family Type', 1, ''),
+	('Family ID', 18, ''),
+	('Benefit Reset Date', 8, ''),
+	('Member From Date', 8, lambda d: dateDigits(d['memberSince'])),
+	('Member Thru Date', 8, lambda d: dateDigits(d['memberThru'])),
+	('PCP ID', 15, ''),
+	('PCP ID Qualifier', 2, ''),
+	('PCP ID State', 2, ''),
+	('Alt Ins Flag', 1, ''),
+	('Alt Ins Code', 10, ''),
+	('Alt Ins From Date', 8, ''),
+	('Alt Ins Thru Date', 8, ''),
+	('Unique Patient ID', 18, ''),
+	('Diagnosis Code 1', 20, ''),
+	('Diagnosis Code 1 From Date', 8, ''),
+	('Diagnosis Code 1 Thru Date', 8, ''),
+	('Qualifier 1', 2, ''),
+	('Diagnosis Code 2', 20, ''),
+	('Diagnosis Code 2 From Date', 8, ''),
+	('Diagnosis Code 2 Thru Date', 8, ''),
+	('Qualifier 2', 2, ''),
+	('Diagnosis Code 3', 20, ''),
+	('Diagnosis Code 3 From Date', 8, ''),
+	('Diagnosis Code 3 Thru Date', 8, ''),
+	('Qualifier 3', 2, ''),
+	('E-mail address', 50, lambda d: d['emailAddress'] or ''),
+	('ID Card Template', 11, '')
+])
+"""The fixed width layout of the eligibility file"""
+
+TRIGGER = Layout([
+	('Type', 0, lambda d: d['type'] or ''),
+	('Medication (Name + Strength)', 0, lambda d: d['medication'] or ''),
+	('Prescription Number', 0, lambda d: str(d['rx']) or ''),
+	('Patient First Name', 0, lambda d: d['first'] or ''),
+	('Patient Last Name', 0, lambda d: d['last'] or ''),
+	('Patient Date of Birth', 0, lambda d: d['dob'] or ''),
+	('Address', 0, lambda d: d['address1'] or ''),
+	('Address #2', 0, lambda d: d['address2'] or ''),
+	('City', 0, lambda d: d['city'] or ''),
+	('State', 0, lambda d: d['state'] or ''),
+	('Patient Zip Code', 0, lambda d: d['postalCode'] or ''),
+	('Member ID Number', 0, lambda d: d['crm_id'].zfill(6)),
+	('Allergies', 0, Allergies.fetch)
+])
+"""The columns of the trigger file"""
+
+def sftpUpload(filename, write):
+	"""sFTP Upload
+
+	Opens the file on WellDyne's sFTP and passes it to write to fill. Writes
+	are buffered and sent in chunks as the file is filled, so nothing has to
+	be generated in full beforehand. On an SSH error the whole upload,
+	including the call to write, is tried again, up to three times
+
+	Arguments:
+		filename (str): The name of the file, without the folder
+		write (callable): Called with the open remote file
+
+	Returns:
+		None
+	"""
+
+	# Get the sFTP config
+	dSFTP = DictHelper.clone(Conf.get(('welldyne', 'sftp')))
+
+	# Pull off the subdirectory if there is one
+	sFolder = dSFTP.pop('folder', None)
+	if sFolder:
+		filename = '%s/%s' % (sFolder, filename)
+
+	# Attempt several times before quitting
+	iCount = 0
+	while True:
+
+		# Write the file straight to the sFTP
+		try:
+			with pysftp.Connection(**dSFTP) as oCon:
+				with oCon.open(filename, 'w', bufsize=_CHUNK) as oFile:
+					oFile.set_pipelined(True)
+					write(oFile)
+			break
+		except paramiko.ssh_exception.SSHException as e:
+			iCount += 1
+			if iCount == 3:
+				raise e
+			time.sleep(5)
+
 class TriggerFile(object):
 	"""Trigger File
 
 	Handles generating a file to upload to WellDyne's sFTP
 	"""
 
-	def __init__(self):
+	def __init__(self, batch=1):
 		"""Constructor
 
 		Initialises the instance
 
 		Arguments:
-			period (str): The time period of the day to generate the files for
+			batch (uint): The number of lines to collect before looking up
+				their previous triggers and RX numbers, and storing them, all
+				at once. 1 resolves and stores each line as it's added
 
 		Returns:
 			TriggerFile
 		"""
 
-		# Init the lines for the file
+		# Init the lines for the file, and the ones waiting to be resolved
 		self.lines = []
+		self._pending = []
+		self._batch = max(batch, 1)
 
 		# Generate the since and thru dates
 		self.since = arrow.get().format('YYYY-MM-DD 00:00:00')
 		self.thru = arrow.get().shift(days=15).format('YYYY-MM-DD 00:00:00')
 
+	@staticmethod
+	def _key(data):
+		"""Key
+
+		Returns the customer / medication pair previous triggers are found by
+
+		Arguments:
+			data (dict): The data of the line
+
+		Returns:
+			tuple
+		"""
+		return (data['crm_type'], str(data['crm_id']), data['medication'])
+
 	def add(self, data, existing=None):
 		"""Add
 
-		Adds a line to the report
+		Adds a line to the report. The line is resolved and stored once the
+		batch is full, or the file is uploaded
 
 		Arguments:
 			data (dict): The data needed to make the line
@@ -66,113 +280,186 @@ class TriggerFile(object):
 			None
 		"""
 
-		# Zero fill the member ID
-		sMemberID = data['crm_id'].zfill(6)
-
-		# See if we have a previous trigger for this customer and medication
-		dLastTrigger = Trigger.filter({
-			"crm_type": data['crm_type'],
-			"crm_id": data['crm_id'],
-			"crm_order": {"neq": data['crm_order']},
-			"medication": data['medication']
-		}, raw=['rx_id'], orderby=[('_created', 'DESC')], limit=1)
-
-		# If it's an initial
-		if data['type'] == 'initial':
+		# Add it to the pending lines, and resolve them if the batch is full
+		self._pending.append((data, existing))
+		if len(self._pending) >= self._batch:
+			self.flush()
 
-			# If we have one, and the rx_id matches the ds_id, it's a new order
-			#	but not a new prescription
-			if dLastTrigger and dLastTrigger['rx_id'] == str(data['ds_id']):
+	def flush(self):
+		"""Flush
 
-				# Overwrite the type
-				data['type'] = 'refill'
+		Resolves the pending lines, in the order they were added, using one
+		query for all of their previous triggers and one for all of their RX
+		numbers, then stores their eligibility and triggers using multi-row
+		statements. Triggers stored by earlier lines are tracked in memory so
+		later lines in the same batch see them, exactly as if each line had
+		been stored before the next was looked up
 
-		# If the type is refill
-		if data['type'] == 'refill':
-
-			# If we have one, and the rx_id does not matches the ds_id, it's
-			#	a recurring order, but the prescription has changed
-			if dLastTrigger and dLastTrigger['rx_id'] != str(data['ds_id']):
+		Returns:
+			None
+		"""
 
-				# Overwrite the type
-				data['type'] = 'initial'
+		# If there's nothing to do
+		if not self._pending:
+			return
 
-			# Else, a legitimate refill
-			else:
+		# Take the pending lines
+		lPending, self._pending = self._pending, []
 
-				# Try to find the customer's RX number
-				dRx = RxNumber.filter({
-					"member_id": sMemberID
-				}, raw=['number'], limit=1)
+		# Fetch the triggers for every customer / medication pair
+		dPrevious = Trigger.previousByMedication([
+			self._key(data) for data,existing in lPending
+		])
 
-				# If it exists, add it to the trigger
-				if dRx:
-					data['rx'] = dRx['number']
+		# Store the triggers by ID so updates can be tracked, fetching any
+		#	existing trigger that isn't already among them
+		dTriggers = {d['_id']:d for l in dPrevious.values() for d in l}
+		lMissing = list(set([
+			existing for data,existing in lPending
+			if existing and existing not in dTriggers
+		]))
+		if lMissing:
+			for d in Trigger.get(lMissing, raw=[
+				'_id', '_created', 'crm_type', 'crm_id', 'crm_order',
+				'medication', 'rx_id'
+			]):
+				dTriggers[d['_id']] = d
+
+		# Fetch the RX numbers of every member, keeping the first found for
+		#	each
+		dRx = {}
+		for d in RxNumber.filter({
+			"member_id": list(set([data['crm_id'].zfill(6) for data,existing in lPending]))
+		}, raw=['member_id', 'number']):
+			if d['member_id'] not in dRx:
+				dRx[d['member_id']] = d['number']
 
 		# Generate timestamp
 		sDT = arrow.get().format('YYYY-MM-DD HH:mm:ss')
 
-		# Create or update the eligibility
-		oElig = Eligibility({
-			"customerId": data['crm_id'],
-			"memberSince": self.since,
-			"memberThru": self.thru,
-			"createdAt": sDT,
-			"updatedAt": sDT
-		})
-		oElig.create(conflict=('memberThru', 'updatedAt'))
-
-		# Create the CSV line
-		lLine = [
-			data['type'] or '',
-			data['medication'] or '',
-			str(data['rx']) or '',
-			data['first'] or '',
-			data['last'] or '',
-			data['dob'] or '',
-			data['address1'] or '',
-			data['address2'] or '',
-			data['city'] or '',
-			data['state'] or '',
-			data['postalCode'] or '',
-			sMemberID,
-			Allergies.fetch(data)
-		];
-
-		print(lLine)
-
-		# If we have an existing trigger ID
-		if existing:
-
-			# Find the trigger
-			oTrigger = Trigger.get(existing)
-
-			# Update the medication, rx, type, and raw, then save
-			oTrigger['medication'] = data['medication']
-			oTrigger['rx_id'] = str(data['ds_id'])
-			oTrigger['type'] = data['type']
-			oTrigger['raw'] = ','.join(lLine)
-			oTrigger.save()
-
-		# Else create and store a new trigger
-		else:
-
-			# Create a trigger instance
-			oTrigger = Trigger({
-				"crm_type": data['crm_type'],
-				"crm_id": data['crm_id'],
-				"crm_order": data['crm_order'],
-				"medication": data['medication'],
-				"rx_id": str(data['ds_id']),
-				"type": data['type'],
-				"raw": ','.join(lLine)
+		# Init the records to store
+		lEligibility = []
+		lCreate = []
+		lUpdate = []
+
+		# Go through each pending line
+		for data, existing in lPending:
+
+			# Zero fill the member ID
+			sMemberID = data['crm_id'].zfill(6)
+
+			# See if we have a previous trigger for this customer and medication
+			tKey = self._key(data)
+			dLastTrigger = None
+			for d in dPrevious.get(tKey, []):
+				if str(d['crm_order']) != str(data['crm_order']):
+					dLastTrigger = d
+					break
+
+			# If it's an initial
+			if data['type'] == 'initial':
+
+				# If we have one, and the rx_id matches the ds_id, it's a new
+				#	order but not a new prescription
+				if dLastTrigger and dLastTrigger['rx_id'] == str(data['ds_id']):
+
+					# Overwrite the type
+					data['type'] = 'refill'
+
+			# If the type is refill
+			if data['type'] == 'refill':
+
+				# If we have one, and the rx_id does not matches the ds_id, it's
+				#	a recurring order, but the prescription has changed
+				if dLastTrigger and dLastTrigger['rx_id'] != str(data['ds_id']):
+
+					# Overwrite the type
+					data['type'] = 'initial'
+
+				# Else, a legitimate refill, if the customer's RX number
+				#	exists, add it to the trigger
+				elif sMemberID in dRx:
+					data['rx'] = dRx[sMemberID]
+
+			# Create or update the eligibility
+			lEligibility.append({
+				"customerId": data['crm_id'],
+				"memberSince": self.since,
+				"memberThru": self.thru,
+				"createdAt": sDT,
+				"updatedAt": sDT
 			})
 
-			# Create the record in the DB
-			oTrigger.create(conflict='replace')
+			# Create the CSV line
+			lLine = TRIGGER.values(data)
+
+			# If we have an existing trigger ID
+			if existing:
+
+				# Update the medication, rx, type, and raw
+				lUpdate.append({
+					"_id": existing,
+					"medication": data['medication'],
+					"rx_id": str(data['ds_id']),
+					"type": data['type'],
+					"raw": ','.join(lLine)
+				})
+
+				# If we know the trigger, move it to its new pair, keeping the
+				#	pair's triggers newest first
+				if existing in dTriggers:
+					dTrigger = dTriggers[existing]
+					tOld = self._key(dTrigger)
+					if tOld in dPrevious and dTrigger in dPrevious[tOld]:
+						dPrevious[tOld].remove(dTrigger)
+					dTrigger['medication'] = data['medication']
+					dTrigger['rx_id'] = str(data['ds_id'])
+					lTriggers = dPrevious.setdefault(self._key(dTrigger), [])
+					i = 0
+					while i < len(lTriggers) and \
+						lTriggers[i]['_created'] >= dTrigger['_created']:
+						i += 1
+					lTriggers.insert(i, dTrigger)
+
+			# Else create a new trigger
+			else:
 
-		# Add the line to the report
-		self.lines.append(lLine);
+				# Add it to the records to create
+				lCreate.append({
+					"crm_type": data['crm_type'],
+					"crm_id": data['crm_id'],
+					"crm_order": data['crm_order'],
+					"medication": data['medication'],
+					"rx_id": str(data['ds_id']),
+					"type": data['type'],
+					"raw": ','.join(lLine)
+				})
+
+				# Make it the newest trigger for the pair, replacing any for
+				#	the same order
+				lTriggers = dPrevious.setdefault(tKey, [])
+				lTriggers[:] = [
+					d for d in lTriggers
+					if str(d['crm_order']) != str(data['crm_order'])
+				]
+				lTriggers.insert(0, {
+					"_id": None,
+					"_created": int(time.time()),
+					"crm_type": data['crm_type'],
+					"crm_id": str(data['crm_id']),
+					"crm_order": data['crm_order'],
+					"medication": data['medication'],
+					"rx_id": str(data['ds_id'])
+				})
+
+			# Add the line to the report
+			self.lines.append(lLine)
+
+		# Store the eligibility and the triggers, updates first so a new
+		#	trigger replaces an updated one the same way it did line by line
+		Eligibility.upsertMany(lEligibility)
+		Trigger.updateMany(['medication', 'rx_id', 'type', 'raw'], lUpdate)
+		Trigger.upsertMany(lCreate)
 
 	def upload(self, file_time):
 		"""Upload
@@ -187,67 +474,18 @@ class TriggerFile(object):
 			None
 		"""
 
-		# Create a new temp file
-		oFile = io.StringIO()
+		# Resolve and store anything still pending
+		self.flush()
 
-		# Create a new CSV writer
-		oCSV = csv.writer(oFile)
+		# Writes the header and each line to the file
+		def write(oFile):
+			oCSV = csv.writer(oFile)
+			oCSV.writerow(TRIGGER.names)
+			oCSV.writerows(self.lines)
 
-		# Add the header
-		oCSV.writerow([
-			'Type',
-			'Medication (Name + Strength)','Prescription Number','Patient First Name',
-			'Patient Last Name','Patient Date of Birth','Address','Address #2',
-			'City','State','Patient Zip Code','Member ID Number','Allergies'
-		])
-
-		# Write each record to the file
-		for l in self.lines:
-			oCSV.writerow(l)
-
-		# Set the file to the beginning
-		oFile.flush()
-		oFile.seek(0)
-
-		# Generate the filename with the current date
+		# Generate the filename with the current date and upload the file
 		sDate = '%s%s' % (arrow.get().format('YYYYMMDD'), file_time)
-		sFilename = 'TRIGGER%s.TXT' % sDate;
-
-		# Get the sFTP config
-		dSFTP = DictHelper.clone(Conf.get(('welldyne', 'sftp')))
-
-		# Pull off the subdirectory if there is one
-		sFolder = dSFTP.pop('folder', None)
-		if sFolder:
-			sFilename = '%s/%s' % (sFolder, sFilename)
-
-		# Attempt several times before quitting
-		iCount = 0
-		while True:
-
-			# Upload the file to the sFTP
-			try:
-				with pysftp.Connection(**dSFTP) as oCon:
-					oCon.putfo(oFile, sFilename, confirm=False)
-				break
-			except paramiko.ssh_exception.SSHException as e:
-				iCount += 1
-				if iCount == 3:
-					raise e
-				time.sleep(5)
-
-def dateDigits(date):
-	"""Date Digits
-
-	Returns just the digits of a date
-
-	Arguments:
-		date (str): The date as a string
-
-	Returns:
-		str
-	"""
-	return '%s%s%s' % (date[0:4], date[5:7], date[8:10])
+		sftpUpload('TRIGGER%s.TXT' % sDate, write)
 
 def eligibilityUpload(file_time):
 	"""Eligibility Upload
@@ -262,91 +500,15 @@ def eligibilityUpload(file_time):
 		None
 	"""
 
-	# Find all records that have a member through date
-	print('Fetching eligible members')
-	lRecords = Eligibility.withCustomerData()
-
-	# Init the list of lines
-	lLines = []
-
-	# Go through each record and generate the line
-	print('Generating eligibility file')
-	for d in lRecords:
-		lLines.append(''.join([
-			'ED'.ljust(15),										# Group ID
-			str(d['customerId']).zfill(6).ljust(18),			# Member ID
-			'00',												# Person code
-			'1',												# Relationship
-			(d['shipLastName'] or '')[0:25].ljust(25),			# Last Name
-			(d['shipFirstName'] or '')[0:15].ljust(15),			# First Name
-			' ',												# Middle initial
-			'M',												# Sex
-			dateDigits(d['dob'] or '').ljust(8),			# DOB
-			' ',												# Multiple Birth Code
-			'                  ',								# DurKey
-			'         ',										# Unique ID for Accums
-			(d['shipAddress1'] or '')[0:40].ljust(40),			# Address 1
-			(d['shipAddress2'] or '')[0:40].ljust(40),			# Address 2
-			'                                        ',			# Address 3
-			(d['shipCity'] or '')[0:20].ljust(20),				# City
-			(d['shipState'] or '')[0:2].ljust(2),				# State
-			(d['shipPostalCode'] or '')[0:5].ljust(5),			# Zip 5
-			'    ',												# Zip 5 + 4
-			'  ',												# Zip 5 + 4 + 2
-			(d['phoneNumber'] or '')[-10:].ljust(10),			# Phone
-			' ',												# Family Flag
-			' ',												# Family Type
-			'                  ',								# Family ID
-			'        ',											# Benefit Reset Date
-			dateDigits(d['memberSince']).ljust(8),		# Member From Date
-			dateDigits(d['memberThru']).ljust(8),			# Member Thru Date
-			'               ',									# PCP ID
-			'  ',												# PCP ID Qualifier
-			'  ',												# PCP ID State
-			' ',												# Alt Ins Flag
-			'          ',										# Alt Ins Code
-			'        ',											# Alt Ins From Date
-			'        ',											# Alt Ins Thru Date
-			'                  ',								# Unique Patient ID
-			'                    ',								# Diagnosis Code 1
-			'        ',											# Diagnosis Code 1 From Date
-			'        ',											# Diagnosis Code 1 Thru Date
-			'  ',												# Qualifier 1
-			'                    ',								# Diagnosis Code 2
-			'        ',											# Diagnosis Code 2 From Date
-			'        ',											# Diagnosis Code 2 Thru Date
-			'  ',												# Qualifier 2
-			'                    ',								# Diagnosis Code 3
-			'        ',											# Diagnosis Code 3 From Date
-			'        ',											# Diagnosis Code 3 Thru Date
-			'  ',												# Qualifier 3
-			(d['emailAddress'] or '')[0:50].ljust(50),			# E-mail address
-			'           '										# ID Card Template
-	]))
-
-	# Generate the filename with the current date
-	sDate = '%s%s' % (arrow.get().format('YYYYMMDD'), file_time)
-	sFilename = 'RWTMEXCEL%s.TXT' % sDate;
-
-	# Get the sFTP config
-	dSFTP = DictHelper.clone(Conf.get(('welldyne', 'sftp')))
-
-	# Pull off the subdirectory if there is one
-	sFolder = dSFTP.pop('folder', None)
-	if sFolder:
-		sFilename = '%s/%s' % (sFolder, sFilename)
-
-	# Attempt several times before quitting
-	iCount = 0
-	while True:
+	# Writes each eligible member to the file as they're read from the DB
+	def write(oFile):
+		print('Generating eligibility file')
+		bFirst = True
+		for d in Eligibility.withCustomerDataStream():
+			if bFirst: bFirst = False
+			else: oFile.write('\n')
+			oFile.write(ELIGIBILITY.line(d))
 
-		# Upload the file to the sFTP
-		try:
-			with pysftp.Connection(**dSFTP) as oCon:
-				oCon.putfo(io.StringIO('\n'.join(lLines)), sFilename, confirm=False)
-			break
-		except paramiko.ssh_exception.SSHException as e:
-			iCount += 1
-			if iCount == 3:
-				raise e
-			time.sleep(5)
+	# Generate the filename with the current date and upload the file
+	sDate = '%s%s' % (arrow.get().format('YYYYMMDD'), file_time)
+	sftpUpload('RWTMEXCEL%s.TXT' % sDate, write)
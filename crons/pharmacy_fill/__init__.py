@@ -12,11 +12,12 @@ __email__		= "bast@maleexcel.com"
 __created__		= "2020-08-01"
 
 # Python imports
+from time import time
 import traceback
 
 # Pip imports
 import arrow
-from RestOC import Services
+from RestOC import Conf, Services
 
 # Service imports
 from services.konnektive import Konnektive
@@ -50,6 +51,9 @@ def _fill():
 	# Fetch all the manual fills
 	lFills = FillRecord.get()
 
+	# Fetch their upstream data ahead of time
+	PharmacyFill.prefetch(lFills)
+
 	# Go through each record
 	for o in lFills:
 
@@ -125,6 +129,9 @@ def _fillErrors():
 		"ready": True
 	})
 
+	# Fetch their upstream data ahead of time
+	PharmacyFill.prefetch(lFillErrors)
+
 	# Go through each record
 	for o in lFillErrors:
 
@@ -239,23 +246,25 @@ def _transactions(period):
 
 		print('Fetching %s' % sTxnType)
 
-		# Fetch the records from Konnektive
-		lTransactions = oKnk._request('transactions/query', {
+		# Fetch the records from Konnektive, skipping any HRT campaigns
+		lTransactions = [d for d in oKnk._requestIter('transactions/query', {
 			"responseType": "SUCCESS",
 			"txnType": sTxnType,
 			"startDate": sStartDate,
 			"startTime": sStartTime,
 			"endDate": sEndDate,
 			"endTime": sEndTime
-		});
+		}) if 'HRT' not in d['campaignName']]
+
+		# Fetch their upstream data ahead of time
+		PharmacyFill.prefetch([{
+			"crm_id": d['customerId'],
+			"crm_order": d['orderId']
+		} for d in lTransactions])
 
 		# Go through each record
 		for d in lTransactions:
 
-			# If the campaign name contains HRT, skip it
-			if 'HRT' in d['campaignName']:
-				continue
-
 			print('\tWorking on %d...' % d['customerId'])
 
 			# Try to process it
@@ -320,6 +329,9 @@ def _welldyneNeverStarted():
 		"ready": True
 	})
 
+	# Fetch their upstream data ahead of time
+	PharmacyFill.prefetch(lNeverStarted)
+
 	# Go through each record
 	for d in lNeverStarted:
 
@@ -387,6 +399,9 @@ def _welldyneOutbound():
 		"ready": True
 	})
 
+	# Fetch their upstream data ahead of time
+	PharmacyFill.prefetch(lOutbound)
+
 	# Go through each record
 	for o in lOutbound:
 
@@ -440,7 +455,7 @@ def _welldyneOutbound():
 	# Return the list to move
 	return lOutboundToMove
 
-def run(period=None):
+def run(period=None, workers=None):
 	"""Run
 
 	Fetches all transactions, outbound, and fill errors for the given time
@@ -448,6 +463,8 @@ def run(period=None):
 
 	Arguments:
 		period (str): The time period of the day to generate the files for
+		workers (str): Optional, the number of threads used to fetch
+						Konnektive and DoseSpot data ahead of processing
 
 	Returns:
 		bool
@@ -476,30 +493,46 @@ def run(period=None):
 			return False
 
 		# Init the PharmacyFill module
-		PharmacyFill.initialise()
+		PharmacyFill.initialise(workers and int(workers) or 1)
 
 		# Create a new instance of the WellDyne Trigger File
-		__moTriggers = WellDyne.TriggerFile()
+		__moTriggers = WellDyne.TriggerFile(
+			Conf.get(('welldyne', 'trigger_batch'), 500)
+		)
 
 		# Create a list of generic pharmacies we email reports to
 		__mdReports = {}
 
+		# Keep track of how long each stage takes
+		lTimings = []
+		fStart = time()
+
 		# Run the transactions
 		_transactions(period)
+		lTimings.append(('transactions', time() - fStart))
 
 		# Run the manual fills
+		fStart = time()
 		lFills = _fill()
+		lTimings.append(('fill', time() - fStart))
 
 		# Run the outbound
+		fStart = time()
 		lOutboundToMove = _welldyneOutbound()
+		lTimings.append(('outbound', time() - fStart))
 
 		# Run the never started
+		fStart = time()
 		lNeverStarted = _welldyneNeverStarted()
+		lTimings.append(('never started', time() - fStart))
 
 		# Run the pharmacy fill errors
+		fStart = time()
 		lErrorsToDelete = _fillErrors()
+		lTimings.append(('fill errors', time() - fStart))
 
 		# Upload the WellDyne trigger file
+		fStart = time()
 		__moTriggers.upload(sFileTime)
 
 		# Go through each of the generic pharmacy emails
@@ -507,9 +540,24 @@ def run(period=None):
 
 			# Send the email
 			oEmail.send(sPharmacy, sEmailFile)
+		lTimings.append(('reports', time() - fStart))
 
 		# Regenerate the eligibility
+		fStart = time()
 		WellDyne.eligibilityUpload(sFileTime)
+		lTimings.append(('eligibility', time() - fStart))
+
+		# Print the timings
+		print('Timings (%d workers):' % (workers and int(workers) or 1))
+		for sStage,fSeconds in lTimings:
+			print('\t%s: %.2fs' % (sStage, fSeconds))
+
+		# Print the upstream calls made and avoided
+		print('Upstream calls:')
+		for sUpstream,dStats in PharmacyFill.stats().items():
+			print('\t%s: %d lookups, %d calls, %d avoided' % (
+				sUpstream, dStats['lookups'], dStats['calls'], dStats['avoided']
+			))
 
 		# Go through the outbound to move to sent
 		for o in lOutboundToMove:
@@ -0,0 +1,65 @@
+# coding=utf8
+"""Queue Counts
+
+Checks the materialized pending order counts against the order tables and
+rebuilds them if they've drifted, which happens when orders are added or
+changed outside of MeMS, by Konnektive imports or Memo
+
+	python -m crons queue_counts check
+	python -m crons queue_counts rebuild
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from time import time
+
+# Record imports
+from records.monolith import KtOrderQueueCount
+
+def run(action='check'):
+	"""Run
+
+	Entry point into the script
+
+	Arguments:
+		action (str): 'check' to rebuild only if the counts are off,
+			'rebuild' to rebuild regardless
+
+	Returns:
+		bool
+	"""
+
+	# If we're only checking
+	if action == 'check':
+
+		# Get the counts that don't match
+		lDiffs = KtOrderQueueCount.check()
+
+		# If they're all correct, we're done
+		if not lDiffs:
+			return True
+
+		# Print the differences
+		for t, iStored, iLive in lDiffs:
+			print('%s: stored %d, live %d' % (
+				'/'.join([str(m) for m in t]), iStored, iLive
+			))
+
+	# Else, if it's not a rebuild
+	elif action != 'rebuild':
+		print('Invalid action: %s' % action)
+		return False
+
+	# Rebuild the counts
+	fStart = time()
+	iRows = KtOrderQueueCount.rebuild()
+	print('Rebuilt %d counts in %.3fs' % (iRows, time() - fStart))
+
+	# Return OK
+	return True
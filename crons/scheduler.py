@@ -0,0 +1,186 @@
+# coding=utf8
+"""Scheduler
+
+Stays resident and runs cron modules on the schedules in
+crons.scheduler.jobs, so config, services, and templates are loaded once and
+DB and Redis connections are kept between runs
+
+	python -m crons scheduler
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import importlib
+import signal
+import traceback
+from time import sleep, time
+
+# Pip imports
+from redis import StrictRedis
+from RestOC import Conf, JSON
+
+# Cron imports
+from . import emailError, isRunning
+
+_mbRunning = True
+"""Set to False to exit once the current job is finished"""
+
+class Job(object):
+	"""Job
+
+	A single cron module and the schedule to run it on
+	"""
+
+	def __init__(self, name, conf):
+		"""Constructor
+
+		Imports the cron module and calculates the first run
+
+		Arguments:
+			name (str): The name of the job
+			conf (dict): The cron, args, every, and offset of the job
+
+		Returns:
+			Job
+		"""
+		self.name = name
+		self.args = conf.get('args', [])
+		self.every = conf['every']
+		self.offset = conf.get('offset', 0)
+		self.module = importlib.import_module('crons.%s' % conf.get('cron', name))
+		self.running = False
+		self.next = self.after(time())
+
+	def after(self, now):
+		"""After
+
+		Returns the first scheduled time after now, runs are aligned to the
+		interval the same way */5 is in a crontab
+
+		Arguments:
+			now (float): The time to start from
+
+		Returns:
+			float
+		"""
+		return ((int(now - self.offset) // self.every) + 1) * self.every + self.offset
+
+def dispatch(job, redis=None):
+	"""Dispatch
+
+	Runs the job unless it's already running, then records how long it took
+	and how it ended
+
+	Arguments:
+		job (Job): The job to run
+		redis (StrictRedis): Optional, the connection to record the run in
+
+	Returns:
+		dict
+	"""
+
+	# If it's already running, don't start it again
+	if job.running:
+		return None
+	job.running = True
+
+	# Run the job
+	fStart = time()
+	dRun = {"job": job.name, "started": int(fStart)}
+	try:
+		dRun['result'] = job.module.run(*job.args) and 'ok' or 'failed'
+	except Exception as e:
+		dRun['result'] = 'error'
+		dRun['error'] = str(e)
+		emailError('MeMS Cron Failed', '%s\n\n%s\n\n%s' % (
+			job.name,
+			', '.join([str(s) for s in e.args]),
+			traceback.format_exc()
+		))
+	finally:
+		job.running = False
+	dRun['duration'] = round(time() - fStart, 3)
+
+	# Store the last 100 runs for the job
+	if redis:
+		sKey = 'crons:runs:%s' % job.name
+		p = redis.pipeline()
+		p.lpush(sKey, JSON.encode(dRun))
+		p.ltrim(sKey, 0, 99)
+		p.execute()
+
+	# Return the run
+	return dRun
+
+def stop(signum, frame):
+	"""Stop
+
+	Signal handler that lets the current job finish before exiting
+
+	Returns:
+		None
+	"""
+	global _mbRunning
+	_mbRunning = False
+
+def run():
+	"""Run
+
+	Runs each job when it's due, one at a time as they share the same DB
+	connections. If a job runs past the next time another, or itself, was
+	due, the late job runs as soon as it can and missed runs are skipped
+	rather than queued up
+
+	Returns:
+		bool
+	"""
+
+	# Only one scheduler at a time
+	if isRunning('scheduler'):
+		print('Scheduler already running')
+		return False
+
+	# Load the jobs
+	lJobs = [
+		Job(k, d) for k,d in Conf.get(('crons', 'scheduler', 'jobs'), {}).items()
+	]
+	if not lJobs:
+		print('No jobs in crons.scheduler.jobs')
+		return False
+
+	# Connect to Redis to record runs
+	oRedis = StrictRedis(**Conf.get(('redis', 'primary'), {
+		"host": "localhost",
+		"port": 6379,
+		"db": 0
+	}))
+
+	# Stop cleanly on TERM and INT
+	signal.signal(signal.SIGTERM, stop)
+	signal.signal(signal.SIGINT, stop)
+
+	# Loop until we're told to stop
+	while _mbRunning:
+
+		# Get the job due first
+		oJob = min(lJobs, key=lambda o: o.next)
+
+		# If it's not due yet, wait for it, a second at a time so we can stop
+		fWait = oJob.next - time()
+		if fWait > 0:
+			sleep(min(fWait, 1))
+			continue
+
+		# Run it and schedule the next run
+		dRun = dispatch(oJob, oRedis)
+		oJob.next = oJob.after(time())
+		print('%s %s in %.3fs' % (oJob.name, dRun['result'], dRun['duration']))
+
+	# Return OK
+	return True
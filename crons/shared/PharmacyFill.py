@@ -12,9 +12,14 @@ __maintainer__	= "Chris Nasr"
 __email__		= "bast@maleexcel.com"
 __created__		= "2020-08-02"
 
+# Python imports
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from time import monotonic, sleep
+
 # Pip imports
 import arrow
-from RestOC import DictHelper, Services
+from RestOC import Conf, DictHelper, Services
 
 # Service includes
 from services.konnektive import Konnektive
@@ -28,21 +33,94 @@ _mdPharmacies = {}
 _moKonnektive = Konnektive()
 _moYearAgo = None
 _mo335Ago = None
+_miWorkers = 1
+_mdRates = {}
 """Variables used by the module"""
 
+# Upstream data memoized for the run
+_mdDsPatients = {}
+_mdOrders = {}
+_mdPrescriptions = {}
+"""Data fetched during the run, by customer, order, and DoseSpot patient"""
+
+# Counts of calls made and avoided
+_mdStats = {}
+_moStatsLock = threading.Lock()
+"""Upstream call stats for the run"""
+
+class _RateLimit(object):
+	"""Rate Limit
+
+	Spaces out calls from any number of threads so that no more than the given
+	number happen per second
+	"""
+
+	def __init__(self, per_second):
+		"""Constructor
+
+		Arguments:
+			per_second (uint): The max number of calls per second
+
+		Returns:
+			_RateLimit
+		"""
+		self._interval = 1.0 / per_second
+		self._lock = threading.Lock()
+		self._next = 0.0
+
+	def wait(self):
+		"""Wait
+
+		Blocks until the next call is allowed
+
+		Returns:
+			None
+		"""
+
+		# Reserve the next slot
+		with self._lock:
+			fNow = monotonic()
+			fWait = self._next - fNow
+			self._next = max(fNow, self._next) + self._interval
+
+		# Wait for it
+		if fWait > 0:
+			sleep(fWait)
+
 # Cron imports
 from crons import emailError
 
-def initialise():
+def initialise(workers=1):
 	"""Initialise
 
 	Initialises the modules by fetching any needed information
 
+	Arguments:
+		workers (uint): The number of threads used to prefetch upstream data,
+						1 means no prefetching
+
 	Returns:
 		None
 	"""
 
-	global _mdMedById, _mdMedByName, _mdPharmacies, _moKonnektive, _moYearAgo, _mo335Ago
+	global _mdMedById, _mdMedByName, _mdPharmacies, _moKonnektive, _moYearAgo, _mo335Ago, \
+			_miWorkers, _mdRates, _mdDsPatients, _mdOrders, _mdPrescriptions, _mdStats
+
+	# Reset the data and stats for the run
+	_mdDsPatients = {}
+	_mdOrders = {}
+	_mdPrescriptions = {}
+	_mdStats = {
+		k:{"lookups": 0, "calls": 0}
+		for k in ['dspatient', 'konnektive', 'dosespot']
+	}
+
+	# Store the number of workers and create the per upstream rate limits
+	_miWorkers = workers
+	_mdRates = {
+		k:_RateLimit(v)
+		for k,v in Conf.get(('crons', 'pharmacy_fill', 'rates'), {}).items() if v
+	}
 
 	# Fetch all the valid pharmacies and store them by id => name
 	_mdPharmacies = {
@@ -64,6 +142,227 @@ def initialise():
 	_moYearAgo = arrow.get().replace(hour=0, minute=0, second=0, microsecond=0).shift(years=-1)
 	_mo335Ago = arrow.get().shift(days=-333)
 
+def _count(upstream, stat):
+	"""Count
+
+	Increments one of the upstream call stats
+
+	Arguments:
+		upstream (str): The upstream, dspatient, konnektive, or dosespot
+		stat (str): The stat, lookups or calls
+
+	Returns:
+		None
+	"""
+	with _moStatsLock:
+		_mdStats[upstream][stat] += 1
+
+def _dsPatient(customer_id):
+	"""DoseSpot Patient
+
+	Returns the DoseSpot patient associated with the customer
+
+	Arguments:
+		customer_id (str): The ID of the customer
+
+	Returns:
+		dict
+	"""
+
+	# If we already have it, use it
+	_count('dspatient', 'lookups')
+	if customer_id in _mdDsPatients:
+		return _mdDsPatients[customer_id]
+
+	# Fetch the DoseSpot patientId
+	_count('dspatient', 'calls')
+	_mdDsPatients[customer_id] = DsPatient.filter({
+		"customerId": customer_id
+	}, raw=['patientId', 'dateOfBirth'], limit=1);
+
+	# Return it
+	return _mdDsPatients[customer_id]
+
+def _fetchOrder(order):
+	"""Fetch Order
+
+	Requests an order from Konnektive
+
+	Arguments:
+		order (str): The ID of the order
+
+	Returns:
+		dict[]
+	"""
+
+	# Respect the rate limit
+	if 'konnektive' in _mdRates:
+		_mdRates['konnektive'].wait()
+
+	# Count the call
+	_count('konnektive', 'calls')
+
+	# Look it up by crm_order
+	return _moKonnektive._request('order/query', {
+		"orderId": order
+	})
+
+def _fetchPrescriptions(patient_id):
+	"""Fetch Prescriptions
+
+	Requests a patient's prescriptions from the prescriptions service
+
+	Arguments:
+		patient_id (uint): The ID of the patient in DoseSpot
+
+	Returns:
+		Services.Response
+	"""
+
+	# Respect the rate limit
+	if 'dosespot' in _mdRates:
+		_mdRates['dosespot'].wait()
+
+	# Count the call
+	_count('dosespot', 'calls')
+
+	# Fetch the patient's prescriptions from dosespot
+	return Services.read('prescriptions', 'patient/prescriptions', {
+		"_internal_": Services.internalKey(),
+		"patient_id": patient_id
+	})
+
+def _order(order):
+	"""Order
+
+	Returns the order list from Konnektive
+
+	Arguments:
+		order (str): The ID of the order
+
+	Returns:
+		dict[]
+	"""
+
+	# If we already have it, use it
+	_count('konnektive', 'lookups')
+	if order in _mdOrders:
+		return _mdOrders[order]
+
+	# Else, fetch and store it
+	_mdOrders[order] = _fetchOrder(order)
+	return _mdOrders[order]
+
+def _prescriptions(patient_id):
+	"""Prescriptions
+
+	Returns the response for the patient's prescriptions
+
+	Arguments:
+		patient_id (uint): The ID of the patient in DoseSpot
+
+	Returns:
+		Services.Response
+	"""
+
+	# If we already have it, use it
+	_count('dosespot', 'lookups')
+	if patient_id in _mdPrescriptions:
+		return _mdPrescriptions[patient_id]
+
+	# Else, fetch and store it
+	_mdPrescriptions[patient_id] = _fetchPrescriptions(patient_id)
+	return _mdPrescriptions[patient_id]
+
+def prefetch(items):
+	"""Prefetch
+
+	Fetches the DoseSpot patients for every customer in the items that isn't
+	already known in one query. If initialise was given more than one worker,
+	the Konnektive orders and DoseSpot prescriptions not already known are
+	then fetched concurrently. DB access stays on the calling thread as the
+	connection can't be shared
+
+	Arguments:
+		items (dict[]): The items that will be passed to process
+
+	Returns:
+		None
+	"""
+
+	# If there's nothing to do
+	if not items:
+		return
+
+	# Get the unique customer IDs we don't have yet
+	lCustomers = list(set([
+		str(d['crm_id']) for d in items
+		if str(d['crm_id']) not in _mdDsPatients
+	]))
+
+	# If we have any
+	if lCustomers:
+
+		# Fetch all the DoseSpot patients in one query
+		_count('dspatient', 'calls')
+		for d in DsPatient.filter({
+			"customerId": lCustomers
+		}, raw=['customerId', 'patientId', 'dateOfBirth']):
+			if str(d['customerId']) not in _mdDsPatients:
+				_mdDsPatients[str(d['customerId'])] = {
+					"patientId": d['patientId'],
+					"dateOfBirth": d['dateOfBirth']
+				}
+
+		# Mark any customers without a patient so they aren't looked up again
+		for s in lCustomers:
+			if s not in _mdDsPatients:
+				_mdDsPatients[s] = None
+
+	# If we're not running concurrently
+	if _miWorkers <= 1:
+		return
+
+	# Get the unique orders and patient IDs we don't have yet
+	lOrders = list(set([
+		d['crm_order'] for d in items
+		if d['crm_order'] not in _mdOrders
+	]))
+	lPatients = list(set([
+		int(d['patientId']) for d in _mdDsPatients.values()
+		if d and d['patientId'] and int(d['patientId']) not in _mdPrescriptions
+	]))
+
+	# Fetch the orders and prescriptions on the pool
+	with ThreadPoolExecutor(max_workers=_miWorkers) as oPool:
+		dOrders = {s:oPool.submit(_fetchOrder, s) for s in lOrders}
+		dPrescriptions = {i:oPool.submit(_fetchPrescriptions, i) for i in lPatients}
+
+	# Store anything that didn't fail, failures are tried again by process
+	#	so they raise in the same place they always did
+	for k,o in dOrders.items():
+		if not o.exception():
+			_mdOrders[k] = o.result()
+	for k,o in dPrescriptions.items():
+		if not o.exception():
+			_mdPrescriptions[k] = o.result()
+
+def stats():
+	"""Stats
+
+	Returns the number of lookups process made for each upstream, how many
+	calls were actually made to it, and how many were avoided
+
+	Returns:
+		dict
+	"""
+	with _moStatsLock:
+		return {k:{
+			"lookups": v['lookups'],
+			"calls": v['calls'],
+			"avoided": max(0, v['lookups'] - v['calls'])
+		} for k,v in _mdStats.items()}
+
 def medication(descr):
 	"""Medication
 
@@ -212,9 +511,7 @@ def process(item, backfill=None):
 			dRet['crm_order'] = item['crm_order']
 
 			# Look it up by crm_order
-			lOrders = _moKonnektive._request('order/query', {
-				"orderId": item['crm_order']
-			})
+			lOrders = _order(item['crm_order'])
 
 			# If there's no order
 			if not lOrders:
@@ -255,9 +552,7 @@ def process(item, backfill=None):
 		return {"status": False, "data": "NO ITEMS IN ORDER"};
 
 	# Fetch the DoseSpot patientId
-	dDsPatient = DsPatient.filter({
-		"customerId": str(item['crm_id'])
-	}, raw=['patientId', 'dateOfBirth'], limit=1);
+	dDsPatient = _dsPatient(str(item['crm_id']))
 
 	# If there's no DoseSpot patient record
 	if not dDsPatient or not dDsPatient['patientId']:
@@ -267,10 +562,7 @@ def process(item, backfill=None):
 	dRet['dob'] = dDsPatient['dateOfBirth'];
 
 	# Fetch the patient's prescriptions from dosespot
-	oResponse = Services.read('prescriptions', 'patient/prescriptions', {
-		"_internal_": Services.internalKey(),
-		"patient_id": int(dDsPatient['patientId'])
-	})
+	oResponse = _prescriptions(int(dDsPatient['patientId']))
 	if oResponse.errorExists():
 		return {"status": False, "data": str(oResponse.error)}
 
@@ -18,7 +18,7 @@ import time
 # Pip imports
 import arrow
 import pysftp
-from RestOC import Conf
+from RestOC import Conf, Record_MySQL
 
 # Shared imports
 from shared import Excel
@@ -80,7 +80,8 @@ def opened_claims(tod):
 			emailError('WellDyne Opened Error', '%s can\'t be renamed' % sFilename)
 
 	# Parse the data
-	lData = Excel.parse(sGet, {
+	fStart = time.time()
+	lData = Excel.iterparse(sGet, {
 		"member_id": {"column": 0, "type": Excel.STRING},
 		"opened": {"column": 5, "type": Excel.DATETIME},
 		"wd_rx": {"column": 7, "type": Excel.INTEGER},
@@ -108,10 +109,21 @@ def opened_claims(tod):
 
 	# Store just the values
 	lData = list(dData.values())
+	lTimings = [('parse', time.time() - fStart)]
 
-	# Go through each item
+	# Find the last trigger associated with every ID at once
+	fStart = time.time()
+	dTriggers = Trigger.latestByCustomers('knk', list(dData.keys()))
+	lTimings.append(('resolve', time.time() - fStart))
+
+	# Go through each item and generate the trigger updates
+	lUpdates = []
 	for d in lData:
 
+		# If there's no trigger, skip it
+		if d['customerId'] not in dTriggers:
+			continue
+
 		# Create the reason string
 		sReason = '%s %s' % (d['queue'] or '', d['stage'] or '')
 
@@ -119,29 +131,43 @@ def opened_claims(tod):
 		if len(sReason) == 0 or sReason == ' ':
 			sReason = '(empty)'
 
-		# Find the last trigger associated with the ID
-		oTrigger = Trigger.filter({
-			"crm_type": 'knk',
-			"crm_id": d['customerId'],
-			"type": {"neq": 'update'}
-		}, orderby=[('_created', 'DESC')], limit=1)
-
-		# If we found one
-		if oTrigger:
+		# Update the opened date and stage
+		lUpdates.append({
+			"_id": dTriggers[d['customerId']]['_id'],
+			"opened": d['opened'],
+			"opened_state": sReason
+		})
 
-			# Update the opened date and stage
-			oTrigger['opened'] = d['opened']
-			oTrigger['opened_state'] = sReason
+	# Apply everything in one transaction
+	sHost = Trigger.struct()['host']
+	Record_MySQL.Commands.execute(sHost, 'START TRANSACTION')
+	try:
 
-			# Save the updates
-			oTrigger.save()
+		# Update the triggers
+		fStart = time.time()
+		Trigger.updateMany(['opened', 'opened_state'], lUpdates)
+		lTimings.append(('triggers', time.time() - fStart))
 
-		# Create or replace the current RX number
-		oRx = RxNumber({
+		# Create or replace the current RX numbers
+		fStart = time.time()
+		RxNumber.upsertMany([{
 			"member_id": d['member_id'],
 			"number": d['wd_rx']
-		})
-		oRx.create(conflict=['number'])
+		} for d in lData])
+		lTimings.append(('rx numbers', time.time() - fStart))
+
+		# Commit the changes
+		Record_MySQL.Commands.execute(sHost, 'COMMIT')
+
+	# If anything failed, undo it all
+	except Exception as e:
+		Record_MySQL.Commands.execute(sHost, 'ROLLBACK')
+		raise e
+
+	# Print the timings
+	print('Opened claims, %d rows, %d triggers:' % (len(lData), len(lUpdates)))
+	for sPhase,fSeconds in lTimings:
+		print('\t%s: %.2fs' % (sPhase, fSeconds))
 
 	# Delete the file
 	os.remove(sGet)
@@ -307,7 +333,7 @@ def shipped_claims(tod):
 			emailError('WellDyne Shipped Error', '%s can\'t be renamed' % sFilename)
 
 	# Parse the data
-	lData = Excel.parse(sGet, {
+	lData = Excel.iterparse(sGet, {
 		"shipped": {"column": 1, "type": Excel.DATETIME},
 		"tracking": {"column": 3, "type": Excel.STRING},
 		"rx": {"column": 7, "type": Excel.INTEGER},
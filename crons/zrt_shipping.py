@@ -48,6 +48,129 @@ ZRT_KIT_SHIPPED = 27
 ZRT_KIT_DELIVERED = 28
 """HRT/SMS ids"""
 
+def parse_ups(email):
+	"""Parse UPS
+
+	Parses the tracking info out of a single UPS email
+
+	Arguments:
+		email (dict): The email as returned by Email.parse_message
+
+	Returns:
+		dict|None
+	"""
+
+	# Replace \r\n with \n
+	sText = email['text'].decode('utf8').replace('\r\n', '\n')
+
+	# If status has changed
+	if 'The status of your package has changed.' in sText:
+		return None
+
+	# Parse the text
+	oMatch = reUPS.search(sText)
+
+	# If we didn't find the match
+	if not oMatch:
+		emailError('ZRT Shipping Error', 'No regex match for:\n\n%s' % sText);
+		return None
+
+	# Store the matches
+	lMatches = oMatch.groups();
+
+	# Is this a delivery
+	if 'your package has been delivered' in sText:
+		iStep = ZRT_KIT_DELIVERED
+
+	# Else if the package was shipped
+	elif 'You have a package coming' in sText:
+		iStep = ZRT_KIT_SHIPPED
+
+	# Unknown email
+	else:
+		emailError('ZRT Shipping Error', 'Unknown email type:\n\n%s' % (
+			str(lMatches)
+		))
+		return None
+
+	# Return the data
+	return {
+		"name": lMatches[3],
+		"zip": lMatches[7][:5],
+		"code": lMatches[0],
+		"company": 'UPS',
+		"date": '%s-%s-%s' % (lMatches[2][4:8], lMatches[2][0:2], lMatches[2][2:4]),
+		"step": iStep,
+		"url": lMatches[1]
+	}
+
+def parse_usps(email):
+	"""Parse USPS
+
+	Parses the tracking info out of a single USPS email
+
+	Arguments:
+		email (dict): The email as returned by Email.parse_message
+
+	Returns:
+		dict|None
+	"""
+
+	# Replace \r\n with \n
+	sText = email['text'].decode('utf8').replace('\r\n', '\n')
+
+	# Parse the text
+	oMatch = reUSPS.search(sText)
+
+	# If we didn't find the match
+	if not oMatch:
+		emailError('ZRT Shipping Error', 'No regex match for:\n\n%s' % sText);
+		return None
+
+	# Store the matches
+	lMatches = oMatch.groups();
+
+	# Return the data
+	return {
+		"name": lMatches[1],
+		"zip": lMatches[5][:5],
+		"code": lMatches[7],
+		"company": 'USPS',
+		"date": '%s-%s-%s' % (lMatches[0][6:10], lMatches[0][0:2], lMatches[0][3:5]),
+		"step": ZRT_KIT_SHIPPED,
+		"url": lMatches[8]
+	}
+
+def handle_ups(email):
+	"""Handle UPS
+
+	Called by the mail ingester for each email from UPS
+
+	Arguments:
+		email (dict): The email as returned by Email.parse_message
+
+	Returns:
+		None
+	"""
+	dData = parse_ups(email)
+	if dData:
+		store(dData)
+
+def handle_usps(email):
+	"""Handle USPS
+
+	Called by the mail ingester for each USPS email from ZRT
+
+	Arguments:
+		email (dict): The email as returned by Email.parse_message
+
+	Returns:
+		None
+	"""
+	dData = parse_usps(email)
+	if dData:
+		store(dData)
+
 def UPS(conf):
 	"""UPS
 
@@ -60,9 +183,6 @@ def UPS(conf):
 		list
 	"""
 
-	# Init the return
-	lRet = []
-
 	# Try to get UPS emails
 	lEmails = Email.fetch_imap(
 		user=conf['auth']['user'],
@@ -74,64 +194,18 @@ def UPS(conf):
 		markread=True
 	)
 
-	# If we got no emails
-	if lEmails:
-
-		# Go througg each email
-		for d in lEmails:
-
-			# Replace \r\n with \n
-			d['text'] = d['text'].decode('utf8').replace('\r\n', '\n')
-
-			# If status has changed
-			if 'The status of your package has changed.' in d['text']:
-				continue
-
-			# Parse the text
-			oMatch = reUPS.search(d['text'])
-
-			# If we didn't find the match
-			if not oMatch:
-				emailError('ZRT Shipping Error', 'No regex match for:\n\n%s' % d['text']);
-				continue
-
-			# Store the matches
-			lMatches = oMatch.groups();
-
-			# Is this a delivery
-			if 'your package has been delivered' in d['text']:
-				iStep = ZRT_KIT_DELIVERED
-
-			# Else if the package was shipped
-			elif 'You have a package coming' in d['text']:
-				iStep = ZRT_KIT_SHIPPED
-
-			# Unknown email
-			else:
-				emailError('ZRT Shipping Error', 'Unknown email type:\n\n%s\n\n%s' % (
-					dKtCustomer['customerId'],
-					str(lMatches)
-				))
-				continue
-
-			# Add the data to the list
-			lRet.append({
-				"name": lMatches[3],
-				"zip": lMatches[7][:5],
-				"code": lMatches[0],
-				"company": 'UPS',
-				"date": '%s-%s-%s' % (lMatches[2][4:8], lMatches[2][0:2], lMatches[2][2:4]),
-				"step": iStep,
-				"url": lMatches[1]
-			})
-
-	# Return what was found
+	# Parse each one and return what was found
+	lRet = []
+	for d in (lEmails or []):
+		dData = parse_ups(d)
+		if dData:
+			lRet.append(dData)
 	return lRet
 
 def USPS(conf):
 	"""USPS
 
-	Fetch and parse the UPS emails
+	Fetch and parse the USPS emails
 
 	Arguments:
 		conf (dict): The config data
@@ -140,10 +214,7 @@ def USPS(conf):
 		list
 	"""
 
-	# Init the return
-	lRet = []
-
-	# Try to get UPS emails
+	# Try to get USPS emails
 	lEmails = Email.fetch_imap(
 		user=conf['auth']['user'],
 		passwd=conf['auth']['pass'],
@@ -154,39 +225,148 @@ def USPS(conf):
 		markread=True
 	)
 
-	# If we got no emails
-	if lEmails:
+	# Parse each one and return what was found
+	lRet = []
+	for d in (lEmails or []):
+		dData = parse_usps(d)
+		if dData:
+			lRet.append(dData)
+	return lRet
+
+def store(data):
+	"""Store
+
+	Finds the customer the tracking info is for, updates their HRT status,
+	stores the shipping info, and notifies them
+
+	Arguments:
+		data (dict): The tracking info from parse_ups or parse_usps
+
+	Returns:
+		bool
+	"""
+
+
+	# Try to find the customer by Name and Zip
+	dKtCustomer = KtCustomer.byNameAndZip(data['name'], data['zip'])
 
-		# Go througg each email
-		for d in lEmails:
+	# If no customer
+	if not dKtCustomer:
+		#emailError('ZRT Shipping Error', 'No customer found for:\n\n%s' % str(data))
+		return False
 
-			# Replace \r\n with \n
-			d['text'] = d['text'].decode('utf8').replace('\r\n', '\n')
+	# Look for an HRT Patient record that's still onboarding
+	oHrtPatient = HrtPatient.filter({
+		"ktCustomerId": dKtCustomer['customerId'],
+		"stage": 'Onboarding',
+		"processStatus": 'Ordered Lab Kit'
+	}, limit=1)
 
-			# Parse the text
-			oMatch = reUSPS.search(d['text'])
+	# If there's an HRT patient
+	if oHrtPatient:
 
-			# If we didn't find the match
-			if not oMatch:
-				emailError('ZRT Shipping Error', 'No regex match for:\n\n%s' % d['text']);
-				continue
+		# If the kit was shipped
+		if data['step'] == ZRT_KIT_SHIPPED:
+			oHrtPatient['processStatus'] = 'Shipped Lab Kit';
 
-			# Store the matches
-			lMatches = oMatch.groups();
+		# Else if it was delivered
+		elif data['step'] == ZRT_KIT_DELIVERED:
+			oHrtPatient['processStatus'] = 'Delivered Lab Kit'
 
-			# Add the data to the list
-			lRet.append({
-				"name": lMatches[1],
-				"zip": lMatches[5][:5],
-				"code": lMatches[7],
-				"company": 'USPS',
-				"date": '%s-%s-%s' % (lMatches[0][6:10], lMatches[0][0:2], lMatches[0][3:5]),
-				"step": ZRT_KIT_SHIPPED,
-				"url": lMatches[8]
+		# Save the record
+		oHrtPatient.save()
+
+	# If it's shipped
+	if data['step'] == ZRT_KIT_SHIPPED:
+
+		# Get current date/time
+		sDT = arrow.get().format('YYYY-MM-DD HH:mm:ss')
+
+		# Create an instance of the shipping record
+		try:
+			oShipInfo = ShippingInfo({
+				"customerId": dKtCustomer['customerId'],
+				"code": data['code'],
+				"type": data['company'],
+				"date": data['date'],
+				"createdAt": sDT,
+				"updatedAt": sDT
 			})
+		except ValueError as e:
+			emailError('ZRT Shipping Error', 'Couldn\'t create ShippingInfo for:\n\n%s\n\n%s\n\n%s' % (
+				dKtCustomer['customerId'],
+				str(data),
+				str(e.args)
+			))
+			return False
 
-	# Return what was found
-	return lRet
+		# Create the record
+		oShipInfo.create(conflict='replace');
+
+		# If it's with UPS
+		if data['company'] == 'UPS':
+
+			# Send kit shipped email
+			dTpl = {
+				"name": "%s %s" % (
+					dKtCustomer['firstName'],
+					dKtCustomer['lastName']
+				),
+				"link": data['url']
+			}
+
+			# Send the Email to the patient
+			oResponse = Services.create('communications', 'email', {
+				"_internal_": Services.internalKey(),
+				"from": 'noreply@m.maleexcelmail.com',
+				"html_body": Templates.generate('email/crons/zrt_test_kit_shipped.html', dTpl, 'en-US'),
+				"subject": Templates.generate('email/crons/zrt_test_kit_shipped.txt', {}, 'en-US'),
+				"to": dKtCustomer['emailAddress']
+			})
+			if oResponse.errorExists():
+				emailError('ZRT Shipping Error', 'Couldn\'t send email:\n\n%s\n\n%s\n\n%s' % (
+					str(dKtCustomer),
+					str(data),
+					str(oResponse)
+				))
+
+	# If it's with UPS
+	if data['company'] == 'UPS':
+
+		# Find the template
+		dSmsTpl = SMSTemplate.filter({
+			"groupId": HRT_GROUP,
+			"type": 'sms',
+			"step": data['step']
+		}, raw=['content'], limit=1)
+
+		# Convert any arguments
+		sContent = dSmsTpl['content']. \
+				replace('{tracking_code}', data['code']). \
+				replace('{tracking_date}', data['date']) . \
+				replace('{tracking_link}', data['url']). \
+				replace('{patient_first}', dKtCustomer['firstName']). \
+				replace('{patient_last}', dKtCustomer['lastName']). \
+				replace('{patient_name}', '%s %s' % (dKtCustomer['firstName'], dKtCustomer['lastName']))
+
+		# Send the SMS to the patient
+		oResponse = Services.create('monolith', 'message/outgoing', {
+			"_internal_": Services.internalKey(),
+			"store_on_error": True,
+			"name": "HRT Workflow",
+			"customerPhone": dKtCustomer['phoneNumber'],
+			"content": sContent,
+			"type": 'support'
+		})
+		if oResponse.errorExists():
+			emailError('ZRT Shipping Error', 'Couldn\'t send sms:\n\n%s\n\n%s\n\n%s' % (
+				str(oResponse),
+				str(dKtCustomer),
+				str(data)
+			))
+
+	# Return OK
+	return True
 
 def run():
 	"""Run
@@ -221,126 +401,9 @@ def run():
 		USPS(dConf)
 	)
 
-	# Go through each of the tracking we found
+	# Store each of the tracking we found
 	for d in lTracking:
-
-		# Try to find the customer by Name and Zip
-		dKtCustomer = KtCustomer.byNameAndZip(d['name'], d['zip'])
-
-		# If no customer
-		if not dKtCustomer:
-			#emailError('ZRT Shipping Error', 'No customer found for:\n\n%s' % str(d))
-			continue
-
-		# Look for an HRT Patient record that's still onboarding
-		oHrtPatient = HrtPatient.filter({
-			"ktCustomerId": dKtCustomer['customerId'],
-			"stage": 'Onboarding',
-			"processStatus": 'Ordered Lab Kit'
-		}, limit=1)
-
-		# If there's an HRT patient
-		if oHrtPatient:
-
-			# If the kit was shipped
-			if d['step'] == ZRT_KIT_SHIPPED:
-				oHrtPatient['processStatus'] = 'Shipped Lab Kit';
-
-			# Else if it was delivered
-			elif d['step'] == ZRT_KIT_DELIVERED:
-				oHrtPatient['processStatus'] = 'Delivered Lab Kit'
-
-			# Save the record
-			oHrtPatient.save()
-
-		# If it's shipped
-		if d['step'] == ZRT_KIT_SHIPPED:
-
-			# Get current date/time
-			sDT = arrow.get().format('YYYY-MM-DD HH:mm:ss')
-
-			# Create an instance of the shipping record
-			try:
-				oShipInfo = ShippingInfo({
-					"customerId": dKtCustomer['customerId'],
-					"code": d['code'],
-					"type": d['company'],
-					"date": d['date'],
-					"createdAt": sDT,
-					"updatedAt": sDT
-				})
-			except ValueError as e:
-				emailError('ZRT Shipping Error', 'Couldn\'t create ShippingInfo for:\n\n%s\n\n%s\n\n%s' % (
-					dKtCustomer['customerId'],
-					str(d),
-					str(e.args)
-				))
-				continue
-
-			# Create the record
-			oShipInfo.create(conflict='replace');
-
-			# If it's with UPS
-			if d['company'] == 'UPS':
-
-				# Send kit shipped email
-				dTpl = {
-					"name": "%s %s" % (
-						dKtCustomer['firstName'],
-						dKtCustomer['lastName']
-					),
-					"link": d['url']
-				}
-
-				# Send the Email to the patient
-				oResponse = Services.create('communications', 'email', {
-					"_internal_": Services.internalKey(),
-					"from": 'noreply@m.maleexcelmail.com',
-					"html_body": Templates.generate('email/crons/zrt_test_kit_shipped.html', dTpl, 'en-US'),
-					"subject": Templates.generate('email/crons/zrt_test_kit_shipped.txt', {}, 'en-US'),
-					"to": dKtCustomer['emailAddress']
-				})
-				if oResponse.errorExists():
-					emailError('ZRT Shipping Error', 'Couldn\'t send email:\n\n%s\n\n%s\n\n%s' % (
-						str(dKtCustomer),
-						str(d),
-						str(oResponse)
-					))
-
-		# If it's with UPS
-		if d['company'] == 'UPS':
-
-			# Find the template
-			dSmsTpl = SMSTemplate.filter({
-				"groupId": HRT_GROUP,
-				"type": 'sms',
-				"step": d['step']
-			}, raw=['content'], limit=1)
-
-			# Convert any arguments
-			sContent = dSmsTpl['content']. \
-					replace('{tracking_code}', d['code']). \
-					replace('{tracking_date}', d['date']) . \
-					replace('{tracking_link}', d['url']). \
-					replace('{patient_first}', dKtCustomer['firstName']). \
-					replace('{patient_last}', dKtCustomer['lastName']). \
-					replace('{patient_name}', '%s %s' % (dKtCustomer['firstName'], dKtCustomer['lastName']))
-
-			# Send the SMS to the patient
-			oResponse = Services.create('monolith', 'message/outgoing', {
-				"_internal_": Services.internalKey(),
-				"store_on_error": True,
-				"name": "HRT Workflow",
-				"customerPhone": dKtCustomer['phoneNumber'],
-				"content": sContent,
-				"type": 'support'
-			})
-			if oResponse.errorExists():
-				emailError('ZRT Shipping Error', 'Couldn\'t send sms:\n\n%s\n\n%s\n\n%s' % (
-					str(oResponse),
-					str(dKtCustomer),
-					str(d)
-				))
+		store(d)
 
 	# Return OK
 	return True
@@ -35,7 +35,8 @@ def emailError(subject, error):
 		"_internal_": Services.internalKey(),
 		"text_body": error,
 		"subject": subject,
-		"to": Conf.get(('developer', 'emails'))
+		"to": Conf.get(('developer', 'emails')),
+		"dedupe": True
 	})
 	if oResponse.errorExists():
 		print(oResponse.error)
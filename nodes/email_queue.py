@@ -0,0 +1,258 @@
+# coding=utf8
+""" Email Queue Node
+
+Sends the emails queued by the communications service when email.method is
+"queue", using a pool of workers that each keep their SMTP connection open
+
+	python -m nodes.email_queue
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import platform
+import signal
+import smtplib
+import threading
+from time import sleep, time
+
+# Pip imports
+from redis import StrictRedis
+from RestOC import Conf, JSON
+
+# Shared imports
+from shared import Email
+
+_mbRunning = True
+"""Set to False to let the workers finish up and exit"""
+
+def _fail(redis, data, error):
+	"""Fail
+
+	Stores an email that can't be sent
+
+	Arguments:
+		redis (StrictRedis): The Redis connection
+		data (dict): The queued email
+		error (str): The reason it failed
+
+	Returns:
+		None
+	"""
+	print('Email to %s failed: %s' % (str(data.get('to')), error))
+	data['error'] = error
+	p = redis.pipeline()
+	p.rpush(Email.FAILED, JSON.encode(data))
+	p.hincrby(Email.STATS, 'failed', 1)
+	p.execute()
+
+def send(sender, redis, raw, retries, backoff):
+	"""Send
+
+	Sends a single queued email, scheduling a retry, or marking it as failed,
+	if it can't be sent
+
+	Arguments:
+		sender (Email.Sender): The SMTP connection to send with
+		redis (StrictRedis): The Redis connection
+		raw (str): The email as it was queued
+		retries (uint): The max number of times to retry
+		backoff (uint): The seconds to wait before the first retry, doubled
+			each attempt after
+
+	Returns:
+		bool
+	"""
+
+	# Decode the email, if it can't be, store it as is
+	try:
+		dEmail = JSON.decode(raw)
+		if not isinstance(dEmail, dict):
+			raise ValueError('not an object')
+	except (TypeError, ValueError) as e:
+		_fail(redis, {"raw": raw, "to": None}, 'Invalid JSON: %s' % str(e))
+		return False
+
+	try:
+
+		# Build the message
+		oMsg = Email.build(
+			dEmail['to'], dEmail['subject'],
+			text_body=dEmail.get('text_body'),
+			html_body=dEmail.get('html_body'),
+			from_=dEmail['from'],
+			attachments=dEmail.get('attachments')
+		)
+
+	# If it can't be built, there's no point trying again
+	except Exception as e:
+		_fail(redis, dEmail, 'Invalid email: %s %s' % (type(e).__name__, str(e)))
+		return False
+
+	try:
+
+		# Send the message
+		sender.send(oMsg, dEmail['to'])
+
+	# If the recipients were refused, there's no point trying again
+	except smtplib.SMTPRecipientsRefused as e:
+		_fail(redis, dEmail, str(e))
+		return False
+
+	# Any other error, try again later
+	except (smtplib.SMTPException, OSError) as e:
+		dEmail['attempts'] = dEmail.get('attempts', 0) + 1
+		if dEmail['attempts'] > retries:
+			_fail(redis, dEmail, str(e))
+		else:
+			p = redis.pipeline()
+			p.zadd(Email.RETRY, {
+				JSON.encode(dEmail): time() + (backoff * (2 ** (dEmail['attempts'] - 1)))
+			})
+			p.hincrby(Email.STATS, 'retried', 1)
+			p.execute()
+		return False
+
+	# Anything unexpected, store it instead of losing it
+	except Exception as e:
+		_fail(redis, dEmail, '%s %s' % (type(e).__name__, str(e)))
+		return False
+
+	# Count it and store the time since it was queued
+	p = redis.pipeline()
+	p.hincrby(Email.STATS, 'sent', 1)
+	if 'queued' in dEmail:
+		p.lpush(Email.LATENCY, '%.1f' % ((time() - dEmail['queued']) * 1000.0))
+		p.ltrim(Email.LATENCY, 0, 999)
+	p.execute()
+
+	# Return OK
+	return True
+
+def worker(name, redis, batch, retries, backoff):
+	"""Worker
+
+	Pulls emails off the queue, in batches, and sends them over a single SMTP
+	connection until told to stop. Emails are moved to a list owned by the
+	worker while being sent so none are lost if the process dies
+
+	Arguments:
+		name (str): The unique name of the worker
+		redis (StrictRedis): The Redis connection
+		batch (uint): The max number of emails to take at once
+		retries (uint): The max number of times to retry an email
+		backoff (uint): The seconds to wait before the first retry
+
+	Returns:
+		None
+	"""
+
+	# Create the SMTP connection and get the worker's list
+	oSender = Email.Sender(**Conf.get(('email', 'smtp')))
+	sProcessing = Email.PROCESSING % name
+
+	# Loop until we're told to stop
+	while _mbRunning:
+
+		try:
+
+			# Wait for an email
+			sEmail = redis.brpoplpush(Email.QUEUE, sProcessing, 1)
+			if not sEmail:
+				continue
+
+			# Take the rest of the batch if there is one
+			lEmails = [sEmail]
+			while len(lEmails) < batch:
+				sEmail = redis.rpoplpush(Email.QUEUE, sProcessing)
+				if not sEmail:
+					break
+				lEmails.append(sEmail)
+
+			# Send each one and remove it from the worker's list
+			for sEmail in lEmails:
+				send(oSender, redis, sEmail, retries, backoff)
+				redis.lrem(sProcessing, 1, sEmail)
+
+		# If we lost Redis, wait a moment before trying again
+		except Exception as e:
+			print('Email worker %s error: %s' % (name, str(e)))
+			sleep(1)
+
+	# Close the connection
+	oSender.close()
+
+def stop(signum, frame):
+	"""Stop
+
+	Signal handler that lets the workers finish their current batch
+
+	Returns:
+		None
+	"""
+	global _mbRunning
+	_mbRunning = False
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Load the config
+	Conf.load('config.json')
+	sConfOverride = 'config.%s.json' % platform.node()
+	if os.path.isfile(sConfOverride):
+		Conf.load_merge(sConfOverride)
+
+	# Get the queue config
+	dConf = Conf.get(('email', 'queue'), {})
+	iWorkers = dConf.get('workers', 2)
+	iBatch = dConf.get('batch', 20)
+	iRetries = dConf.get('retries', 5)
+	iBackoff = dConf.get('backoff', 30)
+
+	# Connect to Redis
+	oRedis = StrictRedis(**Conf.get(('redis', 'primary'), {
+		"host": "localhost",
+		"port": 6379,
+		"db": 0
+	}))
+
+	# Generate the worker names and put back anything a previous run of them
+	#	didn't finish
+	lNames = ['%s-%d' % (platform.node(), i) for i in range(iWorkers)]
+	for s in lNames:
+		while oRedis.rpoplpush(Email.PROCESSING % s, Email.QUEUE):
+			pass
+
+	# Stop cleanly on TERM and INT
+	signal.signal(signal.SIGTERM, stop)
+	signal.signal(signal.SIGINT, stop)
+
+	# Start the workers
+	lThreads = []
+	for s in lNames:
+		oThread = threading.Thread(
+			target=worker,
+			args=(s, oRedis, iBatch, iRetries, iBackoff)
+		)
+		oThread.start()
+		lThreads.append(oThread)
+
+	# Move retries back to the queue once they're due
+	while _mbRunning:
+		try:
+			for s in oRedis.zrangebyscore(Email.RETRY, '-inf', time()):
+				if oRedis.zrem(Email.RETRY, s):
+					oRedis.lpush(Email.QUEUE, s)
+		except Exception as e:
+			print('Email retry error: %s' % str(e))
+		sleep(1)
+
+	# Wait for the workers to finish
+	for o in lThreads:
+		o.join()
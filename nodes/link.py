@@ -13,10 +13,13 @@ __created__		= "2021-03-08"
 
 # Python imports
 import os, platform, pprint
+from time import time
 
 # Pip imports
+import arrow
 import bottle
-from RestOC import Conf, REST, Services, StrHelper
+from redis import StrictRedis
+from RestOC import Conf, JSON, REST, Services, StrHelper
 
 # Shared imports
 from shared import Environment
@@ -24,6 +27,43 @@ from shared import Environment
 # Local imports
 from nodes import emailError, resJSON, show500
 
+_moRedis = None
+"""Redis connection used for the code cache and the views buffer"""
+
+_mdUrls = {}
+"""Local cache of code to (timestamp, url ID, url)"""
+
+_miTTL = 60
+"""Seconds to keep codes in the local cache"""
+
+def _cached(code):
+	"""Cached
+
+	Returns the url ID and url associated with the code from the local cache,
+	else from the Redis cache filled by the link service. Returns None if the
+	code isn't cached anywhere
+
+	Arguments:
+		code (str): The code to look up
+
+	Returns:
+		tuple|None
+	"""
+
+	# If we have it locally and it's not too old, return it
+	if code in _mdUrls and _mdUrls[code][0] > time() - _miTTL:
+		return _mdUrls[code][1:]
+
+	# Look for it in Redis
+	sUrl = _moRedis.get('link:code:%s' % code)
+	if not sUrl:
+		return None
+
+	# Store it locally and return it
+	dUrl = JSON.decode(sUrl)
+	_mdUrls[code] = (time(), dUrl['_id'], dUrl['url'])
+	return _mdUrls[code][1:]
+
 @bottle.get('/<code>')
 def redirect(code):
 	"""Redirect
@@ -34,13 +74,35 @@ def redirect(code):
 		None
 	"""
 
+	# Get the IP and agent
+	sIP = Environment.getClientIP(bottle.request.environ)
+	sAgent = bottle.request.environ.get('HTTP_USER_AGENT', '')
+
+	# If we have the code cached
+	tUrl = _moRedis and _cached(code)
+	if tUrl:
+
+		# Add the view to the buffer for crons.link_views to store
+		oDT = arrow.get()
+		_moRedis.rpush('link:views', JSON.encode({
+			"url_id": tUrl[0],
+			"date": oDT.format('YYYY-MM-DD'),
+			"time": oDT.format('HH:mm:ss'),
+			"ip": sIP,
+			"agent": sAgent
+		}))
+
+		# Redirect to the URL
+		return bottle.redirect(tUrl[1])
+
 	# Look for the code in the service and track the request
-	oResponse = Services.create('link', 'view', {
+	dData = {
 		"_internal_": Services.internalKey(),
 		"code": code,
-		"ip": Environment.getClientIP(bottle.request.environ),
-		"agent": bottle.request.environ['HTTP_USER_AGENT']
-	})
+		"ip": sIP,
+		"agent": sAgent
+	}
+	oResponse = Services.create('link', 'view', dData)
 
 	# If we got an error
 	if oResponse.errorExists():
@@ -124,6 +186,15 @@ if __name__ == "__main__":
 	# Register all services
 	Services.register(dServices, oRestConf, Conf.get(('services', 'salt')))
 
+	# Connect to Redis for the code cache unless it's disabled
+	if Conf.get(('link', 'cache'), True):
+		_moRedis = StrictRedis(**Conf.get(('redis', 'primary'), {
+			"host": "localhost",
+			"port": 6379,
+			"db": 0
+		}))
+		_miTTL = Conf.get(('link', 'local_ttl'), 60)
+
 	# Run the webserver
 	bottle.run(
 		host=oRestConf['link_domain']['host'],
@@ -104,7 +104,8 @@ def serviceError(error):
 		"_internal_": Services.internalKey(),
 		"text_body": '\n'.join(lErrors),
 		"subject": 'REST Exception',
-		"to": Conf.get(('developer', 'emails'))
+		"to": Conf.get(('developer', 'emails')),
+		"dedupe": True
 	})
 	if oResponse.errorExists():
 		print(oResponse.error)
@@ -51,6 +51,7 @@ if __name__ == "__main__":
 	# Create the HTTP server and map requests to service
 	REST.Server({
 		"/email": {"methods": REST.POST},
+		"/email/stats": {"methods": REST.READ},
 		"/sms": {"methods": REST.POST}
 		},
 		'communications',
@@ -33,6 +33,7 @@ if __name__ == "__main__":
 	REST.Server({
 		"/ds/dispenseunits": {"methods": REST.READ, "session": True},
 		"/ds/pharmacies": {"methods": REST.READ, "session": True},
+		"/ds/token/stats": {"methods": REST.READ},
 
 		"/diagnoses": {"methods": REST.READ, "session": True},
 		"/diagnosis": {"methods": REST.ALL, "session": True},
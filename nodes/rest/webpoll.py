@@ -33,6 +33,7 @@ if __name__ == "__main__":
 		"/clear": {"methods": REST.UPDATE, "session": True},
 		"/join": {"methods": REST.CREATE, "session": True},
 		"/leave": {"methods": REST.CREATE, "session": True},
+		"/poll": {"methods": REST.READ, "session": True},
 		"/pull": {"methods": REST.READ, "session": True},
 		"/websocket": {"methods": REST.READ, "session": True}
 
@@ -44,5 +45,10 @@ if __name__ == "__main__":
 		host=oRestConf['webpoll']['host'],
 		port=oRestConf['webpoll']['port'],
 		workers=oRestConf['webpoll']['workers'],
-		timeout='timeout' in oRestConf['webpoll'] and oRestConf['webpoll']['timeout'] or 30
+		timeout='timeout' in oRestConf['webpoll'] and oRestConf['webpoll']['timeout'] or 30,
+
+		# /poll waits on Redis for up to services.webpoll.poll_timeout, so use
+		#	gevent workers to keep one waiting client from blocking the rest
+		worker_class='gevent',
+		worker_connections=Conf.get(('services', 'webpoll', 'connections'), 1000)
 	)
@@ -12,20 +12,30 @@ __email__		= "bast@maleexcel.com"
 __created__		= "2017-06-26"
 
 # Python imports
+from collections import OrderedDict
 from http.cookies import SimpleCookie
 import json
 from urllib.parse import unquote
+import zlib
 
 # Pip imports
+import gevent
+from gevent.queue import Full, Queue
 from geventwebsocket import WebSocketApplication, WebSocketError
 from redis import StrictRedis
 from redis.exceptions import ConnectionError
 from RestOC import Conf
 
+# msgpack is optional, clients asking for it get JSON if it's not installed
+try: import msgpack
+except ImportError: msgpack = None
+
 # Init the global  vars
 _r = None
 _r_pubsub = None
 _r_clients = {}
+_queue_size = 100
+_coalesce_max = 250
 _verbose = False
 
 # Init function
@@ -43,7 +53,7 @@ def init(verbose=False):
 	"""
 
 	# Import the global redis instance
-	global _r, _r_pubsub, _verbose
+	global _r, _r_pubsub, _queue_size, _coalesce_max, _verbose
 
 	# Create a new Redis instance
 	_r = StrictRedis(**Conf.get(('redis', 'primary'), {
@@ -55,8 +65,15 @@ def init(verbose=False):
 	# Get the pubsub instance
 	_r_pubsub = _r.pubsub()
 
-	# Subscribe to an empty channel just to get things started
-	_r_pubsub.subscribe('sync')
+	# Subscribe once to every sync channel, messages are routed to sockets
+	#	in process using the clients index
+	_r_pubsub.psubscribe(Conf.get(('websocket', 'pattern'), '*'))
+
+	# Get the max number of messages that can wait on a single socket
+	_queue_size = Conf.get(('websocket', 'queue'), 100)
+
+	# Get the max milliseconds a client can ask messages to be held for
+	_coalesce_max = Conf.get(('websocket', 'coalesce_max'), 250)
 
 	# Set the verbose flag
 	_verbose = verbose and True or False
@@ -78,17 +95,15 @@ def stop():
 	# Go through each tracking code
 	for track in _r_clients:
 
-		# Unsubscribe
-		_r_pubsub.unsubscribe(track)
-
 		# Go through each websocket
-		for i in range(len(_r_clients[track])):
+		for oApp in list(_r_clients[track]):
 
 			# If it's not closed, close it
-			if not _r_clients[track][i].ws.closed:
-				_r_clients[track][i].ws.close()
+			if not oApp.ws.closed:
+				oApp.ws.close()
 
-	# Delete the connections
+	# Unsubscribe and delete the connections
+	_r_pubsub.punsubscribe()
 	_r_pubsub.close()
 	del _r_pubsub
 	del _r
@@ -113,7 +128,7 @@ def thread():
 			if _verbose: print('Received pubsub message: %s' % str(d))
 
 			# If the message is real data and not subscribe/ubsubscribe
-			if d['type'] == 'message':
+			if d['type'] == 'pmessage':
 
 				# Convert the channel to a unicode string
 				d['channel'] = d['channel'].decode('utf-8')
@@ -121,8 +136,9 @@ def thread():
 				# If we have the channel
 				if d['channel'] in _r_clients:
 
-					# Forward the message to each socket
-					for ws in _r_clients[d['channel']]:
+					# Queue the message on each socket, copying the set in case
+					#	a socket closes because its queue is full
+					for ws in list(_r_clients[d['channel']]):
 						ws.on_publish(d['data'])
 
 	except Exception as e:
@@ -154,6 +170,125 @@ class SyncApplication(WebSocketApplication):
 		self.ws.send(json.dumps({"error":{"code":code,"msg":msg}}))
 		self.ws.close()
 
+	# sender method
+	def _sender(self):
+		"""Sender
+
+		Runs in its own greenlet and sends queued messages to the socket so
+		that a slow client can never stall the redis thread
+
+		Returns:
+			None
+		"""
+
+		try:
+
+			# Send each message as it arrives until told to stop
+			for message in self.queue:
+
+				# If the client didn't negotiate batches, send it as is
+				if not self.batch:
+					self.ws.send(message)
+					continue
+
+				# Give any other messages time to arrive
+				if self.coalesce:
+					gevent.sleep(self.coalesce)
+
+				# Collect everything waiting
+				lMessages = [message]
+				while not self.queue.empty():
+					lMessages.append(self.queue.get_nowait())
+
+				# Send them all as one frame
+				self.ws.send(*self._encode(self._merge(lMessages)))
+
+		# Catch any websocket errors
+		except WebSocketError as e:
+			if _verbose: print('Sender failed: %s' % str(e))
+
+	# merge method
+	def _merge(self, messages):
+		"""Merge
+
+		Merges published messages that are for the same service and key into
+		a single envelope whose data is the list of each message's data, in
+		the order they arrived. Exact duplicates are dropped, and keys with
+		only one message are left as is
+
+		Arguments:
+			messages (bytes[]): The JSON messages as published
+
+		Returns:
+			bytes[]
+		"""
+
+		# Group the messages by service and key, keeping the order the keys
+		#	were first seen in
+		dKeys = OrderedDict()
+		for m in messages:
+			try:
+				dMsg = json.loads(m)
+				tKey = (dMsg['service'], json.dumps(dMsg['key'], sort_keys=True))
+			except (ValueError, TypeError, KeyError):
+				tKey = (None, m)
+			if tKey not in dKeys:
+				dKeys[tKey] = OrderedDict()
+			dKeys[tKey][m] = tKey[0] is not None and dMsg or None
+
+		# Go through each key
+		lRet = []
+		for tKey, dMsgs in dKeys.items():
+
+			# If there's only one message, send it as is
+			if len(dMsgs) == 1:
+				lRet.append(next(iter(dMsgs)))
+				continue
+
+			# Else, merge the data into one envelope
+			lData = list(dMsgs.values())
+			lRet.append(json.dumps({
+				"service": lData[0]['service'],
+				"key": lData[0]['key'],
+				"data": [d['data'] for d in lData],
+				"merged": True
+			}).encode('utf-8'))
+
+		# Return the messages
+		return lRet
+
+	# encode method
+	def _encode(self, messages):
+		"""Encode
+
+		Encodes a batch of published messages using the format the client
+		negotiated
+
+		Arguments:
+			messages (bytes[]): The JSON messages as published
+
+		Returns:
+			tuple: the frame, and whether it's binary
+		"""
+
+		# If we're using msgpack
+		if self.encoding == 'msgpack':
+			sFrame = msgpack.packb([json.loads(m) for m in messages])
+
+		# Else, join the JSON into an array
+		else:
+			sFrame = b'[' + b','.join(messages) + b']'
+
+		# If we're compressing
+		if self.compress:
+			return (zlib.compress(sFrame), True)
+
+		# Return msgpack as binary, JSON as text
+		return (
+			self.encoding == 'json' and sFrame.decode('utf-8') or sFrame,
+			self.encoding != 'json'
+		)
+
 	# on close method
 	def on_close(self, reason=None):
 		"""On Close
@@ -165,16 +300,19 @@ class SyncApplication(WebSocketApplication):
 		"""
 		if _verbose: print('Connection closed: %s' % reason)
 
-		# If we have any subpubs, ubsubscribe
+		# Go through each track
 		for track in self.tracking:
 
-			# If we have a subpub, ubsubscribe
-			try:_r_clients[track].length == 1 and _r_pubsub.unsubscribe(track)
-			except:	pass
-
 			# If we're in the list of clients
-			try: _r_clients[track].remove(self)
-			except:	pass
+			try: _r_clients[track].discard(self)
+			except KeyError: pass
+
+			# If there's no more clients, remove the track
+			if track in _r_clients and not _r_clients[track]:
+				del _r_clients[track]
+
+		# Stop the sender
+		self.sender.kill(block=False)
 
 	# on message method
 	def on_message(self, message):
@@ -250,8 +388,36 @@ class SyncApplication(WebSocketApplication):
 					# Allow further messages
 					self.authorized = True
 
-					# Return OK
-					self.ws.send('authorized');
+					# If the client asked for messages to be held and batched
+					if 'coalesce' in data:
+						try: self.coalesce = max(0, min(int(data['coalesce']), _coalesce_max)) / 1000.0
+						except (TypeError, ValueError): pass
+
+					# If the client asked for msgpack and it's available
+					if 'encoding' in data and data['encoding'] == 'msgpack' and msgpack:
+						self.encoding = 'msgpack'
+
+					# If the client asked for compressed frames
+					if 'compress' in data and data['compress'] == 'deflate':
+						self.compress = True
+
+					# If any options were requested
+					if 'coalesce' in data or 'encoding' in data or 'compress' in data:
+
+						# Send all messages in batches
+						self.batch = True
+
+						# Let the client know what it actually got
+						self.ws.send(json.dumps({
+							"authorized": True,
+							"coalesce": int(self.coalesce * 1000),
+							"encoding": self.encoding,
+							"compress": self.compress and 'deflate' or False
+						}))
+
+					# Else, return OK
+					else:
+						self.ws.send('authorized');
 
 				# Else if it's a message to ping
 				elif data['_type'] == 'ping':
@@ -292,10 +458,9 @@ class SyncApplication(WebSocketApplication):
 
 					# Add the track code to the client list
 					try:
-						_r_clients[track].append(self)
-					except:
-						_r_clients[track] = [self]
-						_r_pubsub.subscribe(track)
+						_r_clients[track].add(self)
+					except KeyError:
+						_r_clients[track] = {self}
 
 					# Add it to the list on this socket
 					if _verbose: print('Successfully started tracking: "%s"' % track)
@@ -328,13 +493,11 @@ class SyncApplication(WebSocketApplication):
 						if track in _r_clients:
 
 							# If the socket exists, delete it
-							if self in _r_clients[track]:
-								_r_clients[track].remove(self)
+							_r_clients[track].discard(self)
 
 							# If there's no nore clients
 							if not len(_r_clients[track]):
 								del _r_clients[track]
-								_r_pubsub.unsubscribe(track)
 
 					# Remove the list on this socket
 					if _verbose: print('Successfully stopped tracking: "%s"' % track)
@@ -368,6 +531,16 @@ class SyncApplication(WebSocketApplication):
 		self.authorized = False
 		self.tracking = []
 
+		# Init the framing options, changed by the connect message
+		self.batch = False
+		self.coalesce = 0
+		self.encoding = 'json'
+		self.compress = False
+
+		# Init the outgoing queue and start the sender
+		self.queue = Queue(_queue_size)
+		self.sender = gevent.spawn(self._sender)
+
 		# If there is no cookie
 		if 'HTTP_COOKIE' not in self.ws.environ:
 			if _verbose: print('HTTP_COOKIE missing')
@@ -398,4 +571,13 @@ class SyncApplication(WebSocketApplication):
 			None
 		"""
 		if _verbose: print('on_publish called with message: %s' % message)
-		self.ws.send(message)
+
+		# Add the message to the queue
+		try:
+			self.queue.put_nowait(message)
+
+		# If the client is too far behind, close it so it reconnects and
+		#	refreshes instead of silently losing messages
+		except Full:
+			if _verbose: print('Queue full, closing socket')
+			gevent.spawn(self.ws.close)
@@ -15,6 +15,9 @@ __created__		= "2017-06-26"
 from collections import OrderedDict
 import os
 import platform
+import signal
+import socket
+import sys
 import threading
 
 # Import pip modules
@@ -36,6 +39,51 @@ verbose	= False
 if 'VERBOSE' in os.environ and os.environ['VERBOSE'] == '1':
 	verbose	= True
 
+# Get the host, port, and number of worker processes
+dConf = Conf.get('websocket', {
+	"host": "0.0.0.0",
+	"port": 8001
+})
+iWorkers = 'workers' in dConf and dConf['workers'] or 1
+
+# Create the listener before forking so that every worker accepts on the same
+#	socket. Every worker subscribes to all sync channels, so it doesn't matter
+#	which one the kernel hands a client to
+if verbose: print('Listening on %s:%d' % (dConf['host'], dConf['port']))
+oListener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+oListener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+oListener.bind((dConf['host'], dConf['port']))
+oListener.listen(1024)
+
+# Fork the workers, the parent only watches over them
+lPIDs = []
+if iWorkers > 1:
+	for i in range(iWorkers):
+		iPID = os.fork()
+		if iPID == 0:
+			lPIDs = None
+			break
+		lPIDs.append(iPID)
+
+	# If we're the parent
+	if lPIDs:
+
+		# Pass any stop request on to the workers
+		def _stop(signum, frame):
+			for iPID in lPIDs:
+				try: os.kill(iPID, signal.SIGTERM)
+				except OSError: pass
+		signal.signal(signal.SIGTERM, _stop)
+
+		# Wait for all the workers to finish
+		try:
+			for iPID in lPIDs:
+				os.waitpid(iPID, 0)
+		except KeyboardInterrupt:
+			_stop(signal.SIGTERM, None)
+
+		sys.exit(0)
+
 # Init the sync application
 wsInit(verbose)
 
@@ -48,16 +96,10 @@ try:
 except Exception as e:
 	print('Failed to start Redis thread: %s' % str(e))
 
-# Get the host and port
-dConf = Conf.get('websocket', {
-	"host": "0.0.0.0",
-	"port": 8001
-})
-
 # Create the websocket server
-if verbose: print('Starting the WebSocket server on %s:%d' % (dConf['host'], dConf['port']))
+if verbose: print('Starting the WebSocket server in process %d' % os.getpid())
 server = WebSocketServer(
-	(dConf['host'], dConf['port']),
+	oListener,
 	Resource(OrderedDict([('/',SyncApplication)]))
 )
 
@@ -144,6 +144,9 @@ class Permission(Record_MySQL.Record):
 		# Delete the key in Redis
 		cls._redis.delete('perms:%s' % _id)
 
+		# Let any local caches know
+		cls._redis.publish('perms', _id)
+
 	@classmethod
 	def config(cls):
 		"""Config
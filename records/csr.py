@@ -1003,6 +1003,58 @@ class TicketOpened(Record_MySQL.Record):
 			Record_MySQL.ESelect.ALL
 		)
 
+	@classmethod
+	def countsByRanges(cls, ranges, custom={}):
+		"""Counts By Ranges
+
+		Returns the counts grouped by range and user for many ranges in a
+		single pass over the table. Ranges should not overlap, a record that
+		falls in more than one is only counted in the first
+
+		Arguments:
+			ranges (list): List of [date, start, end], the date the range is
+				returned under, and its starting and ending timestamps
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict[]
+		"""
+
+		# If there's no ranges
+		if not ranges:
+			return []
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Generate the SQL
+		sSQL = "SELECT CASE\n" \
+				"%(cases)s\n" \
+				"END as `date`, `memo_id`, COUNT(*) as `count`\n" \
+				"FROM `%(db)s`.`%(table)s`\n" \
+				"WHERE `_created` BETWEEN FROM_UNIXTIME(%(start)d) AND FROM_UNIXTIME(%(end)d)\n" \
+				"GROUP BY `date`, `memo_id`\n" \
+				"HAVING `date` IS NOT NULL" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"cases": '\n'.join([
+				"	WHEN `_created` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d) THEN '%s'" % (
+					l[1], l[2], l[0]
+				) for l in ranges
+			]),
+			"start": min([l[1] for l in ranges]),
+			"end": max([l[2] for l in ranges])
+		}
+
+		# Return all the records
+		return Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
+
 # TicketResolved class
 class TicketResolved(Record_MySQL.Record):
 	"""Ticket Resolved
@@ -1161,6 +1213,58 @@ class TicketResolved(Record_MySQL.Record):
 			Record_MySQL.ESelect.ALL
 		)
 
+	@classmethod
+	def countsByRanges(cls, ranges, custom={}):
+		"""Counts By Ranges
+
+		Returns the counts grouped by range and user for many ranges in a
+		single pass over the table. Ranges should not overlap, a record that
+		falls in more than one is only counted in the first
+
+		Arguments:
+			ranges (list): List of [date, start, end], the date the range is
+				returned under, and its starting and ending timestamps
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict[]
+		"""
+
+		# If there's no ranges
+		if not ranges:
+			return []
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Generate the SQL
+		sSQL = "SELECT CASE\n" \
+				"%(cases)s\n" \
+				"END as `date`, `memo_id`, COUNT(*) as `count`\n" \
+				"FROM `%(db)s`.`%(table)s`\n" \
+				"WHERE `_created` BETWEEN FROM_UNIXTIME(%(start)d) AND FROM_UNIXTIME(%(end)d)\n" \
+				"GROUP BY `date`, `memo_id`\n" \
+				"HAVING `date` IS NOT NULL" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"cases": '\n'.join([
+				"	WHEN `_created` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d) THEN '%s'" % (
+					l[1], l[2], l[0]
+				) for l in ranges
+			]),
+			"start": min([l[1] for l in ranges]),
+			"end": max([l[2] for l in ranges])
+		}
+
+		# Return all the records
+		return Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
+
 # TicketStat class
 class TicketStat(Record_MySQL.Record):
 	"""Ticket Stat
@@ -45,6 +45,49 @@ class UrlRecord(Record_MySQL.Record):
 		# Return the config
 		return cls._conf
 
+	@classmethod
+	def incrementViews(cls, counts, custom={}):
+		"""Increment Views
+
+		Increases the view counts of multiple urls in a single statement
+
+		Arguments:
+			counts (dict): The number of views to add by url ID
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# If there's nothing to do
+		if not counts:
+			return 0
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Increment all the views at once
+		return Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"UPDATE `%(db)s`.`%(table)s` " \
+			"SET `views` = `views` + CASE `%(primary)s` %(cases)s END " \
+			"WHERE `%(primary)s` IN ('%(ids)s')" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"primary": dStruct['primary'],
+				"cases": ' '.join([
+					"WHEN '%s' THEN %d" % (Record_MySQL.Commands.escape(dStruct['host'], k), v)
+					for k,v in counts.items()
+				]),
+				"ids": "','".join([
+					Record_MySQL.Commands.escape(dStruct['host'], k)
+					for k in counts
+				])
+			}
+		)
+
 	def incrementView(self):
 		"""Increment View
 
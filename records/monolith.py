@@ -679,14 +679,20 @@ class CustomerCommunication(Record_MySQL.Record):
 		return {d['fromPhone']:d['count'] for d in lRecords}
 
 	@classmethod
-	def thread(cls, number, custom={}):
+	def thread(cls, number, limit=None, before=None, custom={}):
 		"""Thread
 
 		Fetches all the records in or out associated with a phone number in
-		chronological order
+		chronological order. If a limit is passed, only the most recent
+		messages, older than before if passed, are returned, still in
+		chronological order. Pages are ordered by createdAt then id, so the
+		message passed as before is looked up for both
 
 		Arguments:
 			number (str): The phone number to look up
+			limit (uint): Optional, the max number of messages to return
+			before (uint): Optional, the ID of the oldest message already
+				fetched, only messages before it are returned
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
@@ -698,6 +704,49 @@ class CustomerCommunication(Record_MySQL.Record):
 		# Fetch the record structure
 		dStruct = cls.struct(custom)
 
+		# If we're paging
+		if limit:
+
+			# Generate the SQL, newest first, and flip it after
+			sSQL = "SELECT\n" \
+					"	`id`,\n" \
+					"	`status`,\n" \
+					"	`errorMessage`,\n" \
+					"	`fromPhone`,\n" \
+					"	`fromName`,\n" \
+					"	`notes`,\n" \
+					"	UNIX_TIMESTAMP(`createdAt`) as `createdAt`,\n" \
+					"	`type`\n" \
+					"FROM `%(db)s`.`%(table)s`\n" \
+					"WHERE (`fromPhone` IN ('%(number)s', '1%(number)s')\n" \
+					"OR `toPhone` IN ('%(number)s', '1%(number)s'))\n" \
+					"%(before)s" \
+					"ORDER BY `createdAt` DESC, `id` DESC\n" \
+					"LIMIT %(limit)d" % {
+					"db": dStruct['db'],
+					"table": dStruct['table'],
+					"number": Record_MySQL.Commands.escape(dStruct['host'], number),
+					"before": before and (
+						"AND (`createdAt` < (SELECT `createdAt` FROM `%(db)s`.`%(table)s` WHERE `id` = %(id)d)\n" \
+						"OR (`createdAt` = (SELECT `createdAt` FROM `%(db)s`.`%(table)s` WHERE `id` = %(id)d)\n" \
+						"AND `id` < %(id)d))\n" % {
+							"db": dStruct['db'],
+							"table": dStruct['table'],
+							"id": int(before)
+						}
+					) or '',
+					"limit": int(limit)
+				}
+
+			# Fetch the data and return it in chronological order
+			lRet = Record_MySQL.Commands.select(
+				dStruct['host'],
+				sSQL,
+				Record_MySQL.ESelect.ALL
+			)
+			lRet.reverse()
+			return lRet
+
 		# Generate the SQL
 		sSQL = "SELECT\n" \
 				"	`id`,\n" \
@@ -711,7 +760,7 @@ class CustomerCommunication(Record_MySQL.Record):
 				"FROM `%(db)s`.`%(table)s`\n" \
 				"WHERE `fromPhone` IN ('%(number)s', '1%(number)s')\n" \
 				"OR `toPhone` IN ('%(number)s', '1%(number)s')\n" \
-				"ORDER BY `createdAt` ASC" % {
+				"ORDER BY `createdAt` ASC, `id` ASC" % {
 				"db": dStruct['db'],
 				"table": dStruct['table'],
 				"number": Record_MySQL.Commands.escape(dStruct['host'], number)
@@ -739,6 +788,10 @@ class CustomerMsgPhone(Record_MySQL.Record):
 	OUTGOING = 1
 	"""Direction"""
 
+	PREVIEW = 2000
+	"""Max characters of recent messages kept in lastMsg, the full history is
+	in CustomerCommunication"""
+
 	@classmethod
 	def config(cls):
 		"""Config
@@ -768,7 +821,7 @@ class CustomerMsgPhone(Record_MySQL.Record):
 		Arguments:
 			direction (uint): The direction INCOMING/OUTGOING of the message
 			customerPhone (str): The number associated with the conversation
-			message (str): The message to prepend to the conversation
+			message (str): The message to prepend to the conversation preview
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
@@ -798,7 +851,7 @@ class CustomerMsgPhone(Record_MySQL.Record):
 				"	`lastMsgAt` = '%(dt)s',\n" \
 				"	`hiddenFlag` = '%(hidden)s',\n" \
 				"	`%(increment)s` = `%(increment)s` + 1,\n" \
-				"	`lastMsg` = CONCAT('%(message)s', IFNULL(`lastMsg`, '')),\n" \
+				"	`lastMsg` = LEFT(CONCAT('%(message)s', IFNULL(`lastMsg`, '')), %(preview)d),\n" \
 				"	`updatedAt` = '%(dt)s'\n" \
 				"WHERE `customerPhone` = '%(customerPhone)s'" % {
 			"db": dStruct['db'],
@@ -808,6 +861,7 @@ class CustomerMsgPhone(Record_MySQL.Record):
 			"customerPhone": Record_MySQL.Commands.escape(dStruct['host'], customerPhone),
 			"hidden": sHidden,
 			"increment": sIncrement,
+			"preview": cls.PREVIEW,
 			"dt": arrow.get().format('YYYY-MM-DD HH:mm:ss')
 		}
 
@@ -823,7 +877,7 @@ class CustomerMsgPhone(Record_MySQL.Record):
 
 		Arguments:
 			customerPhone (str): The number associated with the conversation
-			message (str): The message to prepend to the conversation
+			message (str): The message to prepend to the conversation preview
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
@@ -838,13 +892,14 @@ class CustomerMsgPhone(Record_MySQL.Record):
 		# Generate SQL
 		sSQL = "UPDATE `%(db)s`.`%(table)s` SET\n" \
 				"	`totalOutGoing` = `totalOutGoing` + 1,\n" \
-				"	`lastMsg` = CONCAT('%(message)s', IFNULL(`lastMsg`, '')),\n" \
+				"	`lastMsg` = LEFT(CONCAT('%(message)s', IFNULL(`lastMsg`, '')), %(preview)d),\n" \
 				"	`updatedAt` = '%(dt)s'\n" \
 				"WHERE `customerPhone` = '%(customerPhone)s'" % {
 			"db": dStruct['db'],
 			"table": dStruct['table'],
 			"message": Record_MySQL.Commands.escape(dStruct['host'], message),
 			"customerPhone": Record_MySQL.Commands.escape(dStruct['host'], customerPhone),
+			"preview": cls.PREVIEW,
 			"dt": arrow.get().format('YYYY-MM-DD HH:mm:ss')
 		}
 
@@ -966,7 +1021,16 @@ class CustomerMsgPhone(Record_MySQL.Record):
 		if 'name' in q and q['name']:
 			lWhere.append("`customerName` LIKE '%%%s%%'" % Record_MySQL.Commands.escape(dStruct['host'], q['name']))
 		if 'content' in q and q['content']:
-			lWhere.append("`lastMsg` LIKE '%%%s%%'" % Record_MySQL.Commands.escape(dStruct['host'], q['content']))
+			lWhere.append(
+				"RIGHT(`cmp`.`customerPhone`, 10) IN (\n" \
+				"	SELECT RIGHT(IF(`type` = 'Incoming', `fromPhone`, `toPhone`), 10)\n" \
+				"	FROM `%s`.`customer_communication`\n" \
+				"	WHERE `notes` LIKE '%%%s%%'\n" \
+				")" % (
+					dStruct['db'],
+					Record_MySQL.Commands.escape(dStruct['host'], q['content'])
+				)
+			)
 
 		# Generate SQL
 		sSQL = "SELECT\n" \
@@ -2196,8 +2260,6 @@ class KtOrder(Record_MySQL.Record):
 			"group_by": group_by and ('GROUP BY `%s`' % group_by) or ''
 		}
 
-		print(sSQL)
-
 		# Fetch and return the data
 		return Record_MySQL.Commands.select(
 			dStruct['host'],
@@ -2761,8 +2823,6 @@ class KtOrderContinuous(Record_MySQL.Record):
 			"group_by": group_by and ('GROUP BY `%s`' % group_by) or ''
 		}
 
-		print(sSQL)
-
 		# Fetch and return the data
 		return Record_MySQL.Commands.select(
 			dStruct['host'],
@@ -2867,6 +2927,446 @@ class KtOrderContinuous(Record_MySQL.Record):
 			Record_MySQL.ESelect.CELL
 		)
 
+# KtOrderQueueCount class
+class KtOrderQueueCount(object):
+	"""KtOrderQueueCount
+
+	Materialized counts of pending orders by queue, campaign type, state,
+	encounter, attention role, and whether the customer's conversation is
+	claimed, so the dashboards don't run the queue joins on every refresh.
+
+	The table is only ever written to by the methods below, so it has no
+	definition and isn't a Record. Counts are kept up to date by taking a
+	snapshot of the affected orders before and after a change and applying
+	the difference, and rebuilt from scratch by the queue_counts cron to pick
+	up anything changed outside of MeMS
+	"""
+
+	FIELDS = ['queue', 'group', 'state', 'encounter', 'role', 'claimed']
+	"""The fields that make up the key of each count"""
+
+	TABLE = 'kt_order_queue_count'
+	"""The name of the table"""
+
+	@classmethod
+	def _select(cls, where, custom={}):
+		"""Select
+
+		Generates the SQL that counts the pending orders straight from the
+		order tables, optionally limited by additional where clauses
+
+		Arguments:
+			where (str): Additional where clauses, starting with AND
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			str
+		"""
+
+		# Fetch the order structures
+		dOrder = KtOrder.struct(custom)
+		dCont = KtOrderContinuous.struct(custom)
+
+		# Fields and joins shared by new and continuous orders
+		sFields = "	IFNULL(`cmp`.`type`, '') AS `group`,\n" \
+					"	IFNULL(`kto`.`shipState`, '') AS `state`,\n" \
+					"	IFNULL(`ss`.`legalEncounterType`, '') AS `encounter`,\n" \
+					"	IFNULL(`os`.`attentionRole`, 'Not Assigned') AS `role`,\n" \
+					"	`cc`.`user` IS NOT NULL AS `claimed`,\n" \
+					"	COUNT(*) AS `count`\n"
+		sJoins = "LEFT JOIN `%(db)s`.`campaign` AS `cmp` ON `cmp`.`id` = CONVERT(`kto`.`campaignId`, UNSIGNED)\n" \
+					"LEFT JOIN `%(db)s`.`smp_state` AS `ss` ON `ss`.`abbreviation` = `kto`.`shipState`\n" \
+					"LEFT JOIN `%(db)s`.`smp_order_status` AS `os` ON `os`.`orderId` = `kto`.`orderId`\n" \
+					"LEFT JOIN `%(db)s`.`customer_claimed` AS `cc` ON `cc`.`phoneNumber` = `kto`.`phoneNumber`\n" % {
+			"db": dOrder['db']
+		}
+
+		# Generate the SQL, pending new orders, then pending continuous orders,
+		#	either expiring or meds not working
+		return "SELECT 'new' AS `queue`,\n" \
+				"%(fields)s" \
+				"FROM `%(db)s`.`%(order)s` AS `kto`\n" \
+				"%(joins)s" \
+				"WHERE `kto`.`orderStatus` = 'PENDING'\n" \
+				"AND IFNULL(`kto`.`cardType`, '') <> 'TESTCARD'\n" \
+				"%(where)s\n" \
+				"GROUP BY 1, 2, 3, 4, 5, 6\n" \
+				"UNION ALL\n" \
+				"SELECT IF(`cont`.`active` = 1, 'expiring', 'mnw') AS `queue`,\n" \
+				"%(fields)s" \
+				"FROM `%(db)s`.`%(cont)s` AS `cont`\n" \
+				"JOIN `%(db)s`.`%(order)s` AS `kto` ON `kto`.`orderId` = `cont`.`orderId`\n" \
+				"%(joins)s" \
+				"WHERE `cont`.`status` = 'PENDING'\n" \
+				"AND ((\n" \
+				"	`cont`.`active` = 1 AND `cont`.`medsNotWorking` = 0 AND\n" \
+				"	IFNULL(`kto`.`cardType`, '') <> 'TESTCARD'\n" \
+				") OR (\n" \
+				"	`cont`.`active` = 0 AND `cont`.`medsNotWorking` = 1\n" \
+				"))\n" \
+				"%(where)s\n" \
+				"GROUP BY 1, 2, 3, 4, 5, 6" % {
+			"db": dOrder['db'],
+			"order": dOrder['table'],
+			"cont": dCont['table'],
+			"fields": sFields,
+			"joins": sJoins,
+			"where": where
+		}
+
+	@classmethod
+	def _toDict(cls, rows):
+		"""To Dict
+
+		Converts count rows into a dict of count by key tuple
+
+		Arguments:
+			rows (dict[]): The rows to convert
+
+		Returns:
+			dict
+		"""
+		return {
+			tuple([d[s] if s != 'claimed' else int(d[s]) for s in cls.FIELDS]): int(d['count'])
+			for d in rows
+		}
+
+	@classmethod
+	def apply(cls, before, after, custom={}):
+		"""Apply
+
+		Adds the difference between two snapshots to the stored counts
+
+		Arguments:
+			before (dict): The snapshot taken before the change
+			after (dict): The snapshot taken after the change
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# Calculate the deltas
+		dDeltas = {}
+		for t in set(before) | set(after):
+			i = after.get(t, 0) - before.get(t, 0)
+			if i:
+				dDeltas[t] = i
+
+		# If nothing changed
+		if not dDeltas:
+			return 0
+
+		# Fetch the structure
+		dStruct = cls.struct(custom)
+
+		# Upsert all the deltas at once
+		return Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"INSERT INTO `%(db)s`.`%(table)s` (`%(fields)s`, `count`)\n" \
+			"VALUES %(values)s\n" \
+			"ON DUPLICATE KEY UPDATE `count` = `count` + VALUES(`count`)" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"fields": '`, `'.join(cls.FIELDS),
+				"values": ', '.join([
+					"('%s', %d, %d)" % (
+						"', '".join([
+							Record_MySQL.Commands.escape(dStruct['host'], s)
+							for s in t[:-1]
+						]),
+						t[-1], i
+					) for t,i in dDeltas.items()
+				])
+			}
+		)
+
+	@classmethod
+	def byState(cls, queue, group, roles, custom={}):
+		"""By State
+
+		Returns the count of pending, claimed or not, orders in the queue for
+		the given campaign type and attention roles, by state
+
+		Arguments:
+			queue (str): 'new', 'expiring', or 'mnw'
+			group (str): 'ed' or 'hrt'
+			roles (str[]): The attention roles to count
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict
+		"""
+
+		# Fetch the structure
+		dStruct = cls.struct(custom)
+
+		# Generate the SQL
+		sSQL = "SELECT `state`, SUM(`count`) AS `count`\n" \
+				"FROM `%(db)s`.`%(table)s`\n" \
+				"WHERE `queue` = '%(queue)s'\n" \
+				"AND `group` = '%(group)s'\n" \
+				"AND `role` IN ('%(roles)s')\n" \
+				"GROUP BY `state`" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"queue": queue,
+			"group": group,
+			"roles": "','".join(roles)
+		}
+
+		# Fetch the data and return it by state
+		return {
+			d['state']: int(d['count'])
+			for d in Record_MySQL.Commands.select(
+				dStruct['host'],
+				sSQL,
+				Record_MySQL.ESelect.ALL
+			)
+		}
+
+	@classmethod
+	def check(cls, custom={}):
+		"""Check
+
+		Compares the stored counts to the live ones and returns every key that
+		doesn't match as a tuple of key, stored, and live
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			list
+		"""
+
+		# Fetch the structure
+		dStruct = cls.struct(custom)
+
+		# Get the stored counts, ignoring empty ones
+		dStored = {
+			t:i for t,i in cls._toDict(
+				Record_MySQL.Commands.select(
+					dStruct['host'],
+					"SELECT * FROM `%(db)s`.`%(table)s`" % {
+						"db": dStruct['db'],
+						"table": dStruct['table']
+					},
+					Record_MySQL.ESelect.ALL
+				)
+			).items() if i
+		}
+
+		# Get the live counts
+		dLive = cls.snapshot(custom=custom)
+
+		# Return the differences
+		return [
+			(t, dStored.get(t, 0), dLive.get(t, 0))
+			for t in sorted(set(dStored) | set(dLive))
+			if dStored.get(t, 0) != dLive.get(t, 0)
+		]
+
+	@classmethod
+	def csr(cls, custom={}):
+		"""CSR
+
+		Returns the count of pending new orders set to the CSR role, and
+		pending meds not working continuous orders, whose conversations
+		aren't claimed
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# Fetch the structure
+		dStruct = cls.struct(custom)
+
+		# Fetch and return the count
+		return int(Record_MySQL.Commands.select(
+			dStruct['host'],
+			"SELECT IFNULL(SUM(`count`), 0)\n" \
+			"FROM `%(db)s`.`%(table)s`\n" \
+			"WHERE `claimed` = 0\n" \
+			"AND (\n" \
+			"	(`queue` = 'new' AND `role` = 'CSR') OR\n" \
+			"	(`queue` = 'mnw' AND `group` <> '')\n" \
+			")" % {
+				"db": dStruct['db'],
+				"table": dStruct['table']
+			},
+			Record_MySQL.ESelect.CELL
+		))
+
+	@classmethod
+	def rebuild(cls, custom={}):
+		"""Rebuild
+
+		Replaces all the stored counts with ones counted from the order tables
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# Fetch the structure
+		dStruct = cls.struct(custom)
+
+		# Replace the counts in one transaction so the dashboards never see
+		#	an empty table
+		Record_MySQL.Commands.execute(dStruct['host'], 'START TRANSACTION')
+		try:
+			Record_MySQL.Commands.execute(
+				dStruct['host'],
+				"DELETE FROM `%(db)s`.`%(table)s`" % {
+					"db": dStruct['db'],
+					"table": dStruct['table']
+				}
+			)
+			iRows = Record_MySQL.Commands.execute(
+				dStruct['host'],
+				"INSERT INTO `%(db)s`.`%(table)s` (`%(fields)s`, `count`)\n" \
+				"%(select)s" % {
+					"db": dStruct['db'],
+					"table": dStruct['table'],
+					"fields": '`, `'.join(cls.FIELDS),
+					"select": cls._select('', custom)
+				}
+			)
+			Record_MySQL.Commands.execute(dStruct['host'], 'COMMIT')
+		except Exception:
+			Record_MySQL.Commands.execute(dStruct['host'], 'ROLLBACK')
+			raise
+
+		# Return the number of counts stored
+		return iRows
+
+	@classmethod
+	def snapshot(cls, customer_id=None, order_id=None, phone=None, custom={}):
+		"""Snapshot
+
+		Returns the live counts of pending orders, limited to those belonging
+		to the customer, the order, or the phone number(s) if any are passed,
+		as a dict of count by key tuple
+
+		Arguments:
+			customer_id (uint): Optional, the ID of the customer
+			order_id (str): Optional, the ID of the order
+			phone (str|str[]): Optional, the phone number(s) of the customer
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict
+		"""
+
+		# Fetch the structure
+		dStruct = cls.struct(custom)
+
+		# Generate the where clauses
+		lWhere = []
+		if customer_id:
+			lWhere.append("`kto`.`customerId` = '%s'" % Record_MySQL.Commands.escape(dStruct['host'], str(customer_id)))
+		if order_id:
+			lWhere.append("`kto`.`orderId` = '%s'" % Record_MySQL.Commands.escape(dStruct['host'], order_id))
+		if phone:
+			if not isinstance(phone, list):
+				phone = [phone]
+			lWhere.append("`kto`.`phoneNumber` IN ('%s')" % "','".join([
+				Record_MySQL.Commands.escape(dStruct['host'], s)
+				for s in phone
+			]))
+
+		# Fetch and return the counts
+		return cls._toDict(
+			Record_MySQL.Commands.select(
+				dStruct['host'],
+				cls._select(
+					lWhere and ('AND (%s)' % ' OR '.join(lWhere)) or '',
+					custom
+				),
+				Record_MySQL.ESelect.ALL
+			)
+		)
+
+	@classmethod
+	def struct(cls, custom={}):
+		"""Struct
+
+		Returns the host, DB, and table of the counts, the same host and DB as
+		the orders
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict
+		"""
+		dStruct = KtOrder.struct(custom)
+		return {
+			"db": dStruct['db'],
+			"host": dStruct['host'],
+			"table": cls.TABLE
+		}
+
+	@classmethod
+	def tableCreate(cls, custom={}):
+		"""Table Create
+
+		Creates the table to store the counts in
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			bool
+		"""
+
+		# Fetch the structure
+		dStruct = cls.struct(custom)
+
+		# Create the table
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"CREATE TABLE IF NOT EXISTS `%(db)s`.`%(table)s` (\n" \
+			"	`queue` ENUM('new', 'expiring', 'mnw') NOT NULL,\n" \
+			"	`group` VARCHAR(16) NOT NULL,\n" \
+			"	`state` VARCHAR(32) NOT NULL,\n" \
+			"	`encounter` VARCHAR(8) NOT NULL,\n" \
+			"	`role` VARCHAR(32) NOT NULL,\n" \
+			"	`claimed` TINYINT(1) UNSIGNED NOT NULL,\n" \
+			"	`count` INT NOT NULL DEFAULT 0,\n" \
+			"	PRIMARY KEY (`queue`, `group`, `state`, `encounter`, `role`, `claimed`)\n" \
+			") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4" % {
+				"db": dStruct['db'],
+				"table": dStruct['table']
+			}
+		)
+
+		# Return OK
+		return True
+
 # ShippingInfo class
 class ShippingInfo(Record_MySQL.Record):
 	"""ShippingInfo
@@ -3581,6 +4081,37 @@ class TfAnswer(Record_MySQL.Record):
 		# Return the answer
 		return dAnswer['value']
 
+	@classmethod
+	def grouped(cls, filter, key='ref', custom={}):
+		"""Grouped
+
+		Fetches the answers matching the filter, for any number of landings,
+		in a single query, and returns their values by lowercase landing ID
+		and then by the key field
+
+		Arguments:
+			filter (dict): The filter passed to TfAnswer.filter
+			key (str): The field to store the values under, ref or questionId
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict
+		"""
+
+		# Init the return
+		dRet = {}
+
+		# Fetch the answers and group them by landing
+		for d in cls.filter(filter, raw=['landing_id', key, 'value'], custom=custom):
+			sLanding = d['landing_id'].lower()
+			try: dRet[sLanding][d[key]] = d['value']
+			except KeyError: dRet[sLanding] = {d[key]: d['value']}
+
+		# Return the answers
+		return dRet
+
 	@classmethod
 	def reviewWithCustomerId(cls, last_id, custom={}):
 		"""Review With Customer Id
@@ -3619,6 +4150,213 @@ class TfAnswer(Record_MySQL.Record):
 			Record_MySQL.ESelect.ALL
 		)
 
+# TfForm class
+class TfForm(object):
+	"""TfForm
+
+	Process wide cache of form definitions, the active questions, their
+	options grouped by question, and the HRT symptom categories, by form ID.
+
+	Definitions almost never change, so once a form is loaded it's only
+	checked again after CHECK seconds, and then with a single query that
+	fingerprints every stale form at once. Forms whose fingerprint changed
+	are reloaded
+	"""
+
+	CHECK = 60
+	"""The seconds a form is trusted before its version is checked again"""
+
+	_forms = {}
+	"""The cached forms by ID"""
+
+	@classmethod
+	def _load(cls, forms, custom={}):
+		"""Load
+
+		Fetches the definitions of the given forms
+
+		Arguments:
+			forms (str[]): The IDs of the forms to load
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict
+		"""
+
+		# Init the forms
+		dForms = {s: {
+			"questions": [],
+			"options": {},
+			"categories": []
+		} for s in forms}
+
+		# Fetch the active questions
+		lQuestions = TfQuestion.filter(
+			{"formId": forms, "activeFlag": 'Y'},
+			raw=['formId', 'ref', 'title', 'type'],
+			orderby='questionNumber',
+			custom=custom
+		)
+
+		# Store them by form, and note which form each ref is in
+		dRefs = {}
+		for d in lQuestions:
+			sForm = d.pop('formId')
+			dForms[sForm]['questions'].append(d)
+			try: dRefs[d['ref']].append(sForm)
+			except KeyError: dRefs[d['ref']] = [sForm]
+
+		# Fetch the options for the questions and group them by question
+		if dRefs:
+			for d in TfQuestionOption.filter(
+				{"questionRef": list(dRefs.keys()), "activeFlag": 'Y'},
+				raw=['questionRef', 'displayOrder', 'option'],
+				orderby=['questionRef', 'displayOrder'],
+				custom=custom
+			):
+				for sForm in dRefs[d['questionRef']]:
+					try: dForms[sForm]['options'][d['questionRef']].append(d['option'])
+					except KeyError: dForms[sForm]['options'][d['questionRef']] = [d['option']]
+
+		# Fetch the HRT symptom categories
+		for d in HormoneSymptomToQuestion.filter(
+			{"formId": forms},
+			raw=['formId', 'questionRef', 'title', 'category'],
+			custom=custom
+		):
+			dForms[d['formId']]['categories'].append(d)
+
+		# Return the forms
+		return dForms
+
+	@classmethod
+	def _versions(cls, forms, custom={}):
+		"""Versions
+
+		Fingerprints the definitions of the given forms with the count and the
+		sum of the checksums of every question, option, and category row
+
+		Arguments:
+			forms (str[]): The IDs of the forms to fingerprint
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict
+		"""
+
+		# Fetch the record structures
+		dQuestion = TfQuestion.struct(custom)
+		dOption = TfQuestionOption.struct(custom)
+		dCategory = HormoneSymptomToQuestion.struct(custom)
+
+		# Generate the list of forms
+		sForms = "','".join([
+			Record_MySQL.Commands.escape(dQuestion['host'], s)
+			for s in forms
+		])
+
+		# Generate SQL
+		sSQL = "SELECT `formId`, CONCAT(COUNT(*), ':', SUM(`crc`)) AS `version`\n" \
+				"FROM (\n" \
+				"	SELECT `tfq`.`formId`, CRC32(CONCAT_WS('|',\n" \
+				"		`tfq`.`ref`, `tfq`.`title`, `tfq`.`type`,\n" \
+				"		`tfq`.`questionNumber`, `tfq`.`activeFlag`,\n" \
+				"		`tfqo`.`displayOrder`, `tfqo`.`option`, `tfqo`.`activeFlag`\n" \
+				"	)) AS `crc`\n" \
+				"	FROM `%(db)s`.`%(question)s` AS `tfq`\n" \
+				"	LEFT JOIN `%(db)s`.`%(option)s` AS `tfqo`\n" \
+				"		ON `tfqo`.`questionRef` = `tfq`.`ref`\n" \
+				"	WHERE `tfq`.`formId` IN ('%(forms)s')\n" \
+				"	UNION ALL\n" \
+				"	SELECT `formId`, CRC32(CONCAT_WS('|',\n" \
+				"		`questionRef`, `title`, `category`\n" \
+				"	))\n" \
+				"	FROM `%(db)s`.`%(category)s`\n" \
+				"	WHERE `formId` IN ('%(forms)s')\n" \
+				") AS `t`\n" \
+				"GROUP BY `formId`" % {
+			"db": dQuestion['db'],
+			"question": dQuestion['table'],
+			"option": dOption['table'],
+			"category": dCategory['table'],
+			"forms": sForms
+		}
+
+		# Fetch the versions, forms with no rows at all get an empty version
+		dRet = {s: '' for s in forms}
+		for d in Record_MySQL.Commands.select(
+			dQuestion['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		):
+			dRet[d['formId']] = d['version']
+
+		# Return the versions
+		return dRet
+
+	@classmethod
+	def clear(cls):
+		"""Clear
+
+		Empties the cache so every form is loaded again on its next use
+
+		Returns:
+			None
+		"""
+		cls._forms = {}
+
+	@classmethod
+	def get(cls, forms, custom={}):
+		"""Get
+
+		Returns the definitions of the given forms from the cache, checking
+		and reloading any that are stale first. The returned dicts are shared,
+		callers must copy anything they intend to modify
+
+		Arguments:
+			forms (str[]): The IDs of the forms to get
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict
+		"""
+
+		# Find the forms we've never loaded, or haven't checked in a while
+		iNow = int(time())
+		lStale = [
+			s for s in set(forms)
+			if s not in cls._forms or cls._forms[s]['checked'] + cls.CHECK <= iNow
+		]
+
+		# If there's any
+		if lStale:
+
+			# Fingerprint them all at once
+			dVersions = cls._versions(lStale, custom)
+
+			# Find the ones that changed, or are new, and reload them
+			lChanged = [
+				s for s in lStale
+				if s not in cls._forms or cls._forms[s]['version'] != dVersions[s]
+			]
+			if lChanged:
+				for sForm, dForm in cls._load(lChanged, custom).items():
+					dForm['version'] = dVersions[sForm]
+					cls._forms[sForm] = dForm
+
+			# Mark them all as checked
+			for s in lStale:
+				cls._forms[s]['checked'] = iNow
+
+		# Return the forms
+		return {s: cls._forms[s] for s in set(forms)}
+
 # TfLanding class
 class TfLanding(Record_MySQL.Record):
 	"""TfLanding
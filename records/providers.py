@@ -355,3 +355,275 @@ class Tracking(Record_MySQL.Record):
 			sSQL,
 			Record_MySQL.ESelect.ALL
 		)
+
+# TrackingDaily class
+class TrackingDaily(object):
+	"""Tracking Daily
+
+	Per provider daily totals of the tracking records, the seconds signed in,
+	and the number of approvals and declines, so hours reports don't have to
+	read every tracking record in the range. Days are by the date of
+	`action_ts`, the same as the tracking range queries.
+
+	The table is only ever written to by the methods below, so it has no
+	definition and isn't a Record
+	"""
+
+	TABLE = 'tracking_daily'
+	"""The name of the table"""
+
+	_AGGREGATE = "	IFNULL(SUM(IF(`action` = 'signin', UNIX_TIMESTAMP(`resolution_ts`) - UNIX_TIMESTAMP(`action_ts`), 0)), 0) AS `seconds`,\n" \
+					"	IFNULL(SUM(`action` = 'viewed' AND `resolution` = 'approved'), 0) AS `approvals`,\n" \
+					"	IFNULL(SUM(`action` = 'viewed' AND `resolution` = 'declined'), 0) AS `declines`,\n" \
+					"	COUNT(*) AS `records`\n"
+	"""The totals calculated from the tracking records"""
+
+	_COMPLETE = "AND (\n" \
+				"	`resolution_ts` IS NOT NULL OR\n" \
+				"	`action` = 'sms'\n" \
+				")\n"
+	"""The tracking records counted, the same as Tracking.range"""
+
+	@classmethod
+	def hours(cls, start, end, custom={}):
+		"""Hours
+
+		Returns the totals per provider for the given range. Days entirely in
+		the range come from the daily totals, the first and last day are
+		calculated from the tracking records as they may be partial
+
+		Arguments:
+			start (uint): The start timestamp
+			end (uint): The end timestamp
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict[]
+		"""
+
+		# Fetch the structures
+		dStruct = cls.struct(custom)
+		dTracking = Tracking.struct(custom)
+
+		# Generate the SQL
+		sSQL = "SELECT `memo_id`,\n" \
+				"	SUM(`seconds`) AS `seconds`,\n" \
+				"	SUM(`approvals`) AS `approvals`,\n" \
+				"	SUM(`declines`) AS `declines`\n" \
+				"FROM (\n" \
+				"	SELECT `memo_id`, `seconds`, `approvals`, `declines`, `records`\n" \
+				"	FROM `%(db)s`.`%(table)s`\n" \
+				"	WHERE `date` > DATE(FROM_UNIXTIME(%(start)d))\n" \
+				"	AND `date` < DATE(FROM_UNIXTIME(%(end)d))\n" \
+				"	UNION ALL\n" \
+				"	SELECT `memo_id`,\n" \
+				"%(aggregate)s" \
+				"	FROM `%(tracking_db)s`.`%(tracking_table)s`\n" \
+				"	WHERE `action_ts` BETWEEN FROM_UNIXTIME(%(start)d) AND FROM_UNIXTIME(%(end)d)\n" \
+				"	AND (\n" \
+				"		`action_ts` < DATE(FROM_UNIXTIME(%(start)d)) + INTERVAL 1 DAY OR\n" \
+				"		`action_ts` >= DATE(FROM_UNIXTIME(%(end)d))\n" \
+				"	)\n" \
+				"%(complete)s" \
+				"	GROUP BY `memo_id`\n" \
+				") AS `t`\n" \
+				"GROUP BY `memo_id`\n" \
+				"HAVING SUM(`records`) > 0" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"tracking_db": dTracking['db'],
+			"tracking_table": dTracking['table'],
+			"aggregate": cls._AGGREGATE,
+			"complete": cls._COMPLETE,
+			"start": int(start),
+			"end": int(end)
+		}
+
+		# Fetch the totals, converting the sums from decimals
+		return [{
+			"memo_id": d['memo_id'],
+			"seconds": int(d['seconds']),
+			"approvals": int(d['approvals']),
+			"declines": int(d['declines'])
+		} for d in Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)]
+
+	@classmethod
+	def rebuild(cls, custom={}):
+		"""Rebuild
+
+		Replaces all the daily totals with ones calculated from every tracking
+		record
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# Fetch the structures
+		dStruct = cls.struct(custom)
+		dTracking = Tracking.struct(custom)
+
+		# Replace the totals in one transaction
+		Record_MySQL.Commands.execute(dStruct['host'], 'START TRANSACTION')
+		try:
+			Record_MySQL.Commands.execute(
+				dStruct['host'],
+				"DELETE FROM `%(db)s`.`%(table)s`" % {
+					"db": dStruct['db'],
+					"table": dStruct['table']
+				}
+			)
+			iRows = Record_MySQL.Commands.execute(
+				dStruct['host'],
+				"INSERT INTO `%(db)s`.`%(table)s` (`date`, `memo_id`, `seconds`, `approvals`, `declines`, `records`)\n" \
+				"SELECT DATE(`action_ts`), `memo_id`,\n" \
+				"%(aggregate)s" \
+				"FROM `%(tracking_db)s`.`%(tracking_table)s`\n" \
+				"WHERE 1\n" \
+				"%(complete)s" \
+				"GROUP BY 1, 2" % {
+					"db": dStruct['db'],
+					"table": dStruct['table'],
+					"tracking_db": dTracking['db'],
+					"tracking_table": dTracking['table'],
+					"aggregate": cls._AGGREGATE,
+					"complete": cls._COMPLETE
+				}
+			)
+			Record_MySQL.Commands.execute(dStruct['host'], 'COMMIT')
+		except Exception:
+			Record_MySQL.Commands.execute(dStruct['host'], 'ROLLBACK')
+			raise
+
+		# Return the number of totals stored
+		return iRows
+
+	@classmethod
+	def refresh(cls, memo_id, ts, custom={}):
+		"""Refresh
+
+		Recalculates the totals for a single provider and day from the
+		tracking records
+
+		Arguments:
+			memo_id (uint): The ID of the provider
+			ts (uint): Any timestamp in the day
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# Fetch the structures
+		dStruct = cls.struct(custom)
+		dTracking = Tracking.struct(custom)
+
+		# Recalculate and store the totals
+		return Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"INSERT INTO `%(db)s`.`%(table)s` (`date`, `memo_id`, `seconds`, `approvals`, `declines`, `records`)\n" \
+			"SELECT DATE(FROM_UNIXTIME(%(ts)d)), %(memo_id)d,\n" \
+			"%(aggregate)s" \
+			"FROM `%(tracking_db)s`.`%(tracking_table)s`\n" \
+			"WHERE `memo_id` = %(memo_id)d\n" \
+			"AND `action_ts` >= DATE(FROM_UNIXTIME(%(ts)d))\n" \
+			"AND `action_ts` < DATE(FROM_UNIXTIME(%(ts)d)) + INTERVAL 1 DAY\n" \
+			"%(complete)s" \
+			"ON DUPLICATE KEY UPDATE\n" \
+			"	`seconds` = VALUES(`seconds`),\n" \
+			"	`approvals` = VALUES(`approvals`),\n" \
+			"	`declines` = VALUES(`declines`),\n" \
+			"	`records` = VALUES(`records`)" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"tracking_db": dTracking['db'],
+				"tracking_table": dTracking['table'],
+				"aggregate": cls._AGGREGATE,
+				"complete": cls._COMPLETE,
+				"memo_id": int(memo_id),
+				"ts": int(ts)
+			}
+		)
+
+	@classmethod
+	def struct(cls, custom={}):
+		"""Struct
+
+		Returns the host, DB, and table of the totals, the same host and DB as
+		the tracking records
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict
+		"""
+		dStruct = Tracking.struct(custom)
+		return {
+			"db": dStruct['db'],
+			"host": dStruct['host'],
+			"table": cls.TABLE
+		}
+
+	@classmethod
+	def tableCreate(cls, custom={}):
+		"""Table Create
+
+		Creates the table to store the totals in
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			bool
+		"""
+
+		# Fetch the structure
+		dStruct = cls.struct(custom)
+
+		# Create the table
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"CREATE TABLE IF NOT EXISTS `%(db)s`.`%(table)s` (\n" \
+			"	`date` DATE NOT NULL,\n" \
+			"	`memo_id` INT UNSIGNED NOT NULL,\n" \
+			"	`seconds` BIGINT NOT NULL DEFAULT 0,\n" \
+			"	`approvals` INT UNSIGNED NOT NULL DEFAULT 0,\n" \
+			"	`declines` INT UNSIGNED NOT NULL DEFAULT 0,\n" \
+			"	`records` INT UNSIGNED NOT NULL DEFAULT 0,\n" \
+			"	PRIMARY KEY (`date`, `memo_id`)\n" \
+			") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4" % {
+				"db": dStruct['db'],
+				"table": dStruct['table']
+			}
+		)
+
+		# Return OK
+		return True
+
+	@classmethod
+	def tableName(cls):
+		"""Table Name
+
+		Returns the name of the table
+
+		Returns:
+			str
+		"""
+		return cls.TABLE
@@ -18,6 +18,7 @@ import re
 
 # Pip imports
 from FormatOC import Tree
+import pymysql
 from RestOC import Conf, Record_MySQL
 
 # AdHoc class
@@ -273,10 +274,10 @@ class Eligibility(Record_MySQL.Record):
 		return cls._conf
 
 	@classmethod
-	def withCustomerData(cls, custom={}):
-		"""With Customer Data
+	def _withCustomerDataSQL(cls, custom={}):
+		"""With Customer Data SQL
 
-		Fetches data for generating the actually eligibility report
+		Generates the SQL to fetch the data for the eligibility report
 
 		Arguments:
 			custom (dict): Custom Host and DB info
@@ -284,7 +285,7 @@ class Eligibility(Record_MySQL.Record):
 				'append' optional postfix for dynamic DBs
 
 		Returns:
-			dict[]
+			str
 		"""
 
 		# Fetch the record structure
@@ -292,7 +293,7 @@ class Eligibility(Record_MySQL.Record):
 
 		# Generate the SQL to fetch all valid records with the customer data
 		#	and DOB
-		sSQL = "SELECT\n" \
+		return "SELECT\n" \
 				"	`wde`.`customerId` AS `customerId`,\n" \
 				"	`wde`.`memberSince` AS `memberSince`,\n" \
 				"	`wde`.`memberThru` AS `memberThru`,\n" \
@@ -317,13 +318,139 @@ class Eligibility(Record_MySQL.Record):
 			"table": dStruct['table']
 		}
 
+	@classmethod
+	def upsertMany(cls, rows, custom={}):
+		"""Upsert Many
+
+		Creates many eligibility records using multi-row inserts, updating the
+		member thru date of any that already exist, the same as calling
+		create(conflict=('memberThru', 'updatedAt')) on each
+
+		Arguments:
+			rows (dict[]): List of dicts with customerId, memberSince,
+				memberThru, createdAt, and updatedAt
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# If there's nothing to do
+		if not rows:
+			return 0
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Init the fields, adding the primary key if it's generated by SQL
+		lFields = ['customerId', 'memberSince', 'memberThru', 'createdAt', 'updatedAt']
+		sPrimary = None
+		if dStruct['auto_primary'] and isinstance(dStruct['auto_primary'], str):
+			sPrimary = dStruct['auto_primary']
+
+		# Go through the rows in batches
+		iRet = 0
+		for i in range(0, len(rows), 500):
+
+			# Generate the values for each row
+			lValues = []
+			for d in rows[i:i+500]:
+				lValues.append('(%s%s)' % (
+					sPrimary and ('%s, ' % sPrimary) or '',
+					', '.join([
+						cls.escape(dStruct['host'], dStruct['tree'][f].type(), d[f])
+						for f in lFields
+					])
+				))
+
+			# Generate SQL
+			sSQL = 'INSERT INTO `%(db)s`.`%(table)s` (%(primary)s%(fields)s)\n' \
+					'VALUES %(values)s\n' \
+					'ON DUPLICATE KEY UPDATE\n' \
+					'	`memberThru` = VALUES(`memberThru`),\n' \
+					'	`updatedAt` = VALUES(`updatedAt`)' % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"primary": sPrimary and ('`%s`, ' % dStruct['primary']) or '',
+				"fields": ', '.join(['`%s`' % f for f in lFields]),
+				"values": ',\n'.join(lValues)
+			}
+
+			# Execute the SQL
+			iRet += Record_MySQL.Commands.execute(
+				dStruct['host'],
+				sSQL
+			)
+
+		# Return the number of affected rows
+		return iRet
+
+	@classmethod
+	def withCustomerData(cls, custom={}):
+		"""With Customer Data
+
+		Fetches data for generating the actually eligibility report
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict[]
+		"""
+
 		# Run the select and return the data
 		return Record_MySQL.Commands.select(
-			dStruct['host'],
-			sSQL,
+			cls.struct(custom)['host'],
+			cls._withCustomerDataSQL(custom),
 			Record_MySQL.ESelect.ALL
 		)
 
+	@classmethod
+	def withCustomerDataStream(cls, custom={}):
+		"""With Customer Data Stream
+
+		Same as withCustomerData but yields the rows one at a time from a
+		server side cursor, so memory doesn't grow with membership. A separate
+		connection is used as the shared one can't be used by anything else
+		until an unbuffered result is fully read
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			generator
+		"""
+
+		# Get the host info
+		dHost = dict(Conf.get(('mysql', 'hosts', cls.struct(custom)['host'])))
+		if 'charset' not in dHost:
+			dHost['charset'] = 'utf8'
+
+		# Return dates and times as strings, the same as the shared connection
+		dConv = pymysql.converters.conversions.copy()
+		for k in [7, 10, 11, 12]:
+			dConv[k] = str
+
+		# Connect and stream the rows
+		oCon = pymysql.connect(
+			conv=dConv,
+			cursorclass=pymysql.cursors.SSDictCursor,
+			**dHost
+		)
+		try:
+			with oCon.cursor() as oCursor:
+				oCursor.execute(cls._withCustomerDataSQL(custom))
+				for d in oCursor:
+					yield d
+		finally:
+			oCon.close()
+
 # NeverStarted class
 class NeverStarted(Record_MySQL.Record):
 	"""Never Started
@@ -662,6 +789,71 @@ class RxNumber(Record_MySQL.Record):
 		# Return the config
 		return cls._conf
 
+	@classmethod
+	def upsertMany(cls, rows, custom={}):
+		"""Upsert Many
+
+		Creates or replaces the numbers for many members using multi-row
+		inserts, the same as calling create(conflict=['number']) on each
+
+		Arguments:
+			rows (dict[]): List of dicts with member_id and number
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# If there's nothing to do
+		if not rows:
+			return 0
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Init the fields, adding the primary key if it's generated by SQL
+		lFields = ['member_id', 'number']
+		sPrimary = None
+		if dStruct['auto_primary'] and isinstance(dStruct['auto_primary'], str):
+			sPrimary = dStruct['auto_primary']
+
+		# Go through the rows in batches
+		iRet = 0
+		for i in range(0, len(rows), 500):
+
+			# Generate the values for each row
+			lValues = []
+			for d in rows[i:i+500]:
+				lValues.append('(%s%s)' % (
+					sPrimary and ('%s, ' % sPrimary) or '',
+					', '.join([
+						cls.escape(dStruct['host'], dStruct['tree'][f].type(), d[f])
+						for f in lFields
+					])
+				))
+
+			# Generate SQL
+			sSQL = 'INSERT INTO `%(db)s`.`%(table)s` (%(primary)s%(fields)s)\n' \
+					'VALUES %(values)s\n' \
+					'ON DUPLICATE KEY UPDATE `number` = VALUES(`number`)' % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"primary": sPrimary and ('`%s`, ' % dStruct['primary']) or '',
+				"fields": ', '.join(['`%s`' % f for f in lFields]),
+				"values": ',\n'.join(lValues)
+			}
+
+			# Execute the SQL
+			iRet += Record_MySQL.Commands.execute(
+				dStruct['host'],
+				sSQL
+			)
+
+		# Return the number of affected rows
+		return iRet
+
 # Trigger class
 class Trigger(Record_MySQL.Record):
 	"""Trigger
@@ -692,6 +884,261 @@ class Trigger(Record_MySQL.Record):
 		# Return the config
 		return cls._conf
 
+	@classmethod
+	def latestByCustomers(cls, crm_type, crm_ids, custom={}):
+		"""Latest By Customers
+
+		Fetches the latest non-update trigger for each of the given customers
+		in a single query
+
+		Arguments:
+			crm_type (str): The type of CRM the customers belong to
+			crm_ids (str[]): The IDs of the customers to look up
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict: crm_id => {_id, opened}
+		"""
+
+		# If there's nothing to look up
+		if not crm_ids:
+			return {}
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Generate SQL
+		sSQL = "SELECT `_id`, `crm_id`, `opened`\n" \
+				"FROM (\n" \
+				"	SELECT `_id`, `crm_id`, `opened`,\n" \
+				"		ROW_NUMBER() OVER (PARTITION BY `crm_id` ORDER BY `_created` DESC) as `row`\n" \
+				"	FROM `%(db)s`.`%(table)s`\n" \
+				"	WHERE `crm_type` = '%(crm_type)s'\n" \
+				"	AND `crm_id` IN (%(crm_ids)s)\n" \
+				"	AND `type` != 'update'\n" \
+				") as `wdt`\n" \
+				"WHERE `row` = 1" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"crm_type": Record_MySQL.Commands.escape(dStruct['host'], crm_type),
+			"crm_ids": ','.join([
+				"'%s'" % Record_MySQL.Commands.escape(dStruct['host'], s)
+				for s in crm_ids
+			])
+		}
+
+		# Execute the select and return the triggers by customer
+		return {
+			d['crm_id']:d for d in Record_MySQL.Commands.select(
+				dStruct['host'],
+				sSQL,
+				Record_MySQL.ESelect.ALL
+			)
+		}
+
+	@classmethod
+	def previousByMedication(cls, keys, custom={}):
+		"""Previous By Medication
+
+		Fetches every trigger for the given customer / medication pairs in a
+		single query, newest first, so the previous trigger for any number of
+		orders can be found without a query per order
+
+		Arguments:
+			keys (tuple[]): The crm_type, crm_id, and medication of each pair
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict: (crm_type, crm_id, medication) => dict[]
+		"""
+
+		# Remove duplicates
+		lKeys = list(set(keys))
+
+		# If there's nothing to look up
+		if not lKeys:
+			return {}
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Generate SQL
+		sSQL = "SELECT `_id`, `_created`, `crm_type`, `crm_id`, `crm_order`,\n" \
+				"	`medication`, `rx_id`\n" \
+				"FROM `%(db)s`.`%(table)s`\n" \
+				"WHERE (`crm_type`, `crm_id`, `medication`) IN (%(keys)s)\n" \
+				"ORDER BY `_created` DESC" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"keys": ','.join([
+				"('%s','%s','%s')" % tuple([
+					Record_MySQL.Commands.escape(dStruct['host'], s)
+					for s in t
+				]) for t in lKeys
+			])
+		}
+
+		# Init the return with every pair, and a lookup that ignores case the
+		#	same way the comparison in SQL does
+		dRet = {t: [] for t in lKeys}
+		dLookup = {tuple([s.lower() for s in t]): t for t in lKeys}
+
+		# Execute the select and add each trigger to its pair
+		for d in Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		):
+			dRet[dLookup[(
+				d['crm_type'].lower(), d['crm_id'].lower(), d['medication'].lower()
+			)]].append(d)
+
+		# Return the triggers
+		return dRet
+
+	@classmethod
+	def updateMany(cls, field_names, rows, custom={}):
+		"""Update Many
+
+		Updates the given fields on many triggers using one UPDATE per batch
+
+		Arguments:
+			field_names (str[]): The fields to update
+			rows (dict[]): List of dicts with _id and each field
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# If there's nothing to do
+		if not rows:
+			return 0
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Go through the rows in batches
+		iRet = 0
+		for i in range(0, len(rows), 500):
+			lRows = rows[i:i+500]
+
+			# Escape the IDs once
+			lIDs = [
+				cls.escape(dStruct['host'], dStruct['tree']['_id'].type(), d['_id'])
+				for d in lRows
+			]
+
+			# Generate a CASE for each field
+			lSets = []
+			for f in field_names:
+				lSets.append('`%s` = CASE `_id`\n%s\nEND' % (
+					f,
+					'\n'.join([
+						'	WHEN %s THEN %s' % (
+							lIDs[n],
+							cls.escape(dStruct['host'], dStruct['tree'][f].type(), d[f])
+						) for n,d in enumerate(lRows)
+					])
+				))
+
+			# Generate SQL
+			sSQL = 'UPDATE `%(db)s`.`%(table)s`\n' \
+					'SET %(sets)s\n' \
+					'WHERE `_id` IN (%(ids)s)' % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"sets": ',\n'.join(lSets),
+				"ids": ','.join(lIDs)
+			}
+
+			# Execute the SQL
+			iRet += Record_MySQL.Commands.execute(
+				dStruct['host'],
+				sSQL
+			)
+
+		# Return the number of affected rows
+		return iRet
+
+	@classmethod
+	def upsertMany(cls, rows, custom={}):
+		"""Upsert Many
+
+		Creates or replaces many triggers using multi-row inserts, the same as
+		calling create(conflict='replace') on each
+
+		Arguments:
+			rows (dict[]): List of dicts with crm_type, crm_id, crm_order,
+				medication, rx_id, type, and raw
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# If there's nothing to do
+		if not rows:
+			return 0
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Init the fields, adding the primary key if it's generated by SQL
+		lFields = ['crm_type', 'crm_id', 'crm_order', 'medication', 'rx_id', 'type', 'raw']
+		sPrimary = None
+		if dStruct['auto_primary'] and isinstance(dStruct['auto_primary'], str):
+			sPrimary = dStruct['auto_primary']
+
+		# Every inserted field is replaced on a duplicate
+		lUpdate = (sPrimary and [dStruct['primary']] or []) + lFields
+
+		# Go through the rows in batches
+		iRet = 0
+		for i in range(0, len(rows), 500):
+
+			# Generate the values for each row
+			lValues = []
+			for d in rows[i:i+500]:
+				lValues.append('(%s%s)' % (
+					sPrimary and ('%s, ' % sPrimary) or '',
+					', '.join([
+						cls.escape(dStruct['host'], dStruct['tree'][f].type(), d[f])
+						for f in lFields
+					])
+				))
+
+			# Generate SQL
+			sSQL = 'INSERT INTO `%(db)s`.`%(table)s` (%(primary)s%(fields)s)\n' \
+					'VALUES %(values)s\n' \
+					'ON DUPLICATE KEY UPDATE %(update)s' % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"primary": sPrimary and ('`%s`, ' % dStruct['primary']) or '',
+				"fields": ', '.join(['`%s`' % f for f in lFields]),
+				"values": ',\n'.join(lValues),
+				"update": ',\n'.join([
+					'`%s` = VALUES(`%s`)' % (f, f) for f in lUpdate
+				])
+			}
+
+			# Execute the SQL
+			iRet += Record_MySQL.Commands.execute(
+				dStruct['host'],
+				sSQL
+			)
+
+		# Return the number of affected rows
+		return iRet
+
 	@classmethod
 	def noFeedback(cls, older_than, custom={}):
 		"""No Feedback
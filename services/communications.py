@@ -14,12 +14,17 @@ __created__		= "2020-03-30"
 # Python imports
 from base64 import b64decode
 from hashlib import md5
+from time import time
 
 # Pip imports
-from RestOC import Conf, DictHelper, Errors, Services, SMTP, StrHelper
+from redis import StrictRedis
+from RestOC import Conf, DictHelper, Errors, JSON, Services, SMTP
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 
+# Shared imports
+from shared import Email
+
 class Service(Services.Service):
 	"""Service
 
@@ -35,42 +40,13 @@ class Service(Services.Service):
 			Service
 		"""
 
-		# Key for encrypting messages between communications and queue
-		self._queue_key = None
+		# Redis connection for the email queue
+		self._redis = None
 
 		# Twilio client
 		self._twilio = None
 		self._smsServices = {}
 
-	def _queueKey(self, data, key=None):
-		"""Queue Key
-
-		If nothing is passed, we are generating the key, else we are validating
-		it
-
-		Arguments:
-			data (dict): The data that was passed or retrieved
-			key (str): The key to validate if passed
-
-		Returns:
-			str|bool
-		"""
-
-		# Turn the data into a str and md5 it
-		sMD5 = md5(str(data).encode('utf-8')).hexdigest()
-
-		# If a key was received
-		if key:
-
-			# Decode it and see if it matches the data
-			return StrHelper.decrypt(self._queue_key, key) == sMD5
-
-		# Else
-		else:
-
-			# Generate and return a key
-			return StrHelper.encrypt(self._queue_key, sMD5)
-
 	def create(self, path, data, sesh=None, environ=None):
 		"""Create
 
@@ -131,91 +107,154 @@ class Service(Services.Service):
 		if 'from' not in data:
 			data['from'] = self.fromDefault
 
-		# If we got a _queue_ value
-		if '_queue_' in data:
-
-			# Store it
-			sQueueKey = data.pop('_queue_')
-
-			# If it's not valid
-			if not self._queueKey(data, sQueueKey):
-				return Services.Response(error=1001)
-
-			# Else, we're good
-			data['_queue_'] = True
-
-		# If we are sending direct, or we got a valid request from the queue
-		if self.emailMethod == 'direct' or '_queue_' in data:
-
-			# Init the attachments var
-			mAttachments = None
-
-			# If there's an attachment
-			if 'attachments' in data:
-
-				# Make sure it's a list
-				if not isinstance(data['attachments'], (list,tuple)):
-					data['attachments'] = [data['attachments']]
-
-				# Loop through the attachments
-				for i in range(len(data['attachments'])):
-
-					# If we didn't get a dictionary
-					if not isinstance(data['attachments'][i], dict):
-						return Services.Response(error=(1301, "attachments.%d" % i))
-
-					# If the fields are missing
-					try:
-						DictHelper.eval(data['attachments'][i], ['body', 'filename'])
-					except ValueError as e:
-						return Services.Responses(error=(1001, [("attachments.%d.%s" % (i, s), 'invalid') for s in e.args]))
+		# Init the attachments var
+		mAttachments = None
+
+		# If there's an attachment
+		if 'attachments' in data:
+
+			# Make sure it's a list
+			if not isinstance(data['attachments'], (list,tuple)):
+				data['attachments'] = [data['attachments']]
+
+			# Loop through the attachments
+			for i in range(len(data['attachments'])):
+
+				# If we didn't get a dictionary
+				if not isinstance(data['attachments'][i], dict):
+					return Services.Response(error=(1301, "attachments.%d" % i))
+
+				# If the fields are missing
+				try:
+					DictHelper.eval(data['attachments'][i], ['body', 'filename'])
+				except ValueError as e:
+					return Services.Response(error=(1001, [("attachments.%d.%s" % (i, s), 'invalid') for s in e.args]))
+
+				# Try to decode the base64
+				try:
+					b64decode(data['attachments'][i]['body'])
+				except (TypeError, ValueError):
+					return Services.Response(error=1302)
+
+			# Set the attachments from the data
+			mAttachments = data['attachments']
+
+		# Only send if anyone is allowed, or the to is in the allowed
+		if self.emailAllowed and data['to'] not in self.emailAllowed:
+			return Services.Response(True)
+
+		# If this is an email we only want sent once in a window, claim it
+		#	before sending so two identical requests can't both send it
+		sDedupe = None
+		if data.pop('dedupe', False):
+
+			# Generate a key from the content
+			sDedupe = 'email:dedupe:%s' % md5(JSON.encode([
+				data['to'], data['subject'], data['text_body'], data['html_body']
+			]).encode('utf-8')).hexdigest()
+
+			# If we've already sent it recently, do nothing
+			if not self._redis.set(sDedupe, 1, nx=True, ex=self._emailDedupe):
+				self._redis.hincrby(Email.STATS, 'deduped', 1)
+				return Services.Response(True)
+
+		# If we are sending direct
+		if self.emailMethod == 'direct':
+
+			# Send the e-mail
+			iRes = SMTP.send(
+				data['to'], data['subject'],
+				text_body=data['text_body'],
+				html_body=data['html_body'],
+				from_=data['from'],
+				attachments=mAttachments and [{
+					"body": b64decode(d['body']),
+					"filename": d['filename']
+				} for d in mAttachments] or None
+			)
+
+			# If there was an error, release the claim so it can be retried
+			if iRes != SMTP.OK:
+				if sDedupe:
+					self._redis.delete(sDedupe)
+				return Services.Response(error=(1303, '%i %s' % (iRes, SMTP.lastError())))
+
+		# Else, add it to the queue for nodes.email_queue to send
+		else:
+			try:
+				p = self._redis.pipeline()
+				p.lpush(Email.QUEUE, JSON.encode({
+					"to": data['to'],
+					"subject": data['subject'],
+					"text_body": data['text_body'],
+					"html_body": data['html_body'],
+					"from": data['from'],
+					"attachments": mAttachments,
+					"queued": time(),
+					"attempts": 0
+				}))
+				p.hincrby(Email.STATS, 'queued', 1)
+				p.execute()
+
+			# If it couldn't be queued, release the claim so it can be retried
+			except Exception:
+				if sDedupe:
+					try: self._redis.delete(sDedupe)
+					except Exception: pass
+				raise
 
-					# Try to decode the base64
-					try:
-						data['attachments'][i]['body'] = b64decode(data['attachments'][i]['body'])
-					except TypeError:
-						return Services.Response(error=1302)
+		# Return OK
+		return Services.Response(True)
 
-				# Set the attachments from the data
-				mAttachments = data['attachments']
+	def emailStats_read(self, data, sesh=None):
+		"""Email Stats
 
-			# Only send if anyone is allowed, or the to is in the allowed
-			if not self.emailAllowed or data['to'] in self.emailAllowed:
-
-				# Send the e-mail
-				iRes = SMTP.send(
-					data['to'], data['subject'],
-					text_body=data['text_body'],
-					html_body=data['html_body'],
-					from_=data['from'],
-					attachments=mAttachments
-				)
+		Returns the depth of the email queue, the counters kept by the queue
+		workers, and the latency, in milliseconds, from queued to sent
 
-				# If there was an error
-				if iRes != SMTP.OK:
-					return Services.Response(error=(1303, '%i %s' % (iRes, SMTP.lastError())))
-
-		# Else, we are sending to the queue first
-		else:
+		Arguments:
+			data (dict): Data sent with the request
+			sesh (Sesh._Session): Not used
 
-			# Add a queue key to the data
-			data['_queue_'] = self._queueKey(data)
+		Returns:
+			Services.Response
+		"""
 
-			# Send the data to the queue service
-			oResponse = Services.create('queue', 'msg', {
-				"_internal_": Services.internalKey(),
-				"service": "communications",
-				"path": "email",
-				"method": "create",
-				"data": data
-			})
+		# Verify fields
+		try: DictHelper.eval(data, ['_internal_'])
+		except ValueError as e: return Services.Response(error=(1001, [(f, 'missing') for f in e.args]))
 
-			# Return if there's an error
-			if oResponse.errorExists():
-				return oResponse
+		# Verify the key
+		if not Services.internalKey(data['_internal_']):
+			return Services.Response(error=Errors.SERVICE_INTERNAL_KEY)
 
-		# Return OK
-		return Services.Response(True)
+		# Fetch everything at once
+		p = self._redis.pipeline()
+		p.llen(Email.QUEUE)
+		p.zcard(Email.RETRY)
+		p.llen(Email.FAILED)
+		p.hgetall(Email.STATS)
+		p.lrange(Email.LATENCY, 0, -1)
+		iQueued, iRetrying, iFailed, dStats, lLatency = p.execute()
+
+		# Sort the latencies
+		lLatency = sorted([float(s) for s in lLatency])
+
+		# Return the stats
+		return Services.Response({
+			"depth": iQueued,
+			"retrying": iRetrying,
+			"failed": iFailed,
+			"counts": {
+				s: int(dStats.get(s.encode('utf-8'), 0))
+				for s in ['queued', 'sent', 'retried', 'failed', 'deduped']
+			},
+			"latency": lLatency and {
+				"p50": lLatency[len(lLatency) // 2],
+				"p99": lLatency[int(len(lLatency) * 0.99)],
+				"max": lLatency[-1]
+			} or None
+		})
 
 	def initialise(self):
 		"""Initialise
@@ -226,9 +265,6 @@ class Service(Services.Service):
 			None
 		"""
 
-		# Set the queue key
-		self._queue_key = Conf.get(('services', 'queue', 'key'))
-
 		# Get the default from
 		self.fromDefault = Conf.get(('email', 'from'))
 
@@ -236,9 +272,19 @@ class Service(Services.Service):
 		self.emailMethod = Conf.get(('email', 'method'))
 
 		# If it's invalid
-		if self.emailMethod not in ['direct']:
+		if self.emailMethod not in ['direct', 'queue']:
 			raise ValueError('Communications.emailMethod', self.emailMethod)
 
+		# Create a connection to Redis for the queue and dedupe keys
+		self._redis = StrictRedis(**Conf.get(('redis', 'primary'), {
+			"host": "localhost",
+			"port": 6379,
+			"db": 0
+		}))
+
+		# How long to ignore identical emails sent with dedupe
+		self._emailDedupe = Conf.get(('email', 'queue', 'dedupe'), 300)
+
 		# Get allowed addresses
 		self.emailAllowed = Conf.get(('email', 'allowed'), [])
 
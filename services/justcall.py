@@ -12,11 +12,13 @@ __email__		= "bast@maleexcel.com"
 __created__		= "2021-02-22"
 
 # Python imports
+from concurrent.futures import ThreadPoolExecutor
 from operator import itemgetter
 from time import sleep
 import urllib.parse
 
 # Pip imports
+from redis import StrictRedis
 import requests
 from RestOC import Conf, DictHelper, JSON, Services
 
@@ -65,14 +67,18 @@ class JustCall(Services.Service):
 		# Return OK
 		return True
 
-	def _all(self, path, data):
+	def _all(self, path, data, until=None):
 		"""All
 
-		Sends a POST request for all records
+		Sends a POST request for all records, or all records up to the first
+		one until returns True for
 
 		Arguments:
 			path (str): The URI/Noun to request
 			data (dict): The list of key/value pairs to send with the request
+			until (callable): Optional, called with each record, if it returns
+				True, the record and any after it are skipped and no more
+				pages are requested
 
 		Returns:
 			mixed
@@ -107,7 +113,7 @@ class JustCall(Services.Service):
 			iAttempts = 0
 			while True:
 				try:
-					oRes = requests.post(sURL, data=sBody, headers=dHeaders, timeout=25)
+					oRes = self._session.post(sURL, data=sBody, headers=dHeaders, timeout=25)
 					break
 				except requests.exceptions.ConnectionError as e:
 					iAttempts += 1
@@ -128,8 +134,24 @@ class JustCall(Services.Service):
 				if dData['status'] != 'success':
 					break
 
-				# Add the data to the result
-				lRet.extend(dData['data'])
+				# If we have a stopping point
+				if until:
+
+					# Add the records until we hit it
+					bStop = False
+					for d in dData['data']:
+						if until(d):
+							bStop = True
+							break
+						lRet.append(d)
+
+					# If we hit it, we're done
+					if bStop:
+						break
+
+				# Else, add the data to the result
+				else:
+					lRet.extend(dData['data'])
 
 				# If we got less than a hundred
 				if len(dData['data']) < 100:
@@ -178,7 +200,7 @@ class JustCall(Services.Service):
 		iAttempts = 0
 		while True:
 			try:
-				oRes = requests.post(sURL, data=sBody, headers=dHeaders, timeout=25)
+				oRes = self._session.post(sURL, data=sBody, headers=dHeaders, timeout=25)
 				break
 			except requests.exceptions.ConnectionError as e:
 				iAttempts += 1
@@ -210,6 +232,22 @@ class JustCall(Services.Service):
 
 		# Store config data
 		self.conf = Conf.get(('justcall'))
+		self._cacheTTL = self.conf.get('cache_ttl', 2592000)
+		self._workers = self.conf.get('workers', 4)
+
+		# Create a pooled session large enough for every worker
+		self._session = requests.Session()
+		self._session.mount('https://', requests.adapters.HTTPAdapter(
+			pool_connections=1,
+			pool_maxsize=self._workers
+		))
+
+		# Connect to Redis for the call log cache
+		self._redis = StrictRedis(**Conf.get(('redis', 'primary'), {
+			"host": "localhost",
+			"port": 6379,
+			"db": 0
+		}))
 
 		# Init the Sync module
 		Sync.init()
@@ -365,7 +403,9 @@ class JustCall(Services.Service):
 	def log_read(self, data, sesh=None):
 		"""Log
 
-		Returns a single log by ID
+		Returns one or many logs by ID. Calls are only logged by JustCall once
+		they've ended, so logs are cached and only the ones not in the cache
+		are fetched, at the same time
 
 		Arguments:
 			data (dict): Data sent with the request
@@ -389,19 +429,52 @@ class JustCall(Services.Service):
 			bMultiple = False
 			data['id'] = [data['id']]
 
+		# If there's no IDs
+		if not data['id']:
+			return Services.Response([])
+
+		# Look for the logs in the cache
+		dLogs = {}
+		lMissing = []
+		for mID, sLog in zip(
+			data['id'],
+			self._redis.mget(['justcall:call:%s' % str(m) for m in data['id']])
+		):
+			if sLog:
+				dLogs[mID] = JSON.decode(sLog)
+			elif mID not in lMissing:
+				lMissing.append(mID)
+
+		# If any are missing
+		if lMissing:
+
+			# Fetch them all at once
+			with ThreadPoolExecutor(max_workers=min(self._workers, len(lMissing))) as oPool:
+				lFetched = list(oPool.map(
+					lambda m: self._one('calls/get', {"id": m}),
+					lMissing
+				))
+
+			# Store them, and cache the ones we got
+			p = self._redis.pipeline()
+			for mID, dRes in zip(lMissing, lFetched):
+				dLogs[mID] = dRes
+				if dRes:
+					p.set('justcall:call:%s' % str(mID), JSON.encode(dRes), ex=self._cacheTTL)
+			p.execute()
+
 		# Init the results
 		lResults = []
 
 		# For each ID
-		for iID in data['id']:
+		for mID in data['id']:
 
-			# Make the request
-			dRes = self._one('calls/get', {
-				"id": iID
-			})
+			# Get the log
+			dRes = dLogs[mID]
 
 			# Add the text version of the call type
-			dRes['typeText'] = _CALL_TYPES[dRes['type']]
+			if dRes:
+				dRes['typeText'] = _CALL_TYPES[dRes['type']]
 
 			# Store it
 			lResults.append(dRes)
@@ -412,7 +485,8 @@ class JustCall(Services.Service):
 	def logs_read(self, data, sesh):
 		"""Logs
 
-		Returns all logs by phone number
+		Returns all logs by phone number. The logs are cached by number, and
+		only the ones newer than the last cached are fetched
 
 		Arguments:
 			data (dict): Data sent with the request
@@ -437,13 +511,25 @@ class JustCall(Services.Service):
 		elif len(data['phone']) == 10:
 			data['phone'] = '+1%s' % data['phone']
 
-		# Make the request
-		lRes = self._all('calls/query', {
+		# Get the cached logs
+		sKey = 'justcall:logs:%s' % data['phone']
+		sCached = self._redis.get(sKey)
+		lCached = sCached and JSON.decode(sCached) or []
+		lIDs = set([d['id'] for d in lCached])
+
+		# Fetch the logs, newest first, until we hit one we already have
+		lNew = self._all('calls/query', {
 			"contact_number": data['phone'],
-			"order": "ASC",
+			"order": "DESC",
 			"per_page": 100,
 			"type": '1'
-		})
+		}, lambda d: d['id'] in lIDs)
+
+		# Add the new logs after the cached ones, oldest first
+		lRes = lCached
+		if lNew:
+			lRes = lCached + lNew[::-1]
+			self._redis.set(sKey, JSON.encode(lRes), ex=self._cacheTTL)
 
 		# If we have no data
 		if not lRes:
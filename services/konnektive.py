@@ -12,6 +12,7 @@ __email__		= "bast@maleexcel.com"
 __created__		= "2020-05-09"
 
 # Python imports
+from concurrent.futures import ThreadPoolExecutor
 import json
 import math
 import sys
@@ -59,12 +60,51 @@ class Konnektive(Services.Service):
 		params['password'] = self._pass
 
 		# Generate and return the URL
-		return 'https://%s/%s/?%s' % (
+		return '%s://%s/%s/?%s' % (
+			self._protocol,
 			self._host,
 			path,
 			urllib.parse.urlencode(params)
 		)
 
+	def _page(self, path, params, page):
+		"""Page
+
+		Fetches a single page of data for a specific query
+
+		Arguments:
+			path (str): The path of the http request
+			params (dict): The query params for the request
+			page (uint): The page to fetch
+
+		Returns:
+			dict
+		"""
+
+		# Generate the URL, copying the params so pages can run concurrently
+		sURL = self._generateURL(path, dict(params, page=page))
+
+		# Fetch the data
+		iAttempts = 0
+		while True:
+			try:
+				oRes = self._session.post(sURL, headers={"Content-Type": 'application/json; charset=utf-8'}, timeout=10)
+				break
+			except requests.exceptions.ConnectionError as e:
+				iAttempts += 1
+				if iAttempts < 3:
+					sleep(1)
+					continue
+				raise e
+			except requests.exceptions.ReadTimeout as e:
+				raise Services.ResponseException(error=(1004, 'Konnektive'))
+
+		# Pull out the data and return it
+		try:
+			return oRes.json()
+		except json.decoder.JSONDecodeError:
+			raise Services.ResponseException(error=(1006, 'konnektive:%s' % path))
+
 	def _request(self, path, params):
 		"""Request
 
@@ -78,59 +118,62 @@ class Konnektive(Services.Service):
 			list
 		"""
 
-		# Init the return result and current page
-		lRet = []
-		iPage = 1
+		# Return the found records
+		return list(self._requestIter(path, params))
+
+	def _requestIter(self, path, params):
+		"""Request Iterator
+
+		Fetches every page of data for a specific query, yielding records as
+		they arrive. Once the first page gives the total, the remaining pages
+		are fetched concurrently, but always yielded in order
+
+		Arguments:
+			path (str): The path of the http request
+			params (dict): The query params for the request
+
+		Returns:
+			generator
+		"""
 
 		# Set the results per page
 		params['resultsPerPage'] = 200
 
-		# Make sure we get every page
-		while True:
+		# Fetch the first page
+		dData = self._page(path, params, 1)
 
-			# Set the current page
-			params['page'] = iPage
+		# If we don't get success
+		if dData['result'] != 'SUCCESS':
+			return
 
-			# Generate the URL
-			sURL = self._generateURL(path, params)
+		# Yield the first page
+		yield from dData['message']['data']
 
-			# Fetch the data
-			iAttempts = 0
-			while True:
-				try:
-					oRes = requests.post(sURL, headers={"Content-Type": 'application/json; charset=utf-8'}, timeout=10)
-					break
-				except requests.exceptions.ConnectionError as e:
-					iAttempts += 1
-					if iAttempts < 3:
-						sleep(1)
-						continue
-					raise e
-				except requests.exceptions.ReadTimeout as e:
-					raise Services.ResponseException(error=(1004, 'Konnektive'))
-
-			# Pull out the data
-			try:
-				dData = oRes.json()
-			except json.decoder.JSONDecodeError:
-				raise Services.ResponseException(error=(1006, 'konnektive:%s' % path))
+		# Get the number of pages
+		iPages = math.ceil(dData['message']['totalResults'] / 200)
 
-			# If we don't get success
-			if dData['result'] != 'SUCCESS':
-				break
+		# If we got the last page
+		if iPages <= 1:
+			return
 
-			# Add the data to the result
-			lRet.extend(dData['message']['data'])
+		# Fetch the rest of the pages on the pool
+		with ThreadPoolExecutor(max_workers=self._workers) as oPool:
+			lPages = [
+				oPool.submit(self._page, path, params, i)
+				for i in range(2, iPages + 1)
+			]
 
-			# If we got the last page
-			if math.ceil(dData['message']['totalResults'] / 200) == int(dData['message']['page']):
-				break
+			# Go through each page in order
+			for oPage in lPages:
+				dData = oPage.result()
 
-			# Increment the page
-			iPage += 1
+				# If we don't get success, stop and skip the rest
+				if dData['result'] != 'SUCCESS':
+					for o in lPages: o.cancel()
+					break
 
-		# Return the found transactions
-		return lRet
+				# Yield the page
+				yield from dData['message']['data']
 
 	def _post(self, path, params):
 		"""Post
@@ -152,7 +195,7 @@ class Konnektive(Services.Service):
 		iAttempts = 0
 		while True:
 			try:
-				oRes = requests.post(sURL, headers={"Content-Type": 'application/json; charset=utf-8'}, timeout=10)
+				oRes = self._session.post(sURL, headers={"Content-Type": 'application/json; charset=utf-8'}, timeout=10)
 				break
 			except requests.exceptions.ConnectionError as e:
 				iAttempts += 1
@@ -182,9 +225,18 @@ class Konnektive(Services.Service):
 		self._user = Conf.get(('konnektive', 'user'))
 		self._pass = Conf.get(('konnektive', 'pass'))
 		self._host = Conf.get(('konnektive', 'host'))
+		self._protocol = Conf.get(('konnektive', 'protocol'), 'https')
+		self._workers = Conf.get(('konnektive', 'workers'), 4)
 		self._allowQaUpdate = Conf.get(('konnektive', 'allow_qa_update'))
 		self._allowPurchaseChange = Conf.get(('konnektive', 'allow_purchase_change'))
 
+		# Create a pooled session large enough for every page worker
+		self._session = requests.Session()
+		self._session.mount('%s://' % self._protocol, requests.adapters.HTTPAdapter(
+			pool_connections=1,
+			pool_maxsize=self._workers
+		))
+
 		# Store encounter types
 		self._encounters = JSON.load('definitions/encounter_by_state.json');
 
@@ -13,6 +13,7 @@ __created__		= "2021-03-08"
 
 # Pip imports
 import arrow
+from redis import StrictRedis
 from RestOC import Conf, DictHelper, Errors, JSON, Record_MySQL, \
 					Services, StrHelper
 import validators
@@ -41,9 +42,19 @@ class Link(Services.Service):
 		Initialises the instance and returns itself for chaining
 
 		Returns:
-			Auth
+			Link
 		"""
 
+		# Create a connection to Redis for the code cache
+		self._redis = StrictRedis(**Conf.get(('redis', 'primary'), {
+			"host": "localhost",
+			"port": 6379,
+			"db": 0
+		}))
+
+		# How long to keep codes in the cache
+		self._cacheTTL = Conf.get(('link', 'redis_ttl'), 86400)
+
 		# Return self for chaining
 		return self
 
@@ -176,6 +187,12 @@ class Link(Services.Service):
 		# Increment the count
 		oUrl.incrementView()
 
+		# Cache the code so the link node can redirect without us
+		self._redis.set('link:code:%s' % data['code'], JSON.encode({
+			"_id": oUrl['_id'],
+			"url": oUrl['url']
+		}), ex=self._cacheTTL)
+
 		# Return the URL
 		return Services.Response(oUrl['url'])
 
@@ -258,6 +275,9 @@ class Link(Services.Service):
 		if not oUrl:
 			return Services.Error(1104)
 
+		# Remove it from the cache
+		self._redis.delete('link:code:%s' % oUrl['code'])
+
 		# Delete all views associated
 		ViewRecord.deleteByUrl(data['_id'])
 
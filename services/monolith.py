@@ -34,18 +34,19 @@ from shared.SMSWorkflow import ED as EDWorkflow
 from records.monolith import \
 	Calendly, CalendlyEvent, \
 	Campaign, \
-	CustomerClaimed, CustomerClaimedLast, CustomerReviews, \
+	CustomerClaimed, CustomerReviews, \
 	CustomerCommunication, CustomerMsgPhone, \
 	DsApproved, DsPatient, \
 	Forgot, \
-	HormonalCategoryScore, HormonalSympCategories, HormoneSymptomToQuestion, \
+	HormonalCategoryScore, HormonalSympCategories, \
 	HrtLabResult, HrtLabResultTests, \
 	HrtPatient, HrtPatientDroppedReason, \
 	KtCustomer, KtOrder, KtOrderClaim, KtOrderClaimLast, KtOrderContinuous, \
+	KtOrderQueueCount, \
 	ShippingInfo, \
 	SmpCustomer, SmpImage, SmpNote, SmpOrderStatus, SmpState, \
 	SMSStop, SMSStopChange, SMSTemplate, \
-	TfAnswer, TfLanding, TfQuestion, TfQuestionOption, \
+	TfAnswer, TfForm, TfLanding, TfQuestion, \
 	User
 
 # Service imports
@@ -221,9 +222,18 @@ class Monolith(Services.Service):
 		# Store the agent ID
 		iAgent = oClaim['user']
 
+		# Take a snapshot of the customer's pending orders
+		dCounts = KtOrderQueueCount.snapshot(phone=data['phoneNumber'])
+
 		# Delete the claim
 		if oClaim.delete():
 
+			# Update the queue counts
+			KtOrderQueueCount.apply(
+				dCounts,
+				KtOrderQueueCount.snapshot(phone=data['phoneNumber'])
+			)
+
 			# Notify the agent they lost the claim
 			Sync.push('monolith', 'user-%s' % str(iAgent), {
 				"type": 'claim_removed',
@@ -574,11 +584,12 @@ class Monolith(Services.Service):
 		except ValueError as e:
 			return Services.Response(error=(1001, e.args[0]))
 
-		# Try to create the record and return the result
+		# Take a snapshot of the customer's pending orders
+		dCounts = KtOrderQueueCount.snapshot(phone=data['phoneNumber'])
+
+		# Try to create the record
 		try:
-			return Services.Response(
-				oCustomerClaimed.create()
-			)
+			mRes = oCustomerClaimed.create()
 
 		# If we got a duplicate exception
 		except Record_MySQL.DuplicateException:
@@ -589,6 +600,15 @@ class Monolith(Services.Service):
 			# Return the error with the user ID
 			return Services.Response(error=(1101, dClaim['user']))
 
+		# Update the queue counts
+		KtOrderQueueCount.apply(
+			dCounts,
+			KtOrderQueueCount.snapshot(phone=data['phoneNumber'])
+		)
+
+		# Return the result
+		return Services.Response(mRes)
+
 	def customerClaim_delete(self, data, sesh):
 		"""Customer Claim Delete
 
@@ -618,11 +638,21 @@ class Monolith(Services.Service):
 		if oClaim['user'] != sesh['memo_id']:
 			return Services.Response(error=Rights.INVALID)
 
-		# Delete the claim and return the response
-		return Services.Response(
-			oClaim.delete()
+		# Take a snapshot of the customer's pending orders
+		dCounts = KtOrderQueueCount.snapshot(phone=data['phoneNumber'])
+
+		# Delete the claim
+		bRes = oClaim.delete()
+
+		# Update the queue counts
+		KtOrderQueueCount.apply(
+			dCounts,
+			KtOrderQueueCount.snapshot(phone=data['phoneNumber'])
 		)
 
+		# Return the result
+		return Services.Response(bRes)
+
 	def customerClaim_update(self, data, sesh):
 		"""Customer Claim Update
 
@@ -1768,10 +1798,10 @@ class Monolith(Services.Service):
 			for d in dLandings
 		}
 
-		# Fetch all the categories
-		lCats = HormoneSymptomToQuestion.filter({
-			"formId": list(set(dForms.values()))
-		}, raw=['formId', 'questionRef', 'title', 'category'])
+		# Fetch all the categories from the form cache
+		lCats = []
+		for d in TfForm.get(list(set(dForms.values()))).values():
+			lCats.extend(d['categories'])
 
 		# Init the list of titles by question
 		dTitles = {}
@@ -1818,36 +1848,37 @@ class Monolith(Services.Service):
 			}
 
 		# Find all the answers by landing IDs and question refs
-		lAnswers = TfAnswer.filter({
+		dAnswers = TfAnswer.grouped({
 			"landing_id": [d['landing_id'] for d in dLandings],
 			"ref": list(setQuestions)
-		}, raw=['landing_id', 'ref', 'value'])
+		})
 
 		# Go through each answer
-		for d in lAnswers:
+		for sLanding, dRefs in dAnswers.items():
+			for sRef, sValue in dRefs.items():
 
-			# Get the date associated with the landing
-			sDate = dDates[d['landing_id'].lower()]
+				# Get the date associated with the landing
+				sDate = dDates[sLanding]
 
-			# Generate the unique key based on the form
-			k = '%s|%s' % (dForms[d['landing_id'].lower()], d['ref'])
+				# Generate the unique key based on the form
+				k = '%s|%s' % (dForms[sLanding], sRef)
 
-			# If the question has no categories
-			if k not in dQuestions:
-				continue
-
-			# Go through each category for the associated question
-			for s in dQuestions[k]:
+				# If the question has no categories
+				if k not in dQuestions:
+					continue
 
 				# Make sure score is an int
-				iScore = d['value'].isnumeric() and int(d['value']) or 0
+				iScore = sValue.isnumeric() and int(sValue) or 0
 
-				# Add the score to the associated category / date
-				dCategories[s]['score'][sDate] += iScore
+				# Go through each category for the associated question
+				for s in dQuestions[k]:
 
-				# Set the score to in the associated question in the category /
-				#	date
-				dCategories[s]['titles'][dTitles[k]][sDate] = iScore
+					# Add the score to the associated category / date
+					dCategories[s]['score'][sDate] += iScore
+
+					# Set the score to in the associated question in the
+					#	category / date
+					dCategories[s]['titles'][dTitles[k]][sDate] = iScore
 
 		# Return the structure
 		return Services.Response({
@@ -1894,7 +1925,9 @@ class Monolith(Services.Service):
 	def customerMessages_read(self, data, sesh):
 		"""Customer Messages
 
-		Fetches all messages associated with a customer (phone number)
+		Fetches all messages associated with a customer (phone number), or
+		if a limit is passed, the most recent page of messages older than the
+		optional before ID
 
 		Arguments:
 			data (dict): Data sent with the request
@@ -1911,8 +1944,19 @@ class Monolith(Services.Service):
 		try: DictHelper.eval(data, ['customerPhone'])
 		except ValueError as e: return Services.Response(error=(1001, [(f, 'missing') for f in e.args]))
 
-		# Get the messages
-		lMsgs = CustomerCommunication.thread(data['customerPhone'])
+		# Check the paging values
+		dPage = {}
+		for f in ['limit', 'before']:
+			if f in data:
+				try: dPage[f] = int(data[f]) or None
+				except (TypeError, ValueError): return Services.Response(error=(1001, [(f, 'invalid')]))
+
+		# Get the messages, optionally a page at a time
+		lMsgs = CustomerCommunication.thread(
+			data['customerPhone'],
+			limit=dPage.get('limit'),
+			before=dPage.get('before')
+		)
 
 		# Get the type
 		sType = len(KtOrder.ordersByPhone(data['customerPhone'])) and 'support' or 'sales'
@@ -1920,9 +1964,9 @@ class Monolith(Services.Service):
 		# Find out if the user is blocked anywhere
 		bStop = SMSStop.filter({"phoneNumber": data['customerPhone'], "service": sType}) and True or False
 
-		# Fetch and return all the messages associated with the number
+		# Return all the messages associated with the number
 		return Services.Response({
-			"messages": CustomerCommunication.thread(data['customerPhone']),
+			"messages": lMsgs,
 			"stop": bStop,
 			"type": sType
 		})
@@ -2049,6 +2093,14 @@ class Monolith(Services.Service):
 			if not lLandings:
 				return Services.Response(0)
 
+		# Fetch the definitions of the forms from the cache
+		dForms = TfForm.get([d['formId'] for d in lLandings])
+
+		# Fetch the answers for every landing at once
+		dAnswers = TfAnswer.grouped({
+			"landing_id": [d['landing_id'] for d in lLandings]
+		})
+
 		# Init the return
 		lRet = []
 
@@ -2060,42 +2112,18 @@ class Monolith(Services.Service):
 				"id": dLanding['landing_id'],
 				"form": dLanding['formId'],
 				"date": dLanding['submitted_at'],
-				"completed": dLanding['complete'] == 'Y'
+				"completed": dLanding['complete'] == 'Y',
+				"questions": [dict(d) for d in dForms[dLanding['formId']]['questions']],
+				"options": dForms[dLanding['formId']]['options']
 			}
 
-			# Get the questions associated with the landing form
-			dData['questions'] = TfQuestion.filter(
-				{"formId": dLanding['formId'], "activeFlag": 'Y'},
-				raw=['ref', 'title', 'type'],
-				orderby='questionNumber'
-			)
-
-			# Get the options for the questions
-			lOptions = TfQuestionOption.filter(
-				{"questionRef": [d['ref'] for d in dData['questions']], "activeFlag": 'Y'},
-				raw=['questionRef', 'displayOrder', 'option'],
-				orderby=['questionRef', 'displayOrder']
-			)
-
-			# Create lists of options by question
-			dData['options'] = {}
-			for d in lOptions:
-				try: dData['options'][d['questionRef']].append(d['option'])
-				except KeyError: dData['options'][d['questionRef']] = [d['option']]
-
-			# Fetch the answers
-			dAnswers = {
-				d['ref']: d['value']
-				for d in TfAnswer.filter(
-					{"landing_id": dLanding['landing_id']},
-					raw=['ref', 'value']
-				)
-			}
+			# Get the answers for the landing
+			dLandingAnswers = dAnswers.get(dLanding['landing_id'].lower(), {})
 
 			# Match the answer to the questions
 			for d in dData['questions']:
-				d['answer'] = d['ref'] in dAnswers and \
-								dAnswers[d['ref']] or \
+				d['answer'] = d['ref'] in dLandingAnswers and \
+								dLandingAnswers[d['ref']] or \
 								''
 				if d['type'] == 'yes_no' and d['answer'] in ['0', '1']:
 					d['answer'] = d['answer'] == '1' and 'Yes' or 'No'
@@ -2295,6 +2323,9 @@ class Monolith(Services.Service):
 			if 'label' not in data:
 				data['label'] = ''
 
+			# Take a snapshot of the order's counts
+			dCounts = KtOrderQueueCount.snapshot(order_id=data['orderId'])
+
 			# Find the latest status for this order
 			oStatus = SmpOrderStatus.filter(
 				{"orderId": data['orderId']},
@@ -2351,6 +2382,12 @@ class Monolith(Services.Service):
 				oStatus['updatedAt']: sDT
 				oStatus.save()
 
+			# Update the queue counts
+			KtOrderQueueCount.apply(
+				dCounts,
+				KtOrderQueueCount.snapshot(order_id=data['orderId'])
+			)
+
 			# Set the action
 			dNote['action'] = sAction
 
@@ -2712,6 +2749,9 @@ class Monolith(Services.Service):
 			if not dDetails:
 				return Services.Response(error=(1104, 'order'))
 
+			# Take a snapshot of the order's counts
+			dCounts = KtOrderQueueCount.snapshot(order_id=oClaim['orderId'])
+
 			# Find the order status
 			oStatus = SmpOrderStatus.filter({
 				"orderId": oClaim['orderId']
@@ -2745,6 +2785,12 @@ class Monolith(Services.Service):
 					oContOrder['medsNotWorking'] = False;
 					oContOrder.save()
 
+			# Update the queue counts
+			KtOrderQueueCount.apply(
+				dCounts,
+				KtOrderQueueCount.snapshot(order_id=oClaim['orderId'])
+			)
+
 		# Else, there's no order
 		else:
 
@@ -2813,17 +2859,18 @@ class Monolith(Services.Service):
 				# Save instead of create
 				oOrderClaim.save()
 
-				# Notify the old provider they lost the claim
-				Sync.push('monolith', 'user-%s' % str(oOldClaim['user']), {
-					"type": 'claim_removed',
-					"customerId": dDetails['customerId']
-				})
-
-				# Notify the new provider they gained a claim
-				Sync.push('monolith', 'user-%s' % str(oClaim['provider']), {
-					"type": 'claim_transfered',
-					"claim": dData
-				})
+				# Notify the old provider they lost the claim, and the new
+				#	provider they gained it
+				Sync.push_many('monolith', [
+					('user-%s' % str(oOldClaim['user']), {
+						"type": 'claim_removed',
+						"customerId": dDetails['customerId']
+					}),
+					('user-%s' % str(oClaim['provider']), {
+						"type": 'claim_transfered',
+						"claim": dData
+					})
+				])
 
 		# Store transfer note
 		oSmpNote = SmpNote(dNote)
@@ -2910,17 +2957,18 @@ class Monolith(Services.Service):
 			# Save instead of create
 			oOrderClaim.save()
 
-			# Notify the old provider they lost the claim
-			Sync.push('monolith', 'user-%s' % str(oOldClaim['user']), {
-				"type": 'claim_removed',
-				"customerId": dDetails['customerId']
-			})
-
-			# Notify the new provider they gained a claim
-			Sync.push('monolith', 'user-%s' % str(data['user_id']), {
-				"type": 'claim_transfered',
-				"claim": dData
-			})
+			# Notify the old provider they lost the claim, and the new provider
+			#	they gained it
+			Sync.push_many('monolith', [
+				('user-%s' % str(oOldClaim['user']), {
+					"type": 'claim_removed',
+					"customerId": dDetails['customerId']
+				}),
+				('user-%s' % str(data['user_id']), {
+					"type": 'claim_transfered',
+					"claim": dData
+				})
+			])
 
 		# Get current date/time
 		sDT = arrow.get().format('YYYY-MM-DD HH:mm:ss')
@@ -3377,6 +3425,24 @@ class Monolith(Services.Service):
 			})
 			oMsgPhone.create()
 
+		# If the conversation is claimed
+		dClaim = CustomerClaimed.filter(
+			{"phoneNumber": [data['customerPhone'], '1%s' % data['customerPhone']]},
+			raw=['user'],
+			limit=1
+		)
+		if dClaim:
+
+			# Count it as unread for the agent
+			sNumber = data['customerPhone'][-10:]
+			self._redis.hincrby('msgs:unread:%s' % str(dClaim['user']), sNumber, 1)
+
+			# Notify the agent
+			Sync.push('monolith', 'user-%s' % str(dClaim['user']), {
+				"type": 'new_message',
+				"phoneNumber": sNumber
+			})
+
 		# Return OK
 		return Services.Response(True)
 
@@ -3682,7 +3748,8 @@ class Monolith(Services.Service):
 	def msgsClaimedNew_read(self, data, sesh):
 		"""Messages Claimed New
 
-		Checks if there's any new messages in the given conversations
+		Checks if there's any new messages in the given conversations since
+		the last check, using the unread counts kept by messageIncoming_create
 
 		Arguments:
 			data (dict): Data sent with the request
@@ -3700,16 +3767,20 @@ class Monolith(Services.Service):
 		if not isinstance(data['numbers'], (list,tuple)):
 			return Services.Response(error=(1001, [('numbers', 'invalid')]))
 
-		# Fetch the last claimed time
-		iTS = CustomerClaimedLast.get(sesh['memo_id'])
-
-		# Store the new time
-		CustomerClaimedLast.set(sesh['memo_id'], int(time()))
+		# Fetch and reset the agent's unread counts
+		sKey = 'msgs:unread:%s' % str(sesh['memo_id'])
+		p = self._redis.pipeline()
+		p.hgetall(sKey)
+		p.delete(sKey)
+		dUnread = p.execute()[0]
 
-		# Fetch and return the list of numbers with new messages
-		return Services.Response(
-			CustomerCommunication.newMessages(data['numbers'], iTS)
-		)
+		# Return the counts for the numbers requested
+		lNumbers = [str(s)[-10:] for s in data['numbers']]
+		return Services.Response({
+			k.decode('utf-8'): int(v)
+			for k,v in dUnread.items()
+			if k.decode('utf-8') in lNumbers
+		})
 
 	def msgsSearch_read(self, data, sesh):
 		"""Messages: Search
@@ -3963,6 +4034,9 @@ class Monolith(Services.Service):
 		try: DictHelper.eval(data, ['customerId', 'orderId'])
 		except ValueError as e: return Services.Response(error=(1001, [(f, 'missing') for f in e.args]))
 
+		# Take a snapshot of the order's counts
+		dCounts = KtOrderQueueCount.snapshot(order_id=data['orderId'])
+
 		# Send the request to Konnektive
 		oResponse = Services.update('konnektive', 'order/qa', {
 			"action": 'APPROVE',
@@ -4030,6 +4104,12 @@ class Monolith(Services.Service):
 			oStatus['updatedAt'] = sDT
 			oStatus.save()
 
+		# Update the queue counts
+		KtOrderQueueCount.apply(
+			dCounts,
+			KtOrderQueueCount.snapshot(order_id=data['orderId'])
+		)
+
 		# Notify the patient of the approval
 		EDWorkflow.providerApproves(data['orderId'], sesh['memo_id'], self)
 
@@ -4396,14 +4476,24 @@ class Monolith(Services.Service):
 		except ValueError as e:
 			return Services.Error(1001, e.args[0])
 
-		# Try to create the record and return the ID
+		# Take a snapshot of the order's counts
+		dCounts = KtOrderQueueCount.snapshot(order_id=data['orderId'])
+
+		# Try to create the record
 		try:
-			return Services.Response(
-				oOC.create()
-			)
+			mRes = oOC.create()
 		except Record_MySQL.DuplicateException:
 			return Services.Error(1101)
 
+		# Update the queue counts
+		KtOrderQueueCount.apply(
+			dCounts,
+			KtOrderQueueCount.snapshot(order_id=data['orderId'])
+		)
+
+		# Return the ID
+		return Services.Response(mRes)
+
 	def orderContinuous_read(self, data, sesh):
 		"""Order Continuous Read
 
@@ -4481,11 +4571,20 @@ class Monolith(Services.Service):
 		if oOrder['status'] != 'PENDING':
 			return Services.Response(error=1515)
 
+		# Take a snapshot of the order's counts
+		dCounts = KtOrderQueueCount.snapshot(order_id=data['orderId'])
+
 		# Set the status and user, then save the order
 		oOrder['status'] = 'COMPLETE'
 		oOrder['user'] = sesh['memo_id']
 		oOrder.save()
 
+		# Update the queue counts
+		KtOrderQueueCount.apply(
+			dCounts,
+			KtOrderQueueCount.snapshot(order_id=data['orderId'])
+		)
+
 		# Check the purchase in KNK
 		oResponse = Services.read('konnektive', 'purchase', {
 			"purchaseId": oOrder['purchaseId']
@@ -4583,9 +4682,18 @@ class Monolith(Services.Service):
 		}, sesh)
 		if oResponse.errorExists(): return oResponse
 
+		# Take a snapshot of the order's counts
+		dCounts = KtOrderQueueCount.snapshot(order_id=data['orderId'])
+
 		# Delete the continuous order
 		oOrder.delete()
 
+		# Update the queue counts
+		KtOrderQueueCount.apply(
+			dCounts,
+			KtOrderQueueCount.snapshot(order_id=data['orderId'])
+		)
+
 		# Get current date/time
 		sDT = arrow.get().format('YYYY-MM-DD HH:mm:ss')
 
@@ -4648,11 +4756,20 @@ class Monolith(Services.Service):
 		}, sesh)
 		if oResponse.errorExists(): return oResponse
 
+		# Take a snapshot of the order's counts
+		dCounts = KtOrderQueueCount.snapshot(order_id=data['orderId'])
+
 		# Set the status and user, then save the order
 		oOrder['status'] = 'DECLINED'
 		oOrder['user'] = sesh['memo_id']
 		oOrder.save()
 
+		# Update the queue counts
+		KtOrderQueueCount.apply(
+			dCounts,
+			KtOrderQueueCount.snapshot(order_id=data['orderId'])
+		)
+
 		# Notify the patient
 		EDWorkflow.providerDeclinesContinuous(data['orderId'], sesh['memo_id'], self)
 
@@ -4696,6 +4813,9 @@ class Monolith(Services.Service):
 		if data['reason'] not in self._DECLINE_NOTES.keys():
 			return Services.Response(error=(1001, [('reason', 'invalid')]))
 
+		# Take a snapshot of the order's counts
+		dCounts = KtOrderQueueCount.snapshot(order_id=data['orderId'])
+
 		# Send the request to Konnektive
 		oResponse = Services.update('konnektive', 'order/qa', {
 			"action": 'DECLINE',
@@ -4745,6 +4865,12 @@ class Monolith(Services.Service):
 			oStatus['updatedAt'] = sDT
 			oStatus.save()
 
+		# Update the queue counts
+		KtOrderQueueCount.apply(
+			dCounts,
+			KtOrderQueueCount.snapshot(order_id=data['orderId'])
+		)
+
 		# If it was a medical decline
 		if data['reason'] == 'Medical':
 
@@ -4825,6 +4951,9 @@ class Monolith(Services.Service):
 			if 'label' not in data:
 				data['label'] = ''
 
+			# Take a snapshot of the order's counts
+			dCounts = KtOrderQueueCount.snapshot(order_id=data['orderId'])
+
 			# Find the latest status for this order
 			oStatus = SmpOrderStatus.filter(
 				{"orderId": data['orderId']},
@@ -4860,6 +4989,12 @@ class Monolith(Services.Service):
 				oStatus['updatedAt']: sDT
 				oStatus.save()
 
+			# Update the queue counts
+			KtOrderQueueCount.apply(
+				dCounts,
+				KtOrderQueueCount.snapshot(order_id=data['orderId'])
+			)
+
 	def orderRefresh_update(self, data, sesh):
 		"""Order Refresh
 
@@ -4961,6 +5096,12 @@ class Monolith(Services.Service):
 		dUser = User.get(sesh['memo_id'], raw=['firstName', 'lastName'])
 		sName = '%s %s' % (dUser['firstName'], dUser['lastName'])
 
+		# Take a snapshot of the customer's pending orders
+		dCounts = KtOrderQueueCount.snapshot(
+			order_id=oOrderClaim['orderId'],
+			phone=dKtCustomer['phoneNumber']
+		)
+
 		# Create a new claim instance for the agent and store in the DB
 		oCustClaim = CustomerClaimed(dData)
 		try:
@@ -4988,21 +5129,22 @@ class Monolith(Services.Service):
 				# Save instead of create
 				oCustClaim.save()
 
-				# Notify the old agent they lost the claim
-				Sync.push('monolith', 'user-%s' % str(dOldClaim['user']), {
-					"type": 'claim_removed',
-					"phoneNumber": dKtCustomer['phoneNumber']
-				})
-
 				# Add the provider name and transferred name
 				dData['providerName'] = sName
 				dData['transferredByName'] = sName
 
-				# Notify the new agent they gained a claim
-				Sync.push('monolith', 'user-%s' % str(data['agent']), {
-					"type": 'claim_transfered',
-					"claim": dData
-				})
+				# Notify the old agent they lost the claim, and the new agent
+				#	they gained it
+				Sync.push_many('monolith', [
+					('user-%s' % str(dOldClaim['user']), {
+						"type": 'claim_removed',
+						"phoneNumber": dKtCustomer['phoneNumber']
+					}),
+					('user-%s' % str(data['agent']), {
+						"type": 'claim_transfered',
+						"claim": dData
+					})
+				])
 
 			# Else, we don't care who the agent is
 			else:
@@ -5057,6 +5199,15 @@ class Monolith(Services.Service):
 			dNote['parentColumn'] = 'customerId'
 			dNote['columnValue'] = str(oOrderClaim['customerId'])
 
+		# Update the queue counts
+		KtOrderQueueCount.apply(
+			dCounts,
+			KtOrderQueueCount.snapshot(
+				order_id=oOrderClaim['orderId'],
+				phone=dKtCustomer['phoneNumber']
+			)
+		)
+
 		# Store transfer note
 		oSmpNote = SmpNote(dNote)
 		sNoteID = oSmpNote.create()
@@ -5104,24 +5255,14 @@ class Monolith(Services.Service):
 		)
 
 		# Get the pending ED order count by state
-		dNewCounts = {
-			d['shipState']:d['count']
-			for d in KtOrder.queueCount(
-				group='ed',
-				hide_claimed=False,
-				group_by='shipState'
-			)
-		}
+		dNewCounts = KtOrderQueueCount.byState(
+			'new', 'ed', ['Doctor', 'Not Assigned']
+		)
 
 		# Get the pending ED continuous count by state
-		dExpiringCounts = {
-			d['shipState']:d['count']
-			for d in KtOrderContinuous.queueCount(
-				group='ed',
-				hide_claimed=False,
-				group_by='shipState'
-			)
-		}
+		dExpiringCounts = KtOrderQueueCount.byState(
+			'expiring', 'ed', ['Doctor', 'Not Assigned']
+		)
 
 		# Go through each state
 		for d in lStates:
@@ -5208,7 +5349,7 @@ class Monolith(Services.Service):
 
 		# Fetch and return the data
 		return Services.Response(
-			KtOrder.queueCsrCount() + KtOrderContinuous.queueCsrCount()
+			KtOrderQueueCount.csr()
 		)
 
 	def ordersPendingProviderEd_read(self, data, sesh):
@@ -5548,7 +5689,7 @@ class Monolith(Services.Service):
 				# Update the rest of the fields
 				oSummary['totalIncoming'] = iIncoming
 				oSummary['totalOutGoing'] = iOutgoing
-				oSummary['lastMsg'] = ''.join(lTexts)
+				oSummary['lastMsg'] = ''.join(lTexts)[:CustomerMsgPhone.PREVIEW]
 				oSummary['updatedAt'] = arrow.get().format('YYYY-MM-DD HH:mm:ss')
 
 			# Save the summary
@@ -5558,6 +5699,9 @@ class Monolith(Services.Service):
 		oClaim = CustomerClaimed.get(data['old'])
 		if oClaim:
 
+			# Take a snapshot of the customer's pending orders
+			dCounts = KtOrderQueueCount.snapshot(phone=[data['old'], data['new']])
+
 			# If the claim already exists
 			if CustomerClaimed.exists(data['new']):
 
@@ -5583,6 +5727,12 @@ class Monolith(Services.Service):
 				# Swap the number
 				oClaim.swapNumber(data['new'])
 
+			# Update the queue counts
+			KtOrderQueueCount.apply(
+				dCounts,
+				KtOrderQueueCount.snapshot(phone=[data['old'], data['new']])
+			)
+
 		# Return OK
 		return Services.Response(True)
 
@@ -21,8 +21,10 @@ from urllib.parse import urlencode
 
 # Pip imports
 import arrow
+from redis import StrictRedis
+from redis.exceptions import LockError
 import requests
-from RestOC import Conf, DictHelper, Errors, Record_MySQL, Services, StrHelper
+from RestOC import Conf, DictHelper, Errors, JSON, Record_MySQL, Services, StrHelper
 
 # Shared imports
 from shared import Memo, Rights
@@ -182,10 +184,10 @@ class Prescriptions(Services.Service):
 		# Return the IDs
 		return (sClinicId, sClinicianId)
 
-	def _generateToken(self, clinician_id):
-		"""Generate Token
+	def _fetchToken(self, clinician_id):
+		"""Fetch Token
 
-		Generates the Auth token needed for all HTTP requests
+		Requests a new Auth token from DoseSpot
 
 		Arguments:
 			clinician_id (uint): ID of the clinician making the request
@@ -194,7 +196,7 @@ class Prescriptions(Services.Service):
 			Services.ResponseException
 
 		Returns:
-			str
+			dict
 		"""
 
 		# Generate the encrypted IDs
@@ -232,8 +234,124 @@ class Prescriptions(Services.Service):
 		# Convert the response
 		dRes = oRes.json()
 
-		# Return the token
-		return dRes['access_token'];
+		# Return the token and when it expires
+		return {
+			"token": dRes['access_token'],
+			"expires": int(time()) + int(dRes['expires_in'])
+		}
+
+	def _generateToken(self, clinician_id):
+		"""Generate Token
+
+		Returns the Auth token needed for all HTTP requests. Tokens are cached
+		in process and in Redis until shortly before they expire, and only one
+		worker at a time is allowed to request a new one for a clinician
+
+		Arguments:
+			clinician_id (uint): ID of the clinician making the request
+
+		Raises:
+			Services.ResponseException
+
+		Returns:
+			str
+		"""
+
+		# Get the time tokens must be valid past to be used
+		iValid = int(time()) + self._token_refresh
+
+		# If we have the token locally and it's still good
+		if clinician_id in self._tokens and self._tokens[clinician_id]['expires'] > iValid:
+			self._tokenHit()
+			return self._tokens[clinician_id]['token']
+
+		# Generate the redis key
+		sKey = 'dosespot:token:%d' % clinician_id
+
+		# If another worker has the token, and it's still good
+		dToken = self._tokenFromRedis(sKey)
+		if dToken and dToken['expires'] > iValid:
+			self._tokens[clinician_id] = dToken
+			self._redis.hincrby(self._token_stats, 'shared', 1)
+			return dToken['token']
+
+		# Make sure only one worker requests a new token. The lock has to
+		#	outlast the 30 second fetch, and waiting on it has to end well
+		#	before the worker would be killed
+		oLock = self._redis.lock('%s:lock' % sKey, timeout=90, blocking_timeout=5)
+		if not oLock.acquire():
+
+			# If we couldn't get the lock, use whatever we have if it hasn't
+			#	actually expired yet
+			dToken = self._tokenFromRedis(sKey)
+			if dToken and dToken['expires'] > int(time()):
+				self._tokens[clinician_id] = dToken
+				self._redis.hincrby(self._token_stats, 'shared', 1)
+				return dToken['token']
+
+			# Else, fail
+			raise Services.ResponseException(error=(1004, 'DoseSpot'))
+
+		try:
+
+			# Check again in case another worker just got it
+			dToken = self._tokenFromRedis(sKey)
+			if dToken and dToken['expires'] > iValid:
+				self._redis.hincrby(self._token_stats, 'shared', 1)
+
+			# Else, request a new one and share it
+			else:
+				dToken = self._fetchToken(clinician_id)
+				self._redis.setex(sKey, max(1, dToken['expires'] - int(time())), JSON.encode(dToken))
+				self._redis.hincrby(self._token_stats, 'miss', 1)
+
+		# Release the lock, if it expired the token was still stored so there's
+		#	no reason to fail the request
+		finally:
+			try: oLock.release()
+			except LockError: pass
+
+		# Store it locally and return it
+		self._tokens[clinician_id] = dToken
+		return dToken['token']
+
+	def _tokenHit(self):
+		"""Token Hit
+
+		Counts a token found in the local cache. Hits are counted in process
+		and added to the shared counters once a minute so the cache never
+		needs a trip to Redis
+
+		Returns:
+			None
+		"""
+
+		# Count the hit
+		self._token_hits += 1
+
+		# If it's been long enough, add them to the shared counter
+		if time() - self._token_flushed >= 60:
+			self._redis.hincrby(self._token_stats, 'hit', self._token_hits)
+			self._token_hits = 0
+			self._token_flushed = time()
+
+	def _tokenFromRedis(self, key):
+		"""Token From Redis
+
+		Fetches a cached token shared by all workers
+
+		Arguments:
+			key (str): The redis key of the token
+
+		Returns:
+			dict|None
+		"""
+
+		# Fetch the token
+		sToken = self._redis.get(key)
+
+		# Return the decoded token, or nothing
+		return sToken and JSON.decode(sToken) or None
 
 	def initialise(self):
 		"""Initialise
@@ -250,6 +368,21 @@ class Prescriptions(Services.Service):
 		self._clinic_key = Conf.get(('dosespot', 'clinic_key'))
 		self._clinician_id = Conf.get(('dosespot', 'clinician_id'))
 
+		# Create a connection to Redis
+		self._redis = StrictRedis(**Conf.get(('redis', 'primary'), {
+			"host": "localhost",
+			"port": 6379,
+			"db": 0
+		}))
+
+		# Init the token cache, the seconds before expiry tokens are replaced,
+		#	the key of the hit/miss counters, and the hits not yet added to them
+		self._tokens = {}
+		self._token_refresh = Conf.get(('dosespot', 'token_refresh'), 300)
+		self._token_stats = 'dosespot:token:stats'
+		self._token_hits = 0
+		self._token_flushed = time()
+
 		# Return self for chaining
 		return self
 
@@ -607,6 +740,37 @@ class Prescriptions(Services.Service):
 			for d in dData['Items']
 		])
 
+	def dsTokenStats_read(self, data, sesh=None):
+		"""DoseSpot Token Stats
+
+		Returns the number of times a DoseSpot token was found in the process
+		(hit), shared by another worker (shared), or had to be requested (miss).
+		Hits are added to the counters by each worker once a minute
+
+		Arguments:
+			data (dict): Data sent with the request
+			sesh (Sesh._Session): The session associated with the request
+
+		Returns:
+			Services.Response
+		"""
+
+		# If we have no session and no key
+		if not sesh and '_internal_' not in data:
+			return Services.Error(1001, [('_internal_', 'missing')])
+
+		# Make sure the request is internal or the user has the right
+		Rights.internalOrCheck(data, sesh, 'prescriptions', Rights.READ)
+
+		# Fetch the counters
+		dStats = self._redis.hgetall(self._token_stats)
+
+		# Return them as ints
+		return Services.Response({
+			s: int(dStats.get(s.encode('utf-8'), 0))
+			for s in ['hit', 'shared', 'miss']
+		})
+
 	def hrtOrder_delete(self, data, sesh):
 		"""HRT Order Delete
 
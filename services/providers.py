@@ -20,15 +20,17 @@ import uuid
 # Pip imports
 import arrow
 from FormatOC import Node
-from RestOC import Conf, DictHelper, Errors, Record_MySQL, Services, Sesh, \
-					StrHelper
+from redis import StrictRedis
+from RestOC import Conf, DictHelper, Errors, JSON, Record_MySQL, Services, \
+					Sesh, StrHelper
 
 # Shared imports
 from shared import Memo, Rights, SMSWorkflow
 
 # Records imports
 from records.providers import CalendlySingleUse, ProductToRx, Provider, \
-								Request, RoundRobinAgent, Template, Tracking
+								Request, RoundRobinAgent, Template, Tracking, \
+								TrackingDaily
 
 class Providers(Services.Service):
 	"""Providers Service class
@@ -37,7 +39,7 @@ class Providers(Services.Service):
 	"""
 
 	_install = [CalendlySingleUse, ProductToRx, Provider, RoundRobinAgent, \
-				Template, Tracking]
+				Template, Tracking, TrackingDaily]
 	"""Record types called in install"""
 
 	_seshPre = 'prov:'
@@ -55,6 +57,13 @@ class Providers(Services.Service):
 		# Get providers conf
 		self._conf = Conf.get(('services', 'providers'))
 
+		# Connect to Redis for the hours cache
+		self._redis = StrictRedis(**Conf.get(('redis', 'primary'), {
+			"host": "localhost",
+			"port": 6379,
+			"db": 0
+		}))
+
 		# Return self for chaining
 		return self
 
@@ -345,38 +354,26 @@ class Providers(Services.Service):
 		try: DictHelper.eval(data, ['start', 'end',])
 		except ValueError as e: return Services.Error(1001, [(f, 'missing') for f in e.args])
 
-		# Fetch all records in the given time period
-		lTracking = Tracking.range(data['start'], data['end'])
+		# Make sure the range is made of ints
+		for f in ['start', 'end']:
+			try: data[f] = int(data[f])
+			except ValueError: return Services.Error(1001, [(f, 'not an int')])
 
-		# If we got nothing
-		if not lTracking:
-			return Services.Response([])
+		# If we have the report cached, return it
+		sKey = 'prov:hours:%d:%d' % (data['start'], data['end'])
+		sCached = self._redis.get(sKey)
+		if sCached:
+			return Services.Response(JSON.decode(sCached))
 
-		# Init the dictionary of providers
-		dProviders = {}
+		# Fetch the totals by provider in the given time period
+		lTotals = TrackingDaily.hours(data['start'], data['end'])
 
-		# Go through each record
-		for d in lTracking:
+		# If we got nothing
+		if not lTotals:
+			return Services.Response([])
 
-			# If we don't have the provider yet
-			if d['memo_id'] not in dProviders:
-				dProviders[d['memo_id']] = {
-					"seconds": 0,
-					"approvals": 0,
-					"declines": 0
-				}
-
-			# If the action is signin
-			if d['action'] == 'signin':
-				print('%d - %d = %d' % (d['resolution_ts'], d['action_ts'], (d['resolution_ts'] - d['action_ts'])))
-				dProviders[d['memo_id']]['seconds'] += (d['resolution_ts'] - d['action_ts'])
-
-			# Else, if the action is viewed
-			elif d['action'] == 'viewed':
-				if d['resolution'] == 'approved':
-					dProviders[d['memo_id']]['approvals'] += 1
-				elif d['resolution'] == 'declined':
-					dProviders[d['memo_id']]['declines'] += 1
+		# Store them by provider
+		dProviders = {d['memo_id']:d for d in lTotals}
 
 		# Get the provider names for all the IDs
 		oResponse = Services.read('monolith', 'users', {
@@ -432,10 +429,18 @@ class Providers(Services.Service):
 				"average": sAvgHours
 			})
 
-		# Return the list sorted by last name
-		return Services.Response(
-			sorted(lRet, key=lambda d: d['lastName'])
-		)
+		# Sort the list by last name
+		lRet.sort(key=lambda d: d['lastName'])
+
+		# Cache the report, briefly if the range is still open
+		self._redis.set(sKey, JSON.encode(lRet), ex=(
+			data['end'] < (time() - 86400) and \
+			self._conf.get('hours_ttl_closed', 86400) or \
+			self._conf.get('hours_ttl', 60)
+		))
+
+		# Return the list
+		return Services.Response(lRet)
 
 	def prescriptions_create(self, data, sesh):
 		"""Prescriptions Create
@@ -1243,6 +1248,9 @@ class Providers(Services.Service):
 				oPrevTrack['resolution_ts'] = dViewed['resolution_ts']
 				oPrevTrack.save()
 
+				# Update the daily totals
+				TrackingDaily.refresh(oPrevTrack['memo_id'], oPrevTrack['action_ts'])
+
 		# Create the sign in tracking
 		oTracking = Tracking({
 			"memo_id": oSesh['memo_id'],
@@ -1314,6 +1322,9 @@ class Providers(Services.Service):
 				oTracking['resolution_ts'] = iTS
 				oTracking.save()
 
+				# Update the daily totals
+				TrackingDaily.refresh(oTracking['memo_id'], oTracking['action_ts'])
+
 		# Close the session so it can no longer be found/used
 		sesh.close()
 
@@ -1520,6 +1531,10 @@ class Providers(Services.Service):
 			})
 			oTracking.create()
 
+			# If it's an sms, it counts right away, update the daily totals
+			if data['action'] == 'sms':
+				TrackingDaily.refresh(oTracking['memo_id'], oTracking['action_ts'])
+
 			# Return OK
 			return Services.Response(True)
 
@@ -1550,5 +1565,8 @@ class Providers(Services.Service):
 				oTracking['resolution_ts'] = int(time())
 				oTracking.save()
 
+				# Update the daily totals
+				TrackingDaily.refresh(oTracking['memo_id'], oTracking['action_ts'])
+
 			# Return
 			return Services.Response(oTracking and True or False)
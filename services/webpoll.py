@@ -41,6 +41,9 @@ class WebPoll(Services.Service):
 		# Init the sync module
 		Sync.init()
 
+		# Store the max number of seconds a poll can wait
+		self._poll_timeout = Conf.get(('services', 'webpoll', 'poll_timeout'), 25)
+
 		# Return self for chaining
 		return self
 
@@ -128,6 +131,42 @@ class WebPoll(Services.Service):
 		# Return OK
 		return Services.Response(True)
 
+	def poll_read(self, data, sesh):
+		"""Poll
+
+		A client is waiting for an update on anything they might be looking at.
+		Blocks until messages arrive or the timeout passes, and clears any
+		messages returned
+
+		Arguments:
+			data (dict): Data sent with the request
+			sesh (Sesh._Session): The session associated with the request
+
+		Returns:
+			Services.Response
+		"""
+
+		# Verify fields
+		try: DictHelper.eval(data, ['service', 'key'])
+		except ValueError as e: return Services.Response(error=(1001, [(f, 'missing') for f in e.args]))
+
+		# Get the timeout, never going over the configured max
+		iTimeout = self._poll_timeout
+		if 'timeout' in data:
+			try: iTimeout = max(1, min(int(data['timeout']), self._poll_timeout))
+			except (TypeError, ValueError): return Services.Response(error=(1001, [('timeout', 'invalid')]))
+
+		# Wait for messages
+		lRet = Sync.poll(
+			sesh.id(),
+			data['service'],
+			data['key'],
+			iTimeout
+		)
+
+		# Return whatever was found
+		return Services.Response(lRet)
+
 	def pull_read(self, data, sesh):
 		"""Pull
 
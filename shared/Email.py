@@ -14,8 +14,163 @@ __created__		= "2020-07-28"
 # Python imports
 import base64
 import email
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate, make_msgid
 import imaplib
 import quopri
+import smtplib
+
+QUEUE = 'email:queue'
+"""Redis list of emails waiting to be sent"""
+
+PROCESSING = 'email:processing:%s'
+"""Redis list of emails a single queue worker is sending"""
+
+RETRY = 'email:retry'
+"""Redis sorted set of emails to retry, scored by when to retry them"""
+
+FAILED = 'email:failed'
+"""Redis list of emails that could not be sent"""
+
+STATS = 'email:stats'
+"""Redis hash of queue counters"""
+
+LATENCY = 'email:latency'
+"""Redis list of the most recent milliseconds from queued to sent"""
+
+def build(to, subject, text_body=None, html_body=None, from_=None, attachments=None):
+	"""Build
+
+	Creates the message to send, attachments are dicts of filename and
+	base64 encoded body
+
+	Arguments:
+		to (str|str[]): The recipient(s) of the email
+		subject (str): The subject of the email
+		text_body (str): The plain text version of the email
+		html_body (str): The HTML version of the email
+		from_ (str): The sender of the email
+		attachments (dict[]): Files to attach to the email
+
+	Returns:
+		email.message.Message
+	"""
+
+	# Create the multipart alternative for the bodies
+	oBodies = MIMEMultipart('alternative')
+	if text_body:
+		oBodies.attach(MIMEText(text_body, 'plain', 'utf-8'))
+	if html_body:
+		oBodies.attach(MIMEText(html_body, 'html', 'utf-8'))
+
+	# If we have attachments, wrap the bodies in a mixed
+	if attachments:
+		oMsg = MIMEMultipart('mixed')
+		oMsg.attach(oBodies)
+		for d in attachments:
+			oPart = MIMEApplication(base64.b64decode(d['body']), Name=d['filename'])
+			oPart['Content-Disposition'] = 'attachment; filename="%s"' % d['filename']
+			oMsg.attach(oPart)
+	else:
+		oMsg = oBodies
+
+	# Add the headers
+	oMsg['Subject'] = subject
+	oMsg['From'] = from_
+	oMsg['To'] = isinstance(to, (list,tuple)) and ', '.join(to) or to
+	oMsg['Date'] = formatdate(localtime=True)
+	oMsg['Message-ID'] = make_msgid()
+
+	# Return the message
+	return oMsg
+
+class Sender(object):
+	"""Sender
+
+	Keeps a single SMTP connection open between messages, reconnecting only
+	when it's been closed or an error has occured
+	"""
+
+	def __init__(self, host='localhost', port=25, tls=False, user=None, passwd=None):
+		"""Constructor
+
+		Stores the SMTP settings, no connection is made until the first send
+
+		Arguments:
+			host (str): The SMTP server
+			port (uint): The port of the SMTP server
+			tls (bool): True to use STARTTLS
+			user (str): The user to login as
+			passwd (str): The password associated with the user
+
+		Returns:
+			Sender
+		"""
+		self._host = host
+		self._port = port
+		self._tls = tls
+		self._user = user
+		self._passwd = passwd
+		self._smtp = None
+
+	def close(self):
+		"""Close
+
+		Closes the connection if there is one
+
+		Returns:
+			None
+		"""
+		if self._smtp:
+			try: self._smtp.quit()
+			except (smtplib.SMTPException, OSError): pass
+			self._smtp = None
+
+	def send(self, msg, to):
+		"""Send
+
+		Sends the message, connecting first if necessary. Any exception closes
+		the connection so the next send starts fresh
+
+		Arguments:
+			msg (email.message.Message): The message to send
+			to (str|str[]): The recipient(s) of the message
+
+		Raises:
+			smtplib.SMTPException
+			OSError
+
+		Returns:
+			None
+		"""
+
+		# If we have a connection, make sure it's still alive
+		if self._smtp:
+			try:
+				if self._smtp.noop()[0] != 250:
+					self.close()
+			except (smtplib.SMTPException, OSError):
+				self._smtp = None
+
+		try:
+
+			# If we need a connection
+			if not self._smtp:
+				self._smtp = smtplib.SMTP(self._host, self._port, timeout=30)
+				if self._tls:
+					self._smtp.starttls()
+				if self._user:
+					self._smtp.login(self._user, self._passwd)
+
+			# Send the message
+			self._smtp.send_message(msg, to_addrs=isinstance(to, (list,tuple)) and list(to) or [to])
+
+		# On any error, drop the connection and pass the error on
+		except (smtplib.SMTPException, OSError):
+			self.close()
+			raise
 
 def fetch_imap(user, passwd, host='localhost', port=143, tls=False, box='INBOX', from_=None, markread=True):
 	"""Fetch IMAP
@@ -66,87 +221,107 @@ def fetch_imap(user, passwd, host='localhost', port=143, tls=False, box='INBOX',
 		# Step through them
 		for sID in lIDs:
 
-			# Init the email dict
-			dEmail = {
-				'attachments': None,
-				'headers': {},
-				'html': None,
-				'text': None
-			}
-
 			# Fetch the email
 			sTyp, lData = oServer.fetch(sID, '(BODY.PEEK[])')
 
-			# Get the raw data
-			sBody = lData[0][1].decode('utf-8')
+			# Parse it and add it to the return list
+			lRet.append(parse_message(lData[0][1]))
 
-			# Load the email into the email library
-			oMsg = email.message_from_string(sBody)
+			# Mark message as read
+			if markread:
+				oServer.store(sID, '+FLAGS', '\Seen')
 
-			# Get the headers
-			for l in oMsg.items():
-				dEmail['headers'][l[0]] = l[1]
+	# Return any emails found
+	return lRet
 
-			# If it's multipart
-			if oMsg.is_multipart():
+def parse_message(raw):
+	"""Parse Message
 
-				# Get the payloads
-				lPayloads = oMsg.get_payload()
+	Parses a raw email, as fetched from IMAP, into its headers, text, html,
+	and attachments
 
-				# Go through each one and print what it is
-				for o in lPayloads:
+	Arguments:
+		raw (bytes): The full email
 
-					# If the type is text/plain
-					if o.get_content_type() == 'text/plain':
-						dEmail['text'] = o.get_payload(decode=True)
+	Returns:
+		dict
+	"""
 
-					# Else if the type is text/html
-					elif o.get_content_type() == 'text/html':
-						dEmail['html'] = o.get_payload(decode=True)
+	# Init the email dict
+	dEmail = {
+		'attachments': None,
+		'headers': {},
+		'html': None,
+		'text': None
+	}
 
-					# Else it's most likely an attachment
-					else:
+	# Get the raw data
+	sBody = raw.decode('utf-8')
 
-						# If we don't have a list yet
-						if dEmail['attachments'] is None:
-							dEmail['attachments'] = []
+	# Load the email into the email library, and keep it for anything that
+	#	needs more than the parts below
+	oMsg = email.message_from_string(sBody)
+	dEmail['message'] = oMsg
 
-						# Store the type, filename, and content
-						dEmail['attachments'].append({
-							"type": o.get_content_type(),
-							"filename": o.get_filename(),
-							"content": o.get_payload(decode=True)
-						})
+	# Get the headers
+	for l in oMsg.items():
+		dEmail['headers'][l[0]] = l[1]
 
-			# Else, it's a single part
-			else:
+	# If it's multipart
+	if oMsg.is_multipart():
 
-				# Get the payload
-				sPayload = oMsg.get_payload()
-
-				# If there's encoding
-				if 'Content-Transfer-Encoding' in dEmail['headers']:
-					if dEmail['headers']['Content-Transfer-Encoding'] == 'base64':
-						sPayload = base64.b64decode(sPayload)
-					elif dEmail['headers']['Content-Transfer-Encoding'] == 'quoted-printable':
-						sPayload = quopri.decodestring(sPayload)
-					else:
-						raise ValueError('Unknown Content-Transfer-Encoding: %s' % dEmail['headers']['Content-Transfer-Encoding'])
-
-				# If it's html
-				if oMsg.get_content_type() == 'text/html':
-					dEmail['html'] = sPayload
-				elif oMsg.get_content_type() == 'text/plain':
-					dEmail['text'] = sPayload
-				else:
-					raise ValueError('Unknown Content-Type: %s' % oMsg.get_content_type())
-
-			# Add the email to the return list
-			lRet.append(dEmail)
+		# Get the payloads
+		lPayloads = oMsg.get_payload()
 
-			# Mark message as read
-			if markread:
-				oServer.store(sID, '+FLAGS', '\Seen')
+		# Go through each one and print what it is
+		for o in lPayloads:
 
-	# Return any emails found
-	return lRet
+			# If the type is text/plain
+			if o.get_content_type() == 'text/plain':
+				dEmail['text'] = o.get_payload(decode=True)
+
+			# Else if the type is text/html
+			elif o.get_content_type() == 'text/html':
+				dEmail['html'] = o.get_payload(decode=True)
+
+			# Else it's most likely an attachment
+			else:
+
+				# If we don't have a list yet
+				if dEmail['attachments'] is None:
+					dEmail['attachments'] = []
+
+				# Store the type, filename, and content
+				dEmail['attachments'].append({
+					"type": o.get_content_type(),
+					"filename": o.get_filename(),
+					"content": o.get_payload(decode=True)
+				})
+
+	# Else, it's a single part
+	else:
+
+		# Get the payload
+		sPayload = oMsg.get_payload()
+
+		# Decode it, 7bit, the default, 8bit, and binary are sent as is
+		sEncoding = dEmail['headers'].get('Content-Transfer-Encoding', '7bit').strip().lower()
+		if sEncoding == 'base64':
+			sPayload = base64.b64decode(sPayload)
+		elif sEncoding == 'quoted-printable':
+			sPayload = quopri.decodestring(sPayload)
+		elif sEncoding in ['7bit', '8bit', 'binary']:
+			sPayload = oMsg.get_payload(decode=True)
+		else:
+			raise ValueError('Unknown Content-Transfer-Encoding: %s' % dEmail['headers']['Content-Transfer-Encoding'])
+
+		# If it's html
+		if oMsg.get_content_type() == 'text/html':
+			dEmail['html'] = sPayload
+		elif oMsg.get_content_type() == 'text/plain':
+			dEmail['text'] = sPayload
+		else:
+			raise ValueError('Unknown Content-Type: %s' % oMsg.get_content_type())
+
+	# Return the email
+	return dEmail
@@ -11,9 +11,17 @@ __maintainer__	= "Chris Nasr"
 __email__		= "bast@maleexcel.com"
 __created__		= "2020-07-28"
 
+# Python imports
+from collections import namedtuple
+from datetime import datetime
+
 # Pip imports
 import xlrd
 
+# openpyxl is optional, without it .xlsx files are loaded whole by xlrd
+try: import openpyxl
+except ImportError: openpyxl = None
+
 STRING = 0
 DATETIME = 1
 DATE = 2
@@ -31,6 +39,10 @@ def _convert_date(val):
 		str
 	"""
 
+	# If we got an actual date, format it
+	if isinstance(val, datetime):
+		return val.strftime('%Y-%m-%d')
+
 	# Turn the value into a tuple
 	tDate = xlrd.xldate_as_tuple(val, 0)
 
@@ -53,6 +65,10 @@ def _convert_datetime(val):
 		str
 	"""
 
+	# If we got an actual date, format it
+	if isinstance(val, datetime):
+		return val.strftime('%Y-%m-%d %H:%M:%S')
+
 	# Turn the value into a tuple
 	tDate = xlrd.xldate_as_tuple(val, 0)
 
@@ -66,66 +82,141 @@ def _convert_datetime(val):
 		tDate[5]
 	)
 
-def parse(filename, conf, sheet=0, start_row=0):
-	"""Parse
+def _compile(conf, output):
+	"""Compile
 
-	Opens a workbook, loads the given sheet (int for by index, str for by name)
-	and loads the fields given by the config into dicts, returning them in a
-	list
+	Turns the conf into a single function that converts a list of raw cell
+	values into the requested output
+
+	Arguments:
+		conf (dict): A dictionary of names to 'column' and 'type'
+		output (str): 'dict', 'tuple', or 'namedtuple'
+
+	Raises:
+		ValueError
+
+	Returns:
+		callable
+	"""
+
+	# Map each type to its converter
+	dConverters = {
+		STRING: lambda v: v,
+		DATETIME: _convert_datetime,
+		DATE: _convert_date,
+		INTEGER: int
+	}
+
+	# Generate the list of names, columns, and converters once
+	lNames = []
+	lColumns = []
+	for k,d in conf.items():
+		if d['type'] not in dConverters:
+			raise ValueError('Unknown conf type: %s' % str(d['type']))
+		lNames.append(k)
+		lColumns.append((d['column'], dConverters[d['type']]))
+
+	# Converts a row to a tuple, empty or missing cells become ''
+	def toTuple(row):
+		iLen = len(row)
+		return tuple(
+			f(row[i] if i < iLen and row[i] is not None else '')
+			for i,f in lColumns
+		)
+
+	# Return the converter for the output
+	if output == 'tuple':
+		return toTuple
+	elif output == 'namedtuple':
+		oTuple = namedtuple('Row', lNames)
+		return lambda row: oTuple._make(toTuple(row))
+	elif output == 'dict':
+		return lambda row: dict(zip(lNames, toTuple(row)))
+	else:
+		raise ValueError('Unknown output: %s' % str(output))
+
+def iterparse(filename, conf, sheet=0, start_row=0, output='dict'):
+	"""Iterparse
+
+	Same as parse, but yields rows one at a time instead of returning a list.
+	.xlsx files are streamed using a read-only openpyxl workbook if it's
+	installed, all other files are read using xlrd
 
 	Arguments:
 		filename (str): The name of the workbook file to open
 		conf (dict): A dictionary of names to 'column' and 'type'
 		sheet (uint|str): Fetch the sheet by index or by name
 		start_row (uint): The first row with data, useful for skipping headers
+		output (str): 'dict' (default), 'tuple' in the order of conf, or
+						'namedtuple'
 
 	Returns:
-		dict[]
+		generator
 	"""
 
-	# Init the return list of values
-	lRet = []
+	# Compile the row converter
+	fConvert = _compile(conf, output)
 
-	# Load the file
-	oXLS = xlrd.open_workbook(filename)
+	# If it's an xlsx and we can stream it
+	if openpyxl and filename.lower().endswith('.xlsx'):
 
-	# If we have an int
-	if isinstance(sheet, int):
-		oSheet = oXLS.sheet_by_index(sheet)
-	else:
-		oSheet = oXLS.sheet_by_name(sheet)
+		# Load the file
+		oXLS = openpyxl.load_workbook(filename, read_only=True, data_only=True)
 
-	# Go through each row in the sheet
-	for i in range(start_row, oSheet.nrows):
+		try:
 
-		# Init the new row
-		dRow = {}
+			# If we have an int
+			if isinstance(sheet, int):
+				oSheet = oXLS.worksheets[sheet]
+			else:
+				oSheet = oXLS[sheet]
 
-		# Go through each item in the conf
-		for k,d in conf.items():
+			# Go through each row in the sheet
+			for tRow in oSheet.iter_rows(min_row=start_row + 1, values_only=True):
+				yield fConvert(tRow)
 
-			# If the type is a string
-			if d['type'] == STRING:
-				dRow[k] = oSheet.cell_value(i, d['column'])
+		# Close the file
+		finally:
+			oXLS.close()
 
-			# Else if it's a date/time
-			elif d['type'] == DATETIME:
-				dRow[k] = _convert_datetime(oSheet.cell_value(i, d['column']))
+	# Else, use xlrd
+	else:
 
-			# Else if it's a date
-			elif d['type'] == DATE:
-				dRow[k] = _convert_date(oSheet.cell_value(i, d['column']))
+		# Load the file
+		oXLS = xlrd.open_workbook(filename, on_demand=True)
 
-			# Else if it's an integer
-			elif d['type'] == INTEGER:
-				dRow[k] = int(oSheet.cell_value(i, d['column']))
+		try:
 
-			# Else
+			# If we have an int
+			if isinstance(sheet, int):
+				oSheet = oXLS.sheet_by_index(sheet)
 			else:
-				raise ValueError('Uknown conf type: %s' % str(d['type']))
+				oSheet = oXLS.sheet_by_name(sheet)
 
-		# Add the row to the return list
-		lRet.append(dRow)
+			# Go through each row in the sheet
+			for i in range(start_row, oSheet.nrows):
+				yield fConvert(oSheet.row_values(i))
+
+		# Free the memory
+		finally:
+			oXLS.release_resources()
+
+def parse(filename, conf, sheet=0, start_row=0):
+	"""Parse
+
+	Opens a workbook, loads the given sheet (int for by index, str for by name)
+	and loads the fields given by the config into dicts, returning them in a
+	list
+
+	Arguments:
+		filename (str): The name of the workbook file to open
+		conf (dict): A dictionary of names to 'column' and 'type'
+		sheet (uint|str): Fetch the sheet by index or by name
+		start_row (uint): The first row with data, useful for skipping headers
+
+	Returns:
+		dict[]
+	"""
 
-	# Return the data found
-	return lRet
+	# Return all the rows
+	return list(iterparse(filename, conf, sheet, start_row))
@@ -11,8 +11,14 @@ __maintainer__	= "Chris Nasr"
 __email__		= "bast@maleexecl.com"
 __created__		= "2020-04-02"
 
+# Python imports
+import os
+import threading
+from time import sleep, time
+
 # Pip imports
-from RestOC import Errors, Services
+from redis import StrictRedis
+from RestOC import Conf, Errors, JSON, Services
 
 READ	= 0x01
 """Allowed to read records"""
@@ -32,6 +38,211 @@ ALL		= 0x0F
 INVALID = 1000
 """REST invalid rights error code"""
 
+CHANNEL = 'perms'
+"""Redis channel user IDs are published on when their permissions change"""
+
+_moRedis = None
+"""Redis connection used to fetch cached permissions"""
+
+_mdCache = {}
+"""Permissions by user ID, each stored as (timestamp, permissions)"""
+
+_miPid = None
+"""The process the cache was started in, forked workers start their own"""
+
+_mbListening = False
+"""True while the invalidation subscriber is connected"""
+
+_miVersion = 0
+"""Incremented on every invalidation, used to avoid caching stale data"""
+
+_miTTL = 300
+"""Max seconds to trust a local entry, in case an invalidation is missed"""
+
+def _listen():
+	"""Listen
+
+	Runs in a background thread, removing users from the local cache whenever
+	their permissions are cleared, and everything if the connection is lost
+
+	Returns:
+		None
+	"""
+
+	global _mbListening, _miVersion
+
+	# Loop forever
+	while True:
+
+		try:
+
+			# Subscribe to the channel
+			oPubSub = _moRedis.pubsub(ignore_subscribe_messages=True)
+			oPubSub.subscribe(CHANNEL)
+			_mbListening = True
+
+			# Remove each user as their ID comes in
+			for dMsg in oPubSub.listen():
+				_miVersion += 1
+				sID = isinstance(dMsg['data'], bytes) and \
+						dMsg['data'].decode('utf-8') or \
+						str(dMsg['data'])
+				_mdCache.pop(sID, None)
+
+		except Exception as e:
+			print('Rights cache subscriber error: %s' % str(e))
+
+		# We can no longer trust anything stored locally
+		_mbListening = False
+		_miVersion += 1
+		_mdCache.clear()
+
+		# Wait a second before reconnecting
+		sleep(1)
+
+def _permissions(sesh):
+	"""Permissions
+
+	Returns the permissions for the user in the session, from the local cache
+	if possible, else from the Redis cache shared with the auth service, else
+	from the auth service itself. Returns None if the cache is disabled or the
+	session has no user
+
+	Arguments:
+		sesh (RestOC.Sesh._Session): The current session
+
+	Returns:
+		dict|None
+	"""
+
+	global _moRedis, _miPid, _miTTL
+
+	# If this process hasn't started the cache yet
+	if _miPid != os.getpid():
+
+		# Mark the process, even if caching is off, so we only check once
+		_miPid = os.getpid()
+		_mdCache.clear()
+		_moRedis = None
+
+		# If the cache is disabled
+		dConf = Conf.get('rights', {})
+		if not dConf.get('cache', True):
+			return None
+
+		# Connect to Redis and start listening for invalidations
+		_miTTL = dConf.get('ttl', 300)
+		_moRedis = StrictRedis(**Conf.get(('redis', 'primary'), {
+			"host": "localhost",
+			"port": 6379,
+			"db": 0
+		}))
+		oThread = threading.Thread(target=_listen)
+		oThread.daemon = True
+		oThread.start()
+
+	# If caching is disabled
+	if not _moRedis:
+		return None
+
+	# Get the user ID from the session
+	try:
+		sID = str(sesh['user_id'])
+	except (KeyError, TypeError):
+		return None
+
+	# If we have them locally and they're not too old, return them
+	if _mbListening and sID in _mdCache:
+		tPerms = _mdCache[sID]
+		if tPerms[0] > time() - _miTTL:
+			return tPerms[1]
+
+	# Note the version so we know if an invalidation came in while fetching
+	iVersion = _miVersion
+
+	# Look for the permissions in Redis
+	sPerms = _moRedis.get('perms:%s' % sID)
+	if sPerms:
+		dPerms = JSON.decode(sPerms)
+
+	# Else, ask the auth service, which will also cache them in Redis
+	else:
+		oResponse = Services.read('auth', 'permissions/self', {}, sesh)
+		if oResponse.errorExists():
+			return None
+		dPerms = oResponse.data or {}
+
+	# Store them locally if nothing changed while we fetched them
+	if _mbListening and iVersion == _miVersion:
+		_mdCache[sID] = (time(), dPerms)
+
+	# Return the permissions
+	return dPerms
+
+def evaluate(permissions, name, right, ident=None):
+	"""Evaluate
+
+	Checks the given permissions for the requested right on the permission,
+	or any one of the permissions if a list is passed
+
+	Arguments:
+		permissions (dict): The user's permissions by name
+		name (str|str[]): The name(s) of the permission to check
+		right (uint): The right to check for
+		ident (str): Optional identifier to check against
+
+	Raises:
+		ValueError
+
+	Returns:
+		bool
+	"""
+
+	# If the user has no permissions at all
+	if not permissions:
+		return False
+
+	# If one permission was requested
+	if isinstance(name, str):
+
+		# If we don't have it
+		if name not in permissions:
+			return False
+
+		# Set the name to use
+		sName = name
+
+	# Else, if it's a list
+	elif isinstance(name, list):
+
+		# Go through each one, if one matches, store it
+		for s in name:
+			if s in permissions:
+				sName = s
+				break
+
+		# Else, return failure
+		else:
+			return False
+
+	# Else, invalid name data
+	else:
+		raise ValueError('name', 'invalid, must be string or string[]')
+
+	# If the permission exists but doesn't contain the proper right
+	if not permissions[sName]['rights'] & right:
+		return False
+
+	# If the permission has idents
+	if permissions[sName]['idents'] is not None:
+
+		# If no ident was passed, or it isn't in the list
+		if ident is None or str(ident) not in permissions[sName]['idents']:
+			return False
+
+	# Seems ok
+	return True
+
 def check(sesh, name, right, ident=None):
 	"""Check
 
@@ -52,21 +263,35 @@ def check(sesh, name, right, ident=None):
 		None
 	"""
 
-	# Init request data
-	dData = {
-		"name": name,
-		"right": right
-	}
+	# Get the user's permissions from the cache
+	dPermissions = _permissions(sesh)
+
+	# If we have them, check locally
+	if dPermissions is not None:
+		try:
+			bResult = evaluate(dPermissions, name, right, ident)
+		except ValueError:
+			bResult = False
+
+	# Else, check with the auth service
+	else:
+
+		# Init request data
+		dData = {
+			"name": name,
+			"right": right
+		}
 
-	# If we have an ident, add it on
-	if ident is not None:
-		dData['ident'] = ident
+		# If we have an ident, add it on
+		if ident is not None:
+			dData['ident'] = ident
 
-	# Check with the auth service
-	oResponse = Services.read('auth', 'rights/verify', dData, sesh)
+		# Check with the auth service
+		oResponse = Services.read('auth', 'rights/verify', dData, sesh)
+		bResult = oResponse.data
 
 	# If the check failed, raise an exception
-	if not oResponse.data:
+	if not bResult:
 		raise Services.ResponseException(error=INVALID)
 
 	# Return OK
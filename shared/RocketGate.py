@@ -22,11 +22,156 @@
 # whether or not advised of the possibility of damage, regardless of the theory of liability.
 #
 import xml.sax
+import xml.parsers.expat
 import http.client
 import random
 import errno
+import select
 import socket
 import ssl 
+import threading
+import time
+
+class GatewayPool:
+
+######################################################################
+#
+#	Keep-alive HTTPS connections to each gateway host, shared by
+#	every GatewayService in the process, along with the health of
+#	each host so failing hosts are tried last.
+#
+######################################################################
+#
+    MAX_IDLE = 4				# Idle connections kept per host
+    IDLE_TIMEOUT = 4				# Seconds before an idle one is dropped,
+						# under the 5 second keep-alive most
+						# servers default to
+    FAIL_COOLDOWN = 60				# Seconds a failure counts against a host
+
+    lock = threading.Lock()
+    idle = {}					# (host, port) => [(connection, time)]
+    failures = {}				# host => (count, last failure time)
+
+
+######################################################################
+#
+#	Take() - Take an idle connection to the host, or create a new
+#		 one. Returns the connection and whether it was reused.
+#
+######################################################################
+#
+    @classmethod
+    def Take(cls, host, port, timeout, context=None):
+        now = time.time()
+        with cls.lock:
+            connections = cls.idle.get((host, port), [])
+            while connections:			# Newest first
+                connection, idleSince = connections.pop()
+                if ((now - idleSince < cls.IDLE_TIMEOUT) and \
+                    cls.Alive(connection)):
+                    return connection, True
+                connection.close()		# Too old, or server closed it
+        return http.client.HTTPSConnection(host, port, timeout=timeout, \
+                                           context=context), False
+
+
+######################################################################
+#
+#	Alive() - Check an idle connection can still be used. Nothing
+#		  should arrive on an idle connection, so if the socket
+#		  is readable the server has closed it, or sent
+#		  something we can't match to a request.
+#
+######################################################################
+#
+    @staticmethod
+    def Alive(connection):
+        sock = connection.sock
+        if (sock == None):			# Never connected, or closed
+            return 0
+        try:
+            if (isinstance(sock, ssl.SSLSocket) and sock.pending()):
+                return 0			# Decrypted data waiting
+            readable, writable, failed = select.select([sock], [], [sock], 0)
+        except (OSError, ValueError):
+            return 0
+        return not (readable or failed)	# Readable means data or EOF
+
+
+######################################################################
+#
+#	Give() - Give a connection back to be reused, closing it
+#		 instead if there are already enough idle ones.
+#
+######################################################################
+#
+    @classmethod
+    def Give(cls, host, port, connection):
+        with cls.lock:
+            connections = cls.idle.setdefault((host, port), [])
+            if (len(connections) < cls.MAX_IDLE):
+                connections.append((connection, time.time()))
+                return
+        connection.close()
+
+
+######################################################################
+#
+#	Clear() - Close every idle connection.
+#
+######################################################################
+#
+    @classmethod
+    def Clear(cls):
+        with cls.lock:
+            for connections in cls.idle.values():
+                for connection, idleSince in connections:
+                    connection.close()
+            cls.idle = {}
+
+
+######################################################################
+#
+#	Failed() / Succeeded() - Track the health of a host.
+#
+######################################################################
+#
+    @classmethod
+    def Failed(cls, host):
+        with cls.lock:
+            count = cls.failures.get(host, (0, 0))[0]
+            cls.failures[host] = (count + 1, time.time())
+
+    @classmethod
+    def Succeeded(cls, host):
+        with cls.lock:
+            cls.failures.pop(host, None)
+
+
+######################################################################
+#
+#	Order() - Return the hosts in the order they should be tried.
+#		  Healthy hosts come first, in random order, followed by
+#		  hosts that failed recently, fewest failures first.
+#
+######################################################################
+#
+    @classmethod
+    def Order(cls, hosts):
+        now = time.time()
+        healthy = []
+        failing = []
+        with cls.lock:
+            for host in hosts:
+                count, last = cls.failures.get(host, (0, 0))
+                if (count and now - last < cls.FAIL_COOLDOWN):
+                    failing.append((count, last, host))
+                else:
+                    healthy.append(host)
+        random.shuffle(healthy)
+        failing.sort()
+        return healthy + [host for count, last, host in failing]
+
 
 class GatewayRequest:
 
@@ -91,6 +236,8 @@ class GatewayRequest:
     GATEWAY_CONNECT_TIMEOUT = "gatewayConnectTimeout"
     GATEWAY_READ_TIMEOUT = "gatewayReadTimeout"
 
+    ESCAPE = str.maketrans({ "&": "&amp;", "<": "&lt;", ">": "&gt;" })
+
 
 ######################################################################
 #
@@ -148,42 +295,15 @@ class GatewayRequest:
     def ToXML(self):
 
 #
-#	Build the document header.
-#
-        xmlDocument = "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
-        xmlDocument += "<gatewayRequest>"
-
-#
-#	Loop over each key-value pairs and create
-#	and open tag for the key.
+#	Build each element, escaping the value, and join them all at
+#	once inside the document.
 #
+        elements = []
         for key, value in self.parameterList.items():
-            xmlDocument += "<";
-            xmlDocument += key
-            xmlDocument += ">"
-
-#
-#	Clean up the value and add it to the tag.
-#
-            myValue = str(value)		# In case it's not a string
-            myValue = myValue.replace("&", "&amp;");
-            myValue = myValue.replace("<", "&lt;");
-            myValue = myValue.replace(">", "&gt;");
-            xmlDocument += myValue
-
-#
-#
-#	Add the closing tag for this element.
-#
-            xmlDocument += "</";
-            xmlDocument += key
-            xmlDocument += ">"
-
-#
-#	Close and return the document.
-#
-        xmlDocument += "</gatewayRequest>"
-        return xmlDocument			# Final document
+            elements.append("<%s>%s</%s>" % (key, \
+                            str(value).translate(GatewayRequest.ESCAPE), key))
+        return "<?xml version=\"1.0\" encoding=\"UTF-8\"?>" \
+               "<gatewayRequest>" + "".join(elements) + "</gatewayRequest>"
 
 
 class GatewayResponse(xml.sax.handler.ContentHandler):
@@ -291,17 +411,26 @@ class GatewayResponse(xml.sax.handler.ContentHandler):
         self.valueBuffer = ""			# No value yet
 
 #
-#	Parse the input string.
+#	Parse the input string with expat directly, using the same
+#	handlers as the SAX parser, but without SAX's layers in
+#	between for every element.
 #
         try:
-            xml.sax.parseString(xmlDocument, self)
+            parser = xml.parsers.expat.ParserCreate()
+            parser.buffer_text = True
+            parser.StartElementHandler = self.startElement
+            parser.CharacterDataHandler = self.characters
+            parser.EndElementHandler = self.endElement
+            parser.Parse(xmlDocument, True)
 
 #
 #	If there was a parsing error, set the error codes
 #	and quit.
 #
-        except xml.sax.SAXException as ex:
-            self.Set(GatewayResponse.EXCEPTION, ex.getMessage() + \
+        except xml.parsers.expat.ExpatError as ex:
+            if (isinstance(xmlDocument, bytes)):
+                xmlDocument = xmlDocument.decode("utf-8", "replace")
+            self.Set(GatewayResponse.EXCEPTION, str(ex) + \
                      ": " + xmlDocument)
             self.Set(GatewayResponse.RESPONSE_CODE, 3)
             self.Set(GatewayResponse.REASON_CODE, 400)
@@ -312,7 +441,7 @@ class GatewayResponse(xml.sax.handler.ContentHandler):
 #
         except:
             self.Set(GatewayResponse.EXCEPTION, "Unhandled exception: " + \
-                     xmlDocument)
+                     str(xmlDocument))
             self.Set(GatewayResponse.RESPONSE_CODE, 3)
             self.Set(GatewayResponse.REASON_CODE, 307)
 
@@ -386,6 +515,8 @@ class GatewayService:
         self.rocketGatePortNo = GatewayService.ROCKETGATE_PORTNO
         self.rocketGateConnectTimeout = GatewayService.ROCKETGATE_CONNECT_TIMEOUT
         self.rocketGateReadTimeout = GatewayService.ROCKETGATE_READ_TIMEOUT
+        self.keepAlive = 1			# Reuse pooled connections
+        self.sslContext = None			# Default certificate checks
 
 
 ######################################################################
@@ -475,6 +606,27 @@ class GatewayService:
             pass
 
 
+######################################################################
+#
+#	SetKeepAlive() - Select whether connections are pooled and
+#			 reused, or opened and closed per transaction.
+#
+######################################################################
+#
+    def SetKeepAlive(self, yesNo):
+        self.keepAlive = yesNo and 1 or 0
+
+
+######################################################################
+#
+#	SetSSLContext() - Set the SSL context used for connections.
+#
+######################################################################
+#
+    def SetSSLContext(self, context):
+        self.sslContext = context
+
+
 ######################################################################
 #
 #	SendTransaction() - Send a transaction to a named host.
@@ -539,12 +691,32 @@ class GatewayService:
                     "User-Agent": GatewayService.ROCKETGATE_USER_AGENT }
 
 #
-#	Create the HTTP handler and post our request.
+#	Take a connection from the pool, or create a new one, and
+#	post our request. If a pooled connection turns out to have
+#	been closed by the server before the request could be sent,
+#	the request never left, so send it on a new connection.
 #
+        connection = None
+        reused = 0				# Came from the pool
+        reusable = 0				# Can go back to the pool
         try:
-            connection = http.client.HTTPSConnection(serverName, urlPortNo, \
-                                                 timeout=connectTimeout)
-            connection.request("POST", urlServlet, requestXML, headers)
+            if (self.keepAlive):
+                connection, reused = GatewayPool.Take(serverName, \
+                                     urlPortNo, connectTimeout, self.sslContext)
+            else:
+                connection, reused = http.client.HTTPSConnection(serverName, \
+                                     urlPortNo, timeout=connectTimeout, \
+                                     context=self.sslContext), False
+            try:
+                connection.request("POST", urlServlet, requestXML, headers)
+            except (BrokenPipeError, ConnectionResetError):
+                if (not reused):		# Fresh connection failed?
+                    raise
+                connection.close()
+                connection = http.client.HTTPSConnection(serverName, \
+                             urlPortNo, timeout=connectTimeout, \
+                             context=self.sslContext)
+                connection.request("POST", urlServlet, requestXML, headers)
             connection.sock.settimeout(readTimeout)
 
 #
@@ -552,15 +724,18 @@ class GatewayService:
 #
             results = connection.getresponse()
             body = results.read()		# Get the response data
+            reusable = self.keepAlive and not results.will_close
 
 #
 #	If the response was not '200 OK', we must quit
 #
             if (results.status != 200):
                 response.Set(GatewayResponse.EXCEPTION, \
-                             str(results.status) + ": " + body)
+                             str(results.status) + ": " + \
+                             body.decode("utf-8", "replace"))
                 response.Set(GatewayResponse.RESPONSE_CODE, 3)
                 response.Set(GatewayResponse.REASON_CODE, 304)
+                GatewayPool.Failed(serverName)
                 return 3			# System error
 
 #
@@ -570,6 +745,8 @@ class GatewayService:
             response.Set(GatewayResponse.EXCEPTION, str(ex))
             response.Set(GatewayResponse.RESPONSE_CODE, 3)
             response.Set(GatewayResponse.REASON_CODE, 301)
+            reusable = 0			# Don't reuse it
+            GatewayPool.Failed(serverName)
             return 3				# System error
 
 #
@@ -579,8 +756,25 @@ class GatewayService:
             response.Set(GatewayResponse.EXCEPTION, str(ex))
             response.Set(GatewayResponse.RESPONSE_CODE, 3)
             response.Set(GatewayResponse.REASON_CODE, 303)
+            reusable = 0			# Don't reuse it
+            GatewayPool.Failed(serverName)
             return 3				# System error
  
+#
+#	If the server closed a pooled connection after the request
+#	went out, we can't know if it was processed, so it must not
+#	be sent again here. It's still an error, but the host is not
+#	counted as failing since the connection was ours.
+#
+        except http.client.RemoteDisconnected as ex:
+            response.Set(GatewayResponse.EXCEPTION, str(ex))
+            response.Set(GatewayResponse.RESPONSE_CODE, 3)
+            response.Set(GatewayResponse.REASON_CODE, 304)
+            reusable = 0			# Don't reuse it
+            if (not reused):
+                GatewayPool.Failed(serverName)
+            return 3				# System error
+
 #
 #	If there was some other type of socket problemm,
 #	return an error.
@@ -593,6 +787,8 @@ class GatewayService:
                 response.Set(GatewayResponse.REASON_CODE, 301)
             else:
                 response.Set(GatewayResponse.REASON_CODE, 304)
+            reusable = 0			# Don't reuse it
+            GatewayPool.Failed(serverName)
             return 3				# System error
 
 #
@@ -602,6 +798,8 @@ class GatewayService:
             response.Set(GatewayResponse.EXCEPTION, str(ex))
             response.Set(GatewayResponse.RESPONSE_CODE, 3)
             response.Set(GatewayResponse.REASON_CODE, 304)
+            reusable = 0			# Don't reuse it
+            GatewayPool.Failed(serverName)
             return 3				# System error
 
 #
@@ -611,13 +809,20 @@ class GatewayService:
             response.Set(GatewayResponse.EXCEPTION, "Unhandled POST exception")
             response.Set(GatewayResponse.RESPONSE_CODE, 3)
             response.Set(GatewayResponse.REASON_CODE, 304)
+            reusable = 0			# Don't reuse it
+            GatewayPool.Failed(serverName)
             return 3				# System error
 
 #
-#	Clean up the connection when we are all done.
+#	Give the connection back to the pool if the server will keep
+#	it open, else close it.
 #
         finally:
-            connection.close()			# Done with connection
+            if (connection != None):
+                if (reusable):
+                    GatewayPool.Give(serverName, urlPortNo, connection)
+                else:
+                    connection.close()		# Done with connection
             
 #
 #	Parse the response XML and return the response code.
@@ -629,6 +834,15 @@ class GatewayService:
             response.Set(GatewayResponse.EXCEPTION, body)
             response.Set(GatewayResponse.RESPONSE_CODE, 3)
             response.Set(GatewayResponse.REASON_CODE, 400) 
+
+#
+#	Track the health of the host, a system error means it
+#	couldn't handle the transaction.
+#
+        if (int(responseCode) == 3):
+            GatewayPool.Failed(serverName)
+        else:
+            GatewayPool.Succeeded(serverName)
         return int(responseCode)		# Give back results
 
 
@@ -660,14 +874,11 @@ class GatewayService:
         request.Clear(GatewayRequest.FAILED_GUID)
 
 #
-#	Randomly pick an endpoint.
+#	Order the endpoints, randomly among the healthy ones, with
+#	any that failed recently last.
 #
         if (len(serverList) > 1):		# Have multiples?
-            index = random.randint(0, len(serverList)-1)
-            if (index > 0):			# Want to change?
-                swapper = serverList[0]		# Save the first one
-                serverList[0] = serverList[index]
-                serverList[index] = swapper	# And swap
+            serverList = GatewayPool.Order(serverList)
 
 #
 #	Loop over the hosts and try to send the transaction
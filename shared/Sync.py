@@ -18,6 +18,32 @@ from RestOC import Conf, JSON
 # The redis instance
 _moRedis = None
 
+# The registered push script
+_moPush = None
+
+# How long, in seconds, session lists and key sets live without activity
+_TTL = 21600 # 6 hours
+
+# Lua script used to deliver messages to every session interested in a key, as
+#	well as publish them for websockets, in a single round trip. KEYS are the
+#	"service+key" sets, ARGV[1] is the TTL, and ARGV[2...] are the JSON
+#	messages, one for each key
+_PUSH_LUA = """
+local ttl = tonumber(ARGV[1])
+local total = 0
+for i, channel in ipairs(KEYS) do
+	local msg = ARGV[i + 1]
+	local sessions = redis.call('SMEMBERS', channel)
+	for _, session in ipairs(sessions) do
+		redis.call('LPUSH', session, msg)
+		redis.call('EXPIRE', session, ttl)
+	end
+	redis.call('PUBLISH', channel, msg)
+	total = total + #sessions
+end
+return total
+"""
+
 # init function
 def init():
 	"""Initialise
@@ -29,7 +55,7 @@ def init():
 	"""
 
 	# Import the redis instance
-	global _moRedis
+	global _moRedis, _moPush
 
 	# Get the config
 	dConf = Conf.get(('redis', 'sync'))
@@ -37,6 +63,9 @@ def init():
 	# Initialise the connection to Redis
 	_moRedis = StrictRedis(**dConf)
 
+	# Register the push script, redis will load it on first use
+	_moPush = _moRedis.register_script(_PUSH_LUA)
+
 # clear function
 def clear(auth, service, key, count):
 	"""Clear
@@ -66,6 +95,31 @@ def clear(auth, service, key, count):
 			oPipeline.rpop(sKey);
 		oPipeline.execute()
 
+# drain function
+def _drain(key):
+	"""Drain
+
+	Fetches and deletes every message in a session list in one transaction
+
+	Args:
+		key (str): The full key of the session list
+
+	Returns:
+		list
+	"""
+
+	# Fetch and delete the list together
+	p = _moRedis.pipeline()
+	p.lrange(key, 0, -1)
+	p.delete(key)
+	lRet = p.execute()[0]
+
+	# Reverse the list so the oldest message is first
+	lRet.reverse()
+
+	# Return the raw messages
+	return lRet
+
 # join function
 def join(auth, service, key):
 	"""Join
@@ -87,7 +141,7 @@ def join(auth, service, key):
 	# Add the key to the set and extend the ttl
 	p = _moRedis.pipeline()
 	p.sadd('%s%s' % (service, key), "%s-%s%s" % (auth, service, key))
-	p.expire(key, 21600)
+	p.expire(key, _TTL)
 	p.execute()
 
 # leave function
@@ -110,6 +164,56 @@ def leave(auth, service, key):
 	# Remove the key from the set
 	_moRedis.srem('%s%s' % (service, key), "%s-%s%s" % (auth, service, key))
 
+# poll function
+def poll(auth, service, key, timeout):
+	"""Poll
+
+	Long poll version of pull. Blocks until at least one message is in the sync
+	cache for the given authorization key and message list key, or the timeout
+	passes, then atomically removes and returns every message found. Messages
+	returned by poll are already cleared and must not be passed to clear
+
+	Args:
+		auth (str): The session authorization key
+		service (str): The name of the service using the sync
+		key (str): The unique key of the message list
+		timeout (uint): The max number of seconds to wait for messages
+
+	Returns:
+		list
+	"""
+
+	# Make sure the service and key are strings
+	if not isinstance(service, str): service = str(service)
+	if not isinstance(key, str): key = str(key)
+
+	# Generate the key name
+	sKey = '%s-%s%s' % (auth, service, key)
+
+	# Update the TTL on the session
+	bRes = _moRedis.expire('%s%s' % (service, key), _TTL)
+
+	# If the key doesn't even exist anymore
+	if not bRes:
+		return False
+
+	# Drain anything already waiting
+	lRet = _drain(sKey)
+
+	# If there's nothing, wait for the oldest message to arrive
+	if not lRet:
+		mRes = _moRedis.brpop(sKey, timeout)
+
+		# If we timed out, return an empty list
+		if not mRes:
+			return []
+
+		# Add the message, and anything that arrived with it
+		lRet = [mRes[1]] + _drain(sKey)
+
+	# Return the decoded messages
+	return [JSON.decode(s) for s in lRet]
+
 # pull function
 def pull(auth, service, key):
 	"""Pull
@@ -137,7 +241,7 @@ def pull(auth, service, key):
 	iLen = _moRedis.llen(sKey)
 
 	# Update the TTL on the session
-	bRes = _moRedis.expire('%s%s' % (service, key), 21600) # 6 hours
+	bRes = _moRedis.expire('%s%s' % (service, key), _TTL)
 
 	# If the key doesn't even exist anymore
 	if not bRes:
@@ -174,34 +278,52 @@ def push(service, key, data):
 		bool|string
 	"""
 
-	# Make sure the service and key are strings
-	if not isinstance(service, str): service = str(service)
-	if not isinstance(key, str): key = str(key)
+	# Push the single message as a batch of one
+	return push_many(service, [(key, data)])
+
+# push many function
+def push_many(service, messages):
+	"""Push Many
+
+	Called to push several messages to the sync cache at once. Every session
+	list is updated, TTLs refreshed, and messages published in one round trip
+	to redis
+
+	Args:
+		service (str): The name of the service using the sync
+		messages (list): A list of (key, data) tuples to be pushed, in order
 
-	# Generate the JSON
-	sJSON = JSON.encode({
-		"service": service,
-		"key": key,
-		"data": data
-	})
+	Returns:
+		bool
+	"""
+
+	# If there's nothing to push
+	if not messages:
+		return True
+
+	# Make sure the service is a string
+	if not isinstance(service, str): service = str(service)
 
-	# Check if anyone is interested in the key
-	lSessions = _moRedis.smembers("%s%s" % (service, key))
+	# Init the lists of keys and arguments for the script
+	lKeys = []
+	lArgs = [_TTL]
 
-	# If there are any sessions
-	if lSessions:
+	# Go through each message
+	for mKey, mData in messages:
 
-		# For each session found
-		for sSession in lSessions:
+		# Make sure the key is a string
+		if not isinstance(mKey, str): mKey = str(mKey)
 
-			# Add the message to its list
-			p = _moRedis.pipeline()
-			p.lpush(sSession, sJSON)
-			p.expire(sSession, 21600)
-			p.execute()
+		# Add the key and the JSON
+		lKeys.append('%s%s' % (service, mKey))
+		lArgs.append(JSON.encode({
+			"service": service,
+			"key": mKey,
+			"data": mData
+		}))
 
-	# Now publish the message for anyone using websockets
-	_moRedis.publish("%s%s" % (service, key), sJSON)
+	# Deliver and publish everything
+	_moPush(keys=lKeys, args=lArgs)
 
 	# Return OK
 	return True
@@ -0,0 +1,97 @@
+# coding=utf8
+"""Cron Startup
+
+Compares the cost of starting a cron the old way, a fresh `python -m crons`
+process per run, with dispatching it from the resident scheduler. A no-op
+job is used so only the overhead is measured
+
+	python -m tools.cron_startup [runs]
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import platform
+import subprocess
+import sys
+import types
+from time import perf_counter
+
+# Pip imports
+from RestOC import Conf, Record_Base, Record_MySQL, REST, Services, Templates
+
+def report(label, times):
+	"""Report
+
+	Prints the average and max of the times in milliseconds
+
+	Arguments:
+		label (str): The name of the measurement
+		times (float[]): The seconds each run took
+
+	Returns:
+		None
+	"""
+	print('%s: avg %.3fms, max %.3fms over %d runs' % (
+		label,
+		(sum(times) / len(times)) * 1000.0,
+		max(times) * 1000.0,
+		len(times)
+	))
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Get the number of runs
+	iRuns = len(sys.argv) > 1 and int(sys.argv[1]) or 10
+
+	# Time a fresh process per run, the cron name is invalid so the process
+	#	exits right after everything in crons/__main__.py has been loaded
+	lTimes = []
+	for i in range(iRuns):
+		fStart = perf_counter()
+		subprocess.run(
+			[sys.executable, '-m', 'crons', '__startup__'],
+			stdout=subprocess.DEVNULL,
+			stderr=subprocess.DEVNULL
+		)
+		lTimes.append(perf_counter() - fStart)
+	report('New process', lTimes)
+
+	# Do the same loading crons/__main__.py does, once
+	fStart = perf_counter()
+	Conf.load('config.json')
+	sConfOverride = 'config.%s.json' % platform.node()
+	if os.path.isfile(sConfOverride):
+		Conf.load_merge(sConfOverride)
+	Record_Base.dbPrepend(Conf.get(("mysql", "prepend"), ''))
+	Record_MySQL.addHost('primary', Conf.get(("mysql", "hosts", "primary")))
+	Record_MySQL.addHost('monolith', Conf.get(("mysql", "hosts", "monolith")))
+	Services.register(
+		{k:None for k in Conf.get(('rest', 'services'))},
+		REST.Config(Conf.get("rest")),
+		Conf.get(('services', 'salt'))
+	)
+	Templates.init('templates')
+	report('Scheduler startup (once)', [perf_counter() - fStart])
+
+	# Time dispatching a no-op job from the scheduler
+	from crons import scheduler
+	oJob = types.SimpleNamespace(
+		name='__startup__',
+		args=[],
+		running=False,
+		module=types.SimpleNamespace(run=lambda: True)
+	)
+	lTimes = []
+	for i in range(iRuns):
+		fStart = perf_counter()
+		scheduler.dispatch(oJob)
+		lTimes.append(perf_counter() - fStart)
+	report('Scheduler dispatch', lTimes)
@@ -0,0 +1,174 @@
+# coding=utf8
+"""Konnektive Fake
+
+A local stand in for the Konnektive API that returns pages of generated
+records with a fixed latency, used to benchmark Konnektive._requestIter
+offline
+
+	python -m tools.konnektive_fake [results] [latency_ms] [workers]
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+from time import sleep, time
+import urllib.parse
+
+class FakeHandler(BaseHTTPRequestHandler):
+	"""Fake Handler
+
+	Answers every POST with a page of generated records
+	"""
+
+	results = 1000
+	"""The total number of records to pretend exist"""
+
+	latency = 0.2
+	"""The number of seconds to wait before answering"""
+
+	def do_POST(self):
+		"""Do POST
+
+		Generates the requested page
+
+		Returns:
+			None
+		"""
+
+		# Get the query
+		dQuery = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+		iPage = int(dQuery.get('page', 1))
+		iPer = int(dQuery.get('resultsPerPage', 200))
+
+		# Generate the records for the page
+		lData = [{
+			"customerId": i,
+			"orderId": 'FAKE%08d' % i,
+			"campaignName": 'Fake Campaign',
+			"txnType": dQuery.get('txnType', 'SALE')
+		} for i in range((iPage - 1) * iPer, min(iPage * iPer, self.results))]
+
+		# Wait like the real thing would
+		sleep(self.latency)
+
+		# Send the page
+		sBody = json.dumps(lData and {
+			"result": 'SUCCESS',
+			"message": {
+				"totalResults": self.results,
+				"resultsPerPage": iPer,
+				"page": str(iPage),
+				"data": lData
+			}
+		} or {
+			"result": 'ERROR',
+			"message": 'No results'
+		}).encode('utf-8')
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(sBody)))
+		self.end_headers()
+		self.wfile.write(sBody)
+
+	def log_message(self, format, *args):
+		"""Log Message
+
+		Silences the default request logging
+		"""
+		pass
+
+def start(results=1000, latency=0.2):
+	"""Start
+
+	Starts the fake server on a random local port in a background thread
+
+	Arguments:
+		results (uint): The total number of records to pretend exist
+		latency (float): The seconds to wait before answering each request
+
+	Returns:
+		ThreadingHTTPServer
+	"""
+
+	# Set the handler options
+	FakeHandler.results = results
+	FakeHandler.latency = latency
+
+	# Create the server and run it
+	oServer = ThreadingHTTPServer(('127.0.0.1', 0), FakeHandler)
+	oThread = threading.Thread(target=oServer.serve_forever)
+	oThread.daemon = True
+	oThread.start()
+
+	# Return the server
+	return oServer
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Pip imports
+	from RestOC import Conf
+
+	# Service imports
+	from services.konnektive import Konnektive
+
+	# Get the arguments
+	iResults = len(sys.argv) > 1 and int(sys.argv[1]) or 5000
+	fLatency = (len(sys.argv) > 2 and int(sys.argv[2]) or 200) / 1000.0
+	iWorkers = len(sys.argv) > 3 and int(sys.argv[3]) or 4
+
+	# Start the fake server
+	oServer = start(iResults, fLatency)
+
+	# Load the config
+	Conf.load('config.json')
+	sConfOverride = 'config.%s.json' % platform.node()
+	if os.path.isfile(sConfOverride):
+		Conf.load_merge(sConfOverride)
+
+	# Go through sequential and concurrent
+	for iPool in [1, iWorkers]:
+
+		# Point Konnektive at the fake server
+		with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as oF:
+			json.dump({"konnektive": {
+				"host": '127.0.0.1:%d' % oServer.server_port,
+				"protocol": 'http',
+				"workers": iPool
+			}}, oF)
+		Conf.load_merge(oF.name)
+		os.unlink(oF.name)
+
+		# Create and init the service
+		oKnk = Konnektive()
+		oKnk.initialise()
+
+		# Time the first record and all the records
+		fStart = time()
+		fFirst = None
+		iCount = 0
+		for d in oKnk._requestIter('transactions/query', {}):
+			if fFirst is None:
+				fFirst = time() - fStart
+			iCount += 1
+		fTotal = time() - fStart
+
+		# Print the results
+		print('%d workers: %d records, first after %.3fs, all after %.3fs' % (
+			oKnk._workers, iCount, fFirst or 0, fTotal
+		))
+
+	# Stop the server
+	oServer.shutdown()
@@ -0,0 +1,149 @@
+# coding=utf8
+"""Link Load
+
+Drives the link node's bottle app in process and reports redirect latency
+and throughput using the code cache, and, if a real code is passed, going
+through the link service as every request used to
+
+	python -m tools.link_load [requests] [codes] [real code]
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import platform
+import sys
+from time import perf_counter
+from wsgiref.util import setup_testing_defaults
+
+# Pip imports
+import bottle
+from redis import StrictRedis
+from RestOC import Conf, JSON, REST, Services
+
+# Node imports
+from nodes import link
+
+def drive(codes, requests):
+	"""Drive
+
+	Sends the given number of requests through the bottle app, cycling through
+	the codes, and returns the sorted milliseconds of each request
+
+	Arguments:
+		codes (str[]): The codes to request
+		requests (uint): The number of requests to make
+
+	Returns:
+		float[]
+	"""
+
+	# Get the app
+	oApp = bottle.default_app()
+
+	# Status is only needed to make sure we're redirecting
+	lStatus = []
+	def startResponse(status, headers, exc_info=None):
+		lStatus.append(status)
+
+	# Make each request
+	lTimes = []
+	for i in range(requests):
+		dEnviron = {
+			"PATH_INFO": '/%s' % codes[i % len(codes)],
+			"REMOTE_ADDR": '127.0.0.1',
+			"HTTP_USER_AGENT": 'link_load'
+		}
+		setup_testing_defaults(dEnviron)
+		fStart = perf_counter()
+		b''.join(oApp(dEnviron, startResponse))
+		lTimes.append((perf_counter() - fStart) * 1000.0)
+
+	# If anything didn't redirect
+	lFailed = [s for s in lStatus if not s.startswith('30')]
+	if lFailed:
+		print('%d requests did not redirect, first: %s' % (len(lFailed), lFailed[0]))
+
+	# Return the times
+	lTimes.sort()
+	return lTimes
+
+def report(label, times):
+	"""Report
+
+	Prints the throughput and latency of a run
+
+	Arguments:
+		label (str): The name of the run
+		times (float[]): The sorted milliseconds of each request
+
+	Returns:
+		None
+	"""
+	print('%s: %d requests, %.0f req/s, p50 %.3fms, p99 %.3fms' % (
+		label,
+		len(times),
+		len(times) / (sum(times) / 1000.0),
+		times[len(times) // 2],
+		times[int(len(times) * 0.99)]
+	))
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Get the arguments
+	iRequests = len(sys.argv) > 1 and int(sys.argv[1]) or 10000
+	iCodes = len(sys.argv) > 2 and int(sys.argv[2]) or 100
+	sReal = len(sys.argv) > 3 and sys.argv[3] or None
+
+	# Load the config
+	Conf.load('config.json')
+	sConfOverride = 'config.%s.json' % platform.node()
+	if os.path.isfile(sConfOverride):
+		Conf.load_merge(sConfOverride)
+
+	# Register all services
+	Services.register(
+		{k:None for k in Conf.get(('rest', 'services'))},
+		REST.Config(Conf.get("rest")),
+		Conf.get(('services', 'salt'))
+	)
+
+	# Connect to Redis
+	oRedis = StrictRedis(**Conf.get(('redis', 'primary'), {
+		"host": "localhost",
+		"port": 6379,
+		"db": 0
+	}))
+
+	# Add the fake codes to the cache and note where the buffer ends
+	lCodes = ['bench%d' % i for i in range(iCodes)]
+	for s in lCodes:
+		oRedis.set('link:code:%s' % s, JSON.encode({
+			"_id": s,
+			"url": 'https://localhost/%s' % s
+		}), ex=3600)
+	iBuffer = oRedis.llen('link:views')
+
+	# Run against the cache
+	link._moRedis = oRedis
+	report('Cached', drive(lCodes, iRequests))
+
+	# Remove the fake views from the buffer and the fake codes from the cache
+	if iBuffer:
+		oRedis.ltrim('link:views', 0, iBuffer - 1)
+	else:
+		oRedis.delete('link:views')
+	oRedis.delete(*['link:code:%s' % s for s in lCodes])
+
+	# If we have a real code, run it through the service, fewer times as each
+	#	one is stored in the DB
+	if sReal:
+		link._moRedis = None
+		report('Service', drive([sReal], max(iRequests // 100, 10)))
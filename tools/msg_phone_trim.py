@@ -0,0 +1,235 @@
+# coding=utf8
+"""Message Phone Trim
+
+Trims the lastMsg of existing conversation summaries down to
+CustomerMsgPhone.PREVIEW characters, and measures row sizes and the latency
+of adding a message before and after
+
+	python -m tools.msg_phone_trim stats
+	python -m tools.msg_phone_trim trim [batch]
+	python -m tools.msg_phone_trim latency [size] [writes]
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os, platform, sys
+from time import perf_counter
+
+# Pip imports
+import arrow
+from RestOC import Conf, Record_Base, Record_MySQL
+
+# Record imports
+from records.monolith import CustomerMsgPhone
+
+_PHONE = '0000000000'
+"""The phone number used for the latency summary"""
+
+def stats():
+	"""Stats
+
+	Prints the number of summaries and the size of their lastMsg
+
+	Returns:
+		None
+	"""
+
+	# Fetch the record structure
+	dStruct = CustomerMsgPhone.struct()
+
+	# Get the sizes
+	dStats = Record_MySQL.Commands.select(
+		dStruct['host'],
+		"SELECT\n" \
+		"	COUNT(*) AS `rows`,\n" \
+		"	IFNULL(AVG(LENGTH(`lastMsg`)), 0) AS `avg`,\n" \
+		"	IFNULL(MAX(LENGTH(`lastMsg`)), 0) AS `max`,\n" \
+		"	IFNULL(SUM(LENGTH(`lastMsg`)), 0) AS `total`,\n" \
+		"	SUM(CHAR_LENGTH(`lastMsg`) > %(preview)d) AS `over`\n" \
+		"FROM `%(db)s`.`%(table)s`" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"preview": CustomerMsgPhone.PREVIEW
+		},
+		Record_MySQL.ESelect.ROW
+	)
+
+	# Print them
+	print('%d rows, lastMsg avg %d bytes, max %d bytes, total %.1f MB, %d over %d characters' % (
+		dStats['rows'], dStats['avg'], dStats['max'],
+		int(dStats['total']) / 1048576.0,
+		dStats['over'] or 0, CustomerMsgPhone.PREVIEW
+	))
+
+def trim(batch):
+	"""Trim
+
+	Trims every lastMsg longer than the preview, batch IDs at a time so no
+	single statement locks the table for long
+
+	Arguments:
+		batch (uint): The number of IDs to update at once
+
+	Returns:
+		None
+	"""
+
+	# Fetch the record structure
+	dStruct = CustomerMsgPhone.struct()
+
+	# Get the last ID
+	iMax = Record_MySQL.Commands.select(
+		dStruct['host'],
+		"SELECT IFNULL(MAX(`id`), 0) FROM `%(db)s`.`%(table)s`" % {
+			"db": dStruct['db'],
+			"table": dStruct['table']
+		},
+		Record_MySQL.ESelect.CELL
+	)
+
+	# Go through each batch
+	iTrimmed = 0
+	for i in range(0, iMax, batch):
+		iTrimmed += Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"UPDATE `%(db)s`.`%(table)s`\n" \
+			"SET `lastMsg` = LEFT(`lastMsg`, %(preview)d)\n" \
+			"WHERE `id` > %(start)d AND `id` <= %(end)d\n" \
+			"AND CHAR_LENGTH(`lastMsg`) > %(preview)d" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"preview": CustomerMsgPhone.PREVIEW,
+				"start": i,
+				"end": i + batch
+			}
+		)
+
+	# Print the result
+	print('Trimmed %d rows' % iTrimmed)
+
+def latency(size, writes):
+	"""Latency
+
+	Creates a summary with a lastMsg of the given size, then times adding
+	messages the old way, prepending to the whole text, and the new way,
+	keeping only the preview. The summary is deleted after
+
+	Arguments:
+		size (uint): The characters in the starting lastMsg
+		writes (uint): The number of messages to add each way
+
+	Returns:
+		None
+	"""
+
+	# Fetch the record structure
+	dStruct = CustomerMsgPhone.struct()
+
+	# Generate the message added each time
+	sMsg = '\n--------\nReceived at %s\n%s\n' % (
+		arrow.get().format('YYYY-MM-DD HH:mm:ss'),
+		'Benchmark message'
+	)
+
+	# Go through the old way and the new way
+	for sLabel in ['Unbounded', 'Bounded']:
+
+		# Create the summary
+		sDT = arrow.get().format('YYYY-MM-DD HH:mm:ss')
+		oSummary = CustomerMsgPhone({
+			"customerPhone": _PHONE,
+			"customerName": 'Benchmark',
+			"lastMsg": 'x' * size,
+			"lastMsgDir": 'Incoming',
+			"lastMsgAt": sDT,
+			"hiddenFlag": 'Y',
+			"totalIncoming": 0,
+			"totalOutGoing": 0,
+			"createdAt": sDT,
+			"updatedAt": sDT
+		})
+		oSummary.create()
+
+		# Add the messages
+		fStart = perf_counter()
+		for i in range(writes):
+			if sLabel == 'Bounded':
+				CustomerMsgPhone.add(CustomerMsgPhone.INCOMING, _PHONE, sMsg)
+			else:
+				Record_MySQL.Commands.execute(
+					dStruct['host'],
+					"UPDATE `%(db)s`.`%(table)s` SET\n" \
+					"	`totalIncoming` = `totalIncoming` + 1,\n" \
+					"	`lastMsg` = CONCAT('%(message)s', IFNULL(`lastMsg`, ''))\n" \
+					"WHERE `customerPhone` = '%(phone)s'" % {
+						"db": dStruct['db'],
+						"table": dStruct['table'],
+						"message": Record_MySQL.Commands.escape(dStruct['host'], sMsg),
+						"phone": _PHONE
+					}
+				)
+		fTotal = perf_counter() - fStart
+
+		# Get the final size
+		iSize = Record_MySQL.Commands.select(
+			dStruct['host'],
+			"SELECT LENGTH(`lastMsg`) FROM `%(db)s`.`%(table)s` " \
+			"WHERE `customerPhone` = '%(phone)s'" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"phone": _PHONE
+			},
+			Record_MySQL.ESelect.CELL
+		)
+
+		# Delete the summary
+		oSummary.delete()
+
+		# Print the results
+		print('%s: %.3fms per write, lastMsg ended at %d bytes' % (
+			sLabel, (fTotal / writes) * 1000.0, iSize
+		))
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Get the command
+	sCommand = len(sys.argv) > 1 and sys.argv[1] or 'stats'
+
+	# Load the config
+	Conf.load('config.json')
+	sConfOverride = 'config.%s.json' % platform.node()
+	if os.path.isfile(sConfOverride):
+		Conf.load_merge(sConfOverride)
+
+	# Add hosts
+	Record_Base.dbPrepend(Conf.get(("mysql", "prepend"), ''))
+	Record_MySQL.addHost('monolith', Conf.get(("mysql", "hosts", "monolith")))
+
+	# Print the sizes
+	if sCommand == 'stats':
+		stats()
+
+	# Trim the rows, printing the sizes before and after
+	elif sCommand == 'trim':
+		stats()
+		trim(len(sys.argv) > 2 and int(sys.argv[2]) or 1000)
+		stats()
+
+	# Compare the latency of adding messages
+	elif sCommand == 'latency':
+		latency(
+			len(sys.argv) > 2 and int(sys.argv[2]) or 100000,
+			len(sys.argv) > 3 and int(sys.argv[3]) or 100
+		)
+
+	# Else, invalid command
+	else:
+		print('Invalid command: %s' % sCommand)
+		sys.exit(1)
@@ -0,0 +1,200 @@
+# coding=utf8
+"""Provider Hours
+
+Fills a synthetic tracking table, in its own `_bench` DB, and compares the
+time it takes to calculate the hours report the old way, reading every
+tracking record into Python, with the SQL aggregation over the daily totals.
+The DB is dropped after
+
+	python -m tools.provider_hours [providers] [days] [per_day]
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import platform
+import random
+import sys
+from time import perf_counter, time
+import uuid
+
+# Pip imports
+from RestOC import Conf, Record_Base, Record_MySQL
+
+# Record imports
+from records.providers import Tracking, TrackingDaily
+
+_CUSTOM = {"append": 'bench'}
+"""Puts the tables in their own DB"""
+
+def fill(providers, days, per_day):
+	"""Fill
+
+	Creates the synthetic DB and tables and fills them with a signin per
+	provider per day, and per_day viewed or sms records
+
+	Arguments:
+		providers (uint): The number of providers
+		days (uint): The number of days, ending yesterday
+		per_day (uint): The number of records per provider per day
+
+	Returns:
+		list, the start and end timestamps of the records
+	"""
+
+	# Create the DB and tables
+	dStruct = Tracking.struct(_CUSTOM)
+	Record_MySQL.Commands.execute(
+		dStruct['host'],
+		'CREATE DATABASE IF NOT EXISTS `%s`' % dStruct['db']
+	)
+	Tracking.tableCreate(_CUSTOM)
+	TrackingDaily.tableCreate(_CUSTOM)
+
+	# Go through each day
+	iStart = (int(time()) // 86400 - days) * 86400
+	for iDay in range(days):
+		iDayTS = iStart + (iDay * 86400)
+
+		# Generate the records for each provider
+		lRecords = []
+		for iProvider in range(1, providers + 1):
+			sSesh = uuid.uuid4().hex
+			iSignin = iDayTS + random.randint(0, 3600)
+			lRecords.append(Tracking({
+				"memo_id": iProvider,
+				"action": 'signin',
+				"action_sesh": sSesh,
+				"action_ts": iSignin,
+				"resolution": 'signout',
+				"resolution_sesh": sSesh,
+				"resolution_ts": iSignin + random.randint(3600, 28800)
+			}, _CUSTOM))
+			for i in range(per_day):
+				iTS = iDayTS + random.randint(0, 86399)
+				if random.random() < 0.1:
+					lRecords.append(Tracking({
+						"memo_id": iProvider,
+						"action": 'sms',
+						"action_sesh": sSesh,
+						"action_ts": iTS,
+						"crm_type": 'knk',
+						"crm_id": str(random.randint(1, 100000))
+					}, _CUSTOM))
+				else:
+					lRecords.append(Tracking({
+						"memo_id": iProvider,
+						"action": 'viewed',
+						"action_sesh": sSesh,
+						"action_ts": iTS,
+						"resolution": random.choice(['approved', 'declined', 'transferred']),
+						"resolution_sesh": sSesh,
+						"resolution_ts": iTS + random.randint(30, 900),
+						"crm_type": 'knk',
+						"crm_id": str(random.randint(1, 100000))
+					}, _CUSTOM))
+
+		# Store the day
+		for i in range(0, len(lRecords), 1000):
+			Tracking.createMany(lRecords[i:i+1000], custom=_CUSTOM)
+
+	# Calculate the daily totals
+	TrackingDaily.rebuild(_CUSTOM)
+
+	# Return the range
+	return [iStart, iStart + (days * 86400) - 1]
+
+def old(start, end):
+	"""Old
+
+	Calculates the totals the way hours_read used to
+
+	Arguments:
+		start (uint): The start timestamp
+		end (uint): The end timestamp
+
+	Returns:
+		dict
+	"""
+
+	# Go through each record
+	dProviders = {}
+	for d in Tracking.range(start, end, custom=_CUSTOM):
+		if d['memo_id'] not in dProviders:
+			dProviders[d['memo_id']] = {"seconds": 0, "approvals": 0, "declines": 0}
+		if d['action'] == 'signin':
+			dProviders[d['memo_id']]['seconds'] += (d['resolution_ts'] - d['action_ts'])
+		elif d['action'] == 'viewed':
+			if d['resolution'] == 'approved':
+				dProviders[d['memo_id']]['approvals'] += 1
+			elif d['resolution'] == 'declined':
+				dProviders[d['memo_id']]['declines'] += 1
+
+	# Return the totals
+	return dProviders
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Get the arguments
+	iProviders = len(sys.argv) > 1 and int(sys.argv[1]) or 50
+	iDays = len(sys.argv) > 2 and int(sys.argv[2]) or 90
+	iPerDay = len(sys.argv) > 3 and int(sys.argv[3]) or 50
+
+	# Load the config
+	Conf.load('config.json')
+	sConfOverride = 'config.%s.json' % platform.node()
+	if os.path.isfile(sConfOverride):
+		Conf.load_merge(sConfOverride)
+
+	# Add hosts
+	Record_Base.dbPrepend(Conf.get(("mysql", "prepend"), ''))
+	Record_MySQL.addHost('primary', Conf.get(("mysql", "hosts", "primary")))
+
+	try:
+
+		# Fill the tables
+		fStart = perf_counter()
+		iStart, iEnd = fill(iProviders, iDays, iPerDay)
+		print('Filled %d days for %d providers in %.1fs' % (
+			iDays, iProviders, perf_counter() - fStart
+		))
+
+		# Compare a week, a month, and the whole range, starting mid day
+		for iRange in [7, 30, iDays]:
+			iFrom = iEnd - (iRange * 86400) + 43200
+
+			# Time the old way
+			fStart = perf_counter()
+			dOld = old(iFrom, iEnd)
+			fOld = perf_counter() - fStart
+
+			# Time the new way
+			fStart = perf_counter()
+			dNew = {
+				d['memo_id']: {
+					"seconds": d['seconds'],
+					"approvals": d['approvals'],
+					"declines": d['declines']
+				} for d in TrackingDaily.hours(iFrom, iEnd, _CUSTOM)
+			}
+			fNew = perf_counter() - fStart
+
+			# Print the results
+			print('%d days: old %.3fs, new %.3fs, %s' % (
+				iRange, fOld, fNew, dOld == dNew and 'same totals' or 'TOTALS DIFFER'
+			))
+
+	# Drop the DB
+	finally:
+		dStruct = Tracking.struct(_CUSTOM)
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			'DROP DATABASE IF EXISTS `%s`' % dStruct['db']
+		)
@@ -0,0 +1,91 @@
+# coding=utf8
+"""Rights Cache
+
+Benchmarks shared.Rights.check with and without the local permissions cache,
+using a temporary session for the given user. The auth service must be
+running
+
+	python -m tools.rights_cache [user_id] [permission] [iterations]
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import sys
+from time import perf_counter, sleep
+
+# Pip imports
+from RestOC import Sesh
+
+# Shared imports
+from shared import Rights
+
+# Node imports
+from nodes.rest import init
+
+def timeIt(sesh, name, iterations):
+	"""Time It
+
+	Calls Rights.checkReturn the given number of times and returns the
+	average, and 99th percentile, milliseconds per call
+
+	Arguments:
+		sesh (RestOC.Sesh._Session): The session to check with
+		name (str): The permission to check
+		iterations (uint): The number of times to call it
+
+	Returns:
+		tuple
+	"""
+	lTimes = []
+	for i in range(iterations):
+		fStart = perf_counter()
+		Rights.checkReturn(sesh, name, Rights.READ)
+		lTimes.append((perf_counter() - fStart) * 1000.0)
+	lTimes.sort()
+	return (
+		sum(lTimes) / iterations,
+		lTimes[int(iterations * 0.99)]
+	)
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Get the arguments
+	sUser = len(sys.argv) > 1 and sys.argv[1] or None
+	sName = len(sys.argv) > 2 and sys.argv[2] or 'customers'
+	iIterations = len(sys.argv) > 3 and int(sys.argv[3]) or 1000
+	if not sUser:
+		print('A user ID is required')
+		sys.exit(1)
+
+	# Init the config, sessions, and services
+	init()
+
+	# Create a temporary session for the user
+	oSesh = Sesh.create()
+	oSesh['user_id'] = sUser
+	oSesh.save()
+
+	# Without the cache, mark the process as started with nothing to use
+	Rights._miPid = os.getpid()
+	Rights._moRedis = None
+	fAvg, fP99 = timeIt(oSesh, sName, iIterations)
+	print('Without cache: avg %.3fms, p99 %.3fms' % (fAvg, fP99))
+
+	# With the cache, let the first call start it, then give the subscriber
+	#	a moment to connect
+	Rights._miPid = None
+	Rights.checkReturn(oSesh, sName, Rights.READ)
+	sleep(0.5)
+	fAvg, fP99 = timeIt(oSesh, sName, iIterations)
+	print('With cache:    avg %.3fms, p99 %.3fms' % (fAvg, fP99))
+
+	# Delete the session
+	oSesh.close()
@@ -0,0 +1,272 @@
+# coding=utf8
+"""RocketGate Fake
+
+A local HTTPS stand in for the RocketGate gateway, with a self signed
+certificate and a fixed latency, used to benchmark the auth, sale, credit,
+and void flows of the payment service with and without pooled keep-alive
+connections, and the SAX and expat response parsers
+
+	python -m tools.rocketgate_fake [flows] [latency_ms]
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+from time import perf_counter, sleep
+import xml.sax
+
+# Shared imports
+from shared.RocketGate import GatewayPool, GatewayRequest, GatewayResponse, \
+	GatewayService
+
+_mGUIDs = itertools.count(0x100000000000000)
+"""Generates unique transaction IDs, starting on site 1"""
+
+class FakeHandler(BaseHTTPRequestHandler):
+	"""Fake Handler
+
+	Approves every transaction it's sent
+	"""
+
+	protocol_version = 'HTTP/1.1'
+	"""Keep connections open between requests"""
+
+	disable_nagle_algorithm = True
+	"""Send the headers and body without waiting for an ACK"""
+
+	latency = 0.05
+	"""The number of seconds to wait before answering"""
+
+	def do_POST(self):
+		"""Do POST
+
+		Reads the request and answers with an approval
+
+		Returns:
+			None
+		"""
+
+		# Read and parse the request
+		oRequest = GatewayResponse()
+		oRequest.SetFromXML(self.rfile.read(int(self.headers['Content-Length'])))
+
+		# Wait like the real thing would
+		sleep(self.latency)
+
+		# Generate the response
+		oResponse = GatewayRequest()
+		oResponse.parameterList = {
+			"version": GatewayRequest.VERSION_NUMBER,
+			"responseCode": '0',
+			"reasonCode": '0',
+			"guidNo": '%X' % next(_mGUIDs),
+			"authNo": '123456',
+			"cardHash": 'FAKEHASH',
+			"cardLastFour": '1111',
+			"approvedAmount": oRequest.Get('amount') or '0.00',
+			"approvedCurrency": 'USD',
+			"merchantAccount": '1'
+		}
+		sBody = oResponse.ToXML().replace('gatewayRequest', 'gatewayResponse').encode('utf-8')
+
+		# Send it
+		self.send_response(200)
+		self.send_header('Content-Type', 'text/xml')
+		self.send_header('Content-Length', str(len(sBody)))
+		self.end_headers()
+		self.wfile.write(sBody)
+
+	def log_message(self, format, *args):
+		"""Log Message
+
+		Silences the default request logging
+		"""
+		pass
+
+def start(latency=0.05):
+	"""Start
+
+	Generates a self signed certificate for 127.0.0.1 and starts the fake
+	gateway on a random local port in a background thread
+
+	Arguments:
+		latency (float): The seconds to wait before answering each request
+
+	Returns:
+		tuple: the server, and an SSL context that trusts its certificate
+	"""
+
+	# Set the handler options
+	FakeHandler.latency = latency
+
+	# Generate the certificate
+	sDir = tempfile.mkdtemp()
+	sCert = os.path.join(sDir, 'cert.pem')
+	sKey = os.path.join(sDir, 'key.pem')
+	subprocess.run([
+		'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+		'-keyout', sKey, '-out', sCert, '-days', '1',
+		'-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1'
+	], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+	# Create the server and wrap it in TLS
+	oServer = ThreadingHTTPServer(('127.0.0.1', 0), FakeHandler)
+	oContext = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+	oContext.load_cert_chain(sCert, sKey)
+	oServer.socket = oContext.wrap_socket(oServer.socket, server_side=True)
+
+	# Run it
+	oThread = threading.Thread(target=oServer.serve_forever)
+	oThread.daemon = True
+	oThread.start()
+
+	# Return the server and a client context that trusts it
+	return oServer, ssl.create_default_context(cafile=sCert)
+
+def flow(port, context, keep_alive):
+	"""Flow
+
+	Runs the transactions the payment service makes for a single customer,
+	an auth with its confirmation, a purchase with its confirmation, a credit,
+	and a void, and returns the seconds each took
+
+	Arguments:
+		port (uint): The port of the fake gateway
+		context (ssl.SSLContext): The context that trusts the fake gateway
+		keep_alive (bool): Whether to reuse pooled connections
+
+	Returns:
+		dict
+	"""
+
+	# Create the service the same way the payment service does
+	oService = GatewayService()
+	oService.SetTestMode(1)
+	oService.SetKeepAlive(keep_alive)
+	oService.SetSSLContext(context)
+
+	# Generates a request pointed at the fake gateway
+	def request():
+		oRequest = GatewayRequest()
+		oRequest.Set('gatewayServer', '127.0.0.1')
+		oRequest.Set('portNo', port)
+		oRequest.Set(GatewayRequest.MERCHANT_ID, '1')
+		oRequest.Set(GatewayRequest.MERCHANT_PASSWORD, 'testpassword')
+		oRequest.Set(GatewayRequest.MERCHANT_CUSTOMER_ID, 'bench')
+		oRequest.Set(GatewayRequest.CARD_HASH, 'FAKEHASH')
+		oRequest.Set(GatewayRequest.AMOUNT, '1.00')
+		return oRequest
+
+	# Run each transaction
+	dTimes = {}
+	for sName, fAction in [
+		('auth', oService.PerformAuthOnly),
+		('purchase', oService.PerformPurchase),
+		('credit', oService.PerformCredit),
+		('void', oService.PerformVoid)
+	]:
+		oRequest = request()
+		if sName in ['credit', 'void']:
+			oRequest.Set(GatewayRequest.REFERENCE_GUID, '%X' % next(_mGUIDs))
+		oResponse = GatewayResponse()
+		fStart = perf_counter()
+		if not fAction(oRequest, oResponse):
+			raise RuntimeError('%s failed: %s' % (sName, str(oResponse.parameterList)))
+		dTimes[sName] = perf_counter() - fStart
+
+	# Return the times
+	return dTimes
+
+def report(label, times):
+	"""Report
+
+	Prints the average and 95th percentile of each transaction in
+	milliseconds
+
+	Arguments:
+		label (str): The name of the run
+		times (dict[]): The seconds of each transaction per flow
+
+	Returns:
+		None
+	"""
+	print(label)
+	for sName in times[0]:
+		lTimes = sorted([d[sName] for d in times])
+		print('\t%s: avg %.2fms, p95 %.2fms' % (
+			sName,
+			(sum(lTimes) / len(lTimes)) * 1000.0,
+			lTimes[int(len(lTimes) * 0.95) - 1] * 1000.0
+		))
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Get the arguments
+	iFlows = len(sys.argv) > 1 and int(sys.argv[1]) or 50
+	fLatency = (len(sys.argv) > 2 and int(sys.argv[2]) or 5) / 1000.0
+
+	# Start the fake gateway
+	oServer, oContext = start(fLatency)
+	iPort = oServer.server_port
+
+	# Run the flows with a new connection per transaction, then pooled
+	report('New connection per transaction', [
+		flow(iPort, oContext, False) for i in range(iFlows)
+	])
+	report('Pooled keep-alive connections', [
+		flow(iPort, oContext, True) for i in range(iFlows)
+	])
+	GatewayPool.Clear()
+
+	# Generate a typical response
+	oResponse = GatewayRequest()
+	oResponse.parameterList = {s: '0123456789' for s in [
+		'version', 'responseCode', 'reasonCode', 'guidNo', 'authNo',
+		'cardHash', 'cardLastFour', 'cardExpiration', 'cardType',
+		'avsResponse', 'cvv2Code', 'approvedAmount', 'approvedCurrency',
+		'merchantAccount', 'scrubResults', 'payType'
+	]}
+	bXML = oResponse.ToXML().replace('gatewayRequest', 'gatewayResponse').encode('utf-8')
+
+	# Compare the SAX parser with expat
+	iParses = 10000
+	oParsed = GatewayResponse()
+	fStart = perf_counter()
+	for i in range(iParses):
+		oParsed.haveOpenTag = 0
+		oParsed.valueBuffer = ''
+		xml.sax.parseString(bXML, oParsed)
+	fSAX = perf_counter() - fStart
+	dSAX = dict(oParsed.parameterList)
+	fStart = perf_counter()
+	for i in range(iParses):
+		oParsed.SetFromXML(bXML)
+	fExpat = perf_counter() - fStart
+	print('Parse response: SAX %.1fus, expat %.1fus, %s' % (
+		(fSAX / iParses) * 1000000.0,
+		(fExpat / iParses) * 1000000.0,
+		dSAX == oParsed.parameterList and 'same values' or 'VALUES DIFFER'
+	))
+
+	# Time building requests
+	fStart = perf_counter()
+	for i in range(iParses):
+		oResponse.ToXML()
+	print('Build request: %.1fus' % (((perf_counter() - fStart) / iParses) * 1000000.0))
+
+	# Stop the fake gateway
+	oServer.shutdown()
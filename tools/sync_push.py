@@ -0,0 +1,115 @@
+# coding=utf8
+"""Sync Push
+
+Benchmarks the latency of shared.Sync.push against the previous per session
+pipeline delivery, using 1, 100, and 5000 subscribed sessions
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import platform
+import sys
+from time import perf_counter
+
+# Pip imports
+from RestOC import Conf, JSON
+
+# Shared imports
+from shared import Sync
+
+# The session counts to test against
+_COUNTS = [1, 100, 5000]
+
+def legacyPush(service, key, data):
+	"""Legacy Push
+
+	The original push, one pipeline per session, kept for comparison
+
+	Arguments:
+		service (str): The name of the service using the sync
+		key (str): The key to push the data onto
+		data (mixed): The data to be pushed
+
+	Returns:
+		None
+	"""
+
+	# Generate the JSON
+	sJSON = JSON.encode({
+		"service": service,
+		"key": key,
+		"data": data
+	})
+
+	# For each session found, add the message to its list
+	for sSession in Sync._moRedis.smembers("%s%s" % (service, key)):
+		p = Sync._moRedis.pipeline()
+		p.lpush(sSession, sJSON)
+		p.expire(sSession, 21600)
+		p.execute()
+
+	# Publish the message
+	Sync._moRedis.publish("%s%s" % (service, key), sJSON)
+
+def timeIt(f, iterations):
+	"""Time It
+
+	Calls the function the given number of times and returns the average
+	milliseconds per call
+
+	Arguments:
+		f (callable): The function to call
+		iterations (uint): The number of times to call it
+
+	Returns:
+		float
+	"""
+	fStart = perf_counter()
+	for i in range(iterations):
+		f(i)
+	return ((perf_counter() - fStart) / iterations) * 1000.0
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Get the number of iterations
+	iIterations = len(sys.argv) > 1 and int(sys.argv[1]) or 20
+
+	# Load the config
+	Conf.load('config.json')
+	sConfOverride = 'config.%s.json' % platform.node()
+	if os.path.isfile(sConfOverride):
+		Conf.load_merge(sConfOverride)
+
+	# Init the sync module
+	Sync.init()
+
+	# Go through each count
+	for iCount in _COUNTS:
+
+		# Generate the key and add the fake sessions to it
+		sKey = 'bench-%d' % iCount
+		lSessions = ['bench%d-bench%s' % (i, sKey) for i in range(iCount)]
+		Sync._moRedis.sadd('bench%s' % sKey, *lSessions)
+
+		# Time both versions
+		fLegacy = timeIt(lambda i: legacyPush('bench', sKey, {"i": i}), iIterations)
+		fScript = timeIt(lambda i: Sync.push('bench', sKey, {"i": i}), iIterations)
+		fMany = timeIt(lambda i: Sync.push_many('bench', [
+			(sKey, {"i": i, "n": n}) for n in range(10)
+		]), iIterations)
+
+		# Print the results
+		print('%5d sessions: legacy %9.3fms, push %9.3fms, push_many(10) %9.3fms' % (
+			iCount, fLegacy, fScript, fMany
+		))
+
+		# Cleanup
+		Sync._moRedis.delete('bench%s' % sKey, *lSessions)
@@ -0,0 +1,257 @@
+# coding=utf8
+"""WebSocket Load
+
+Opens thousands of local websockets against the websocket node, tracks keys,
+then pushes messages through shared.Sync and reports delivery latency
+
+	python -m tools.websocket_load [sockets] [keys] [messages] [coalesce]
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "MaleExcelMedical"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "bast@maleexcel.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from base64 import b64encode
+import json
+import os
+import platform
+import resource
+import struct
+import sys
+from time import time
+
+# Pip imports
+from gevent import monkey; monkey.patch_all()
+import gevent
+from gevent import socket
+from RestOC import Conf, StrHelper
+
+# Shared imports
+from shared import Sync
+
+def wsConnect(host, port, session):
+	"""WebSocket Connect
+
+	Opens a socket and completes the websocket handshake
+
+	Arguments:
+		host (str): The host of the websocket node
+		port (uint): The port of the websocket node
+		session (str): The session token to send as a cookie
+
+	Returns:
+		socket
+	"""
+
+	# Connect
+	oSock = socket.create_connection((host, port))
+
+	# Send the upgrade request
+	oSock.sendall((
+		'GET / HTTP/1.1\r\n' \
+		'Host: %s:%d\r\n' \
+		'Upgrade: websocket\r\n' \
+		'Connection: Upgrade\r\n' \
+		'Sec-WebSocket-Key: %s\r\n' \
+		'Sec-WebSocket-Version: 13\r\n' \
+		'Cookie: _session=%s\r\n\r\n' % (
+			host, port, b64encode(os.urandom(16)).decode(), session
+		)
+	).encode())
+
+	# Read the headers
+	sHeaders = b''
+	while b'\r\n\r\n' not in sHeaders:
+		sChunk = oSock.recv(1024)
+		if not sChunk:
+			raise ConnectionError('Handshake failed')
+		sHeaders += sChunk
+
+	# Make sure we switched protocols
+	if b' 101 ' not in sHeaders.split(b'\r\n')[0]:
+		raise ConnectionError(sHeaders.split(b'\r\n')[0].decode())
+
+	# Return the socket
+	return oSock
+
+def wsRecv(sock):
+	"""WebSocket Receive
+
+	Reads a single unmasked frame from the server
+
+	Arguments:
+		sock (socket): The connected socket
+
+	Returns:
+		str
+	"""
+
+	def read(count):
+		b = b''
+		while len(b) < count:
+			sChunk = sock.recv(count - len(b))
+			if not sChunk:
+				raise ConnectionError('Socket closed')
+			b += sChunk
+		return b
+
+	# Get the length
+	iLen = read(2)[1] & 0x7f
+	if iLen == 126:
+		iLen = struct.unpack('>H', read(2))[0]
+	elif iLen == 127:
+		iLen = struct.unpack('>Q', read(8))[0]
+
+	# Return the payload
+	return read(iLen).decode('utf-8')
+
+def wsSend(sock, data):
+	"""WebSocket Send
+
+	Sends a single masked text frame to the server
+
+	Arguments:
+		sock (socket): The connected socket
+		data (mixed): The data to send as JSON
+
+	Returns:
+		None
+	"""
+
+	# Encode the data and generate the mask
+	bData = json.dumps(data).encode('utf-8')
+	bMask = os.urandom(4)
+
+	# Generate the header
+	iLen = len(bData)
+	if iLen < 126:
+		bHeader = struct.pack('>BB', 0x81, 0x80 | iLen)
+	elif iLen < 65536:
+		bHeader = struct.pack('>BBH', 0x81, 0x80 | 126, iLen)
+	else:
+		bHeader = struct.pack('>BBQ', 0x81, 0x80 | 127, iLen)
+
+	# Send the frame
+	sock.sendall(bHeader + bMask + bytes(
+		b ^ bMask[i % 4] for i, b in enumerate(bData)
+	))
+
+def client(host, port, key, coalesce, ready, latencies, frames):
+	"""Client
+
+	Connects, authorizes, tracks the key, then records the latency of every
+	message received
+
+	Arguments:
+		host (str): The host of the websocket node
+		port (uint): The port of the websocket node
+		key (str): The key to track
+		coalesce (uint): Milliseconds to ask the node to batch messages for
+		ready (list): Appended to once tracking has started
+		latencies (list): Appended to with the latency of each message
+		frames (list): Appended to for every frame received
+
+	Returns:
+		None
+	"""
+
+	# Generate a session and an authorization key
+	sSession = StrHelper.random(32, ['aZ', '10'])
+	sKey = StrHelper.random(32, ['aZ', '10'])
+	Sync.socket(sKey, {"session": sSession})
+
+	# Connect and authorize
+	oSock = wsConnect(host, port, sSession)
+	dConnect = {"_type": "connect", "key": sKey}
+	if coalesce:
+		dConnect['coalesce'] = coalesce
+	wsSend(oSock, dConnect)
+	sAuth = wsRecv(oSock)
+	if sAuth != 'authorized' and not sAuth.startswith('{"authorized"'):
+		raise ConnectionError('Not authorized')
+
+	# Track the key
+	wsSend(oSock, {"_type": "track", "service": "bench", "key": key})
+	ready.append(True)
+
+	# Record every message
+	try:
+		while True:
+			mMsg = json.loads(wsRecv(oSock))
+			frames.append(True)
+			for dMsg in (isinstance(mMsg, list) and mMsg or [mMsg]):
+				for dData in (dMsg.get('merged') and dMsg['data'] or [dMsg['data']]):
+					latencies.append(time() - dData['sent'])
+	except ConnectionError:
+		pass
+
+# Only run if called directly
+if __name__ == "__main__":
+
+	# Get the arguments
+	iSockets = len(sys.argv) > 1 and int(sys.argv[1]) or 2000
+	iKeys = len(sys.argv) > 2 and int(sys.argv[2]) or 20
+	iMessages = len(sys.argv) > 3 and int(sys.argv[3]) or 50
+	iCoalesce = len(sys.argv) > 4 and int(sys.argv[4]) or 0
+
+	# Raise the open file limit as far as we can
+	iSoft, iHard = resource.getrlimit(resource.RLIMIT_NOFILE)
+	resource.setrlimit(resource.RLIMIT_NOFILE, (iHard, iHard))
+
+	# Load the config
+	Conf.load('config.json')
+	sConfOverride = 'config.%s.json' % platform.node()
+	if os.path.isfile(sConfOverride):
+		Conf.load_merge(sConfOverride)
+
+	# Init the sync module
+	Sync.init()
+
+	# Get the websocket node
+	dConf = Conf.get('websocket')
+	sHost = dConf['host'] == '0.0.0.0' and '127.0.0.1' or dConf['host']
+
+	# Open all the sockets
+	lReady = []
+	lLatencies = []
+	lFrames = []
+	fStart = time()
+	lClients = [
+		gevent.spawn(client, sHost, dConf['port'], 'load-%d' % (i % iKeys), iCoalesce, lReady, lLatencies, lFrames)
+		for i in range(iSockets)
+	]
+	while len(lReady) + len([o for o in lClients if o.dead]) < iSockets:
+		gevent.sleep(0.1)
+	print('%d of %d sockets tracking after %.2fs' % (len(lReady), iSockets, time() - fStart))
+
+	# Push the messages, spread over all the keys
+	fStart = time()
+	for i in range(iMessages):
+		Sync.push('bench', 'load-%d' % (i % iKeys), {"sent": time()})
+	iExpected = sum(
+		len([1 for n in range(len(lReady)) if n % iKeys == i % iKeys])
+		for i in range(iMessages)
+	)
+
+	# Wait for everything to arrive, or 30 seconds
+	while len(lLatencies) < iExpected and time() - fStart < 30:
+		gevent.sleep(0.1)
+
+	# Print the results
+	lLatencies.sort()
+	print('Received %d of %d messages in %d frames in %.2fs' % (
+		len(lLatencies), iExpected, len(lFrames), time() - fStart
+	))
+	if lLatencies:
+		print('Latency p50 %.2fms, p99 %.2fms, max %.2fms' % (
+			lLatencies[len(lLatencies) // 2] * 1000,
+			lLatencies[int(len(lLatencies) * 0.99)] * 1000,
+			lLatencies[-1] * 1000
+		))
+
+	# Close everything
+	gevent.killall(lClients)
@@ -0,0 +1,6 @@
+# Import version files
+from . import create_table
+
+modules = [
+	create_table
+]
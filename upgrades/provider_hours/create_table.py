@@ -0,0 +1,16 @@
+# coding=utf8
+""" Create the daily tracking totals table and fill it"""
+
+# Record imports
+from records.providers import TrackingDaily
+
+def run():
+
+	# Create the table
+	TrackingDaily.tableCreate()
+
+	# Fill it from the tracking records
+	TrackingDaily.rebuild()
+
+	# Return OK
+	return True
@@ -0,0 +1,16 @@
+# coding=utf8
+""" Create the queue counts table and fill it"""
+
+# Record imports
+from records.monolith import KtOrderQueueCount
+
+def run():
+
+	# Create the table
+	KtOrderQueueCount.tableCreate()
+
+	# Fill it from the order tables
+	KtOrderQueueCount.rebuild()
+
+	# Return OK
+	return True